@@ -14,6 +14,9 @@ logging.basicConfig(level=logging.DEBUG)
 class Base(DeclarativeBase):
     pass
 
+# Relative SQLite paths live in the instance folder
+DEFAULT_DATABASE_URL = "sqlite:///employee_management.db"
+
 # Initialize extensions
 db = SQLAlchemy(model_class=Base)
 login_manager = LoginManager()
@@ -23,13 +26,43 @@ def create_app():
     
     # Configure the app
     app.secret_key = os.environ.get("SESSION_SECRET")
-    app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", "sqlite:///employee_management.db")
+    app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", DEFAULT_DATABASE_URL)
     app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
         "pool_recycle": 300,
         "pool_pre_ping": True,
     }
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
     
+    # Background PDF rendering (0 workers renders inside the request)
+    app.config["PDF_WORKERS"] = int(os.environ.get("PDF_WORKERS", 2))
+    app.config["REPORT_JOB_DIR"] = os.environ.get("REPORT_JOB_DIR", os.path.join(app.instance_path, "report_jobs"))
+    
+    # Cache of rendered financial report exports
+    app.config["REPORT_CACHE_DIR"] = os.environ.get("REPORT_CACHE_DIR", os.path.join(app.instance_path, "report_cache"))
+    app.config["REPORT_CACHE_MAX_BYTES"] = int(os.environ.get("REPORT_CACHE_MAX_BYTES", 200 * 1024 * 1024))
+    
+    # Seconds dashboard statistics are cached for (0 disables the cache)
+    app.config["DASHBOARD_STATS_TTL"] = int(os.environ.get("DASHBOARD_STATS_TTL", 30))
+    
+    # Check-in time after which ingested attendance events count as late (HH:MM)
+    app.config["ATTENDANCE_LATE_CUTOFF"] = os.environ.get("ATTENDANCE_LATE_CUTOFF", "09:15")
+    
+    # Per-request query count and latency instrumentation (off by default)
+    app.config["REQUEST_METRICS"] = os.environ.get("REQUEST_METRICS", "0").lower() in ("1", "true", "yes")
+    app.config["REQUEST_METRICS_WINDOW"] = int(os.environ.get("REQUEST_METRICS_WINDOW", 500))
+    app.config["REQUEST_METRICS_SLOW_QUERIES"] = int(os.environ.get("REQUEST_METRICS_SLOW_QUERIES", 5))
+    
+    # Seconds accounts and accounting periods are cached for (0 disables the cache)
+    app.config["REFERENCE_DATA_TTL"] = int(os.environ.get("REFERENCE_DATA_TTL", 60))
+    
+    # Journal entry numbers reserved per worker at a time (0 numbers entries
+    # inside the posting transaction, without gaps but one posting at a time)
+    app.config["ENTRY_NUMBER_BLOCK_SIZE"] = int(os.environ.get("ENTRY_NUMBER_BLOCK_SIZE", 20))
+    
+    # Raise when a list view lazy-loads a relationship its loader profile
+    # misses, so N+1 queries fail in tests and CI (off by default)
+    app.config["RAISE_ON_LAZY_LOAD"] = os.environ.get("RAISE_ON_LAZY_LOAD", "0").lower() in ("1", "true", "yes")
+    
     # Initialize extensions with the app
     db.init_app(app)
     login_manager.init_app(app)
@@ -45,11 +78,15 @@ def create_app():
         from blueprints.hr.routes import hr_bp
         from blueprints.project_management.routes import project_bp
         from blueprints.accounting import accounting_bp
+        from blueprints.jobs.routes import jobs_bp
+        from blueprints.metrics.routes import metrics_bp
         
         app.register_blueprint(accounts_bp)
         app.register_blueprint(hr_bp)
         app.register_blueprint(project_bp)
         app.register_blueprint(accounting_bp)
+        app.register_blueprint(jobs_bp)
+        app.register_blueprint(metrics_bp)
         
         # Make sure the models are imported and tables created
         import models
@@ -77,6 +114,10 @@ def create_app():
         from blueprints.accounting.routes import initialize_accounting
         initialize_accounting()
     
+    # Request instrumentation
+    from request_metrics import init_request_metrics
+    init_request_metrics(app, db)
+    
     # Template filters
     @app.template_filter('formatdate')
     def format_date(value, format='%Y-%m-%d'):
@@ -0,0 +1,290 @@
+"""
+Fill the configured database with synthetic data for benchmarking
+
+Writes into the database named by DATABASE_URL (the same one the app
+uses), so point it at a scratch database:
+
+    DATABASE_URL=sqlite:///benchmark.db python benchmark_data.py --journal-lines 1000000
+
+Rows are written with bulk inserts in chunks of CHUNK_SIZE. The same
+--seed produces the same data.
+"""
+import argparse
+import random
+import time
+from datetime import date, datetime, time as clock_time, timedelta
+from decimal import Decimal
+from sqlalchemy import insert
+from werkzeug.security import generate_password_hash
+from app import create_app, db
+
+CHUNK_SIZE = 5000
+
+ATTENDANCE_STATUSES = ['present'] * 16 + ['late'] * 2 + ['absent', 'half-day']
+DEPARTMENTS = ['developer', 'hr', 'accounting', 'sales', 'support', 'general']
+TASK_STATUSES = ['to-do', 'in-progress', 'in-review', 'completed', 'completed']
+PRIORITIES = ['low', 'medium', 'high', 'urgent']
+
+
+def insert_rows(model, rows, returning=False):
+    """
+    Bulk insert rows in chunks
+
+    Returns:
+        List of the new primary keys in row order if returning is set
+    """
+    ids = []
+    for start in range(0, len(rows), CHUNK_SIZE):
+        chunk = rows[start:start + CHUNK_SIZE]
+        if returning:
+            stmt = insert(model).returning(model.id, sort_by_parameter_order=True)
+            ids.extend(db.session.scalars(stmt, chunk).all())
+        else:
+            db.session.execute(insert(model), chunk)
+    return ids
+
+
+def ensure_periods(start_date, end_date):
+    """Create a fiscal year with quarterly periods for every uncovered year in the range"""
+    from models_accounting import FiscalYear, AccountingPeriod
+    from blueprints.accounting.balances import PeriodIndex
+
+    index = PeriodIndex.load()
+    for year in range(start_date.year, end_date.year + 1):
+        if index.period_for(date(year, 1, 1)) and index.period_for(date(year, 12, 31)):
+            continue
+        fiscal_year = FiscalYear(name=f"FY {year}", start_date=date(year, 1, 1), end_date=date(year, 12, 31))
+        db.session.add(fiscal_year)
+        db.session.flush()
+        for quarter, (start_month, end_day) in enumerate([(1, 31), (4, 30), (7, 30), (10, 31)], start=1):
+            end_month = start_month + 2
+            db.session.add(AccountingPeriod(
+                fiscal_year_id=fiscal_year.id,
+                name=f"Q{quarter} {year}",
+                start_date=date(year, start_month, 1),
+                end_date=date(year, end_month, end_day)
+            ))
+    db.session.commit()
+    return PeriodIndex.load()
+
+
+def generate_journal(rng, lines, start_date, end_date, user_id):
+    """Balanced two-line journal entries spread over the date range, 90% posted"""
+    from models_accounting import ChartOfAccount, JournalEntry, JournalEntryLine
+    from blueprints.accounting.balances import bump_ledger_revisions, rebuild_snapshots
+
+    periods = ensure_periods(start_date, end_date)
+    account_ids = [account_id for (account_id,) in db.session.query(ChartOfAccount.id)]
+    offset = JournalEntry.query.count()
+    days = (end_date - start_date).days
+
+    entries = lines // 2
+    for start in range(0, entries, CHUNK_SIZE):
+        batch = range(start, min(start + CHUNK_SIZE, entries))
+        entry_rows = []
+        for number in batch:
+            entry_date = start_date + timedelta(days=rng.randint(0, days))
+            entry_rows.append({
+                'entry_number': f"BENCH-{offset + number + 1:08d}",
+                'date': entry_date,
+                'period_id': periods.period_for(entry_date).id,
+                'memo': f"Benchmark entry {number + 1}",
+                'reference': f"REF-{rng.randint(1, 99999)}",
+                'status': 'POSTED' if rng.random() < 0.9 else 'DRAFT',
+                'entry_type': rng.choice(['MANUAL', 'MANUAL', 'SYSTEM', 'RECURRING']),
+                'created_by': user_id
+            })
+        entry_ids = insert_rows(JournalEntry, entry_rows, returning=True)
+
+        line_rows = []
+        for entry_id in entry_ids:
+            debit_account, credit_account = rng.sample(account_ids, 2)
+            amount = Decimal(rng.randint(100, 500000)) / 100
+            line_rows.append({'journal_entry_id': entry_id, 'account_id': debit_account,
+                              'debit_amount': amount, 'credit_amount': 0})
+            line_rows.append({'journal_entry_id': entry_id, 'account_id': credit_account,
+                              'debit_amount': 0, 'credit_amount': amount})
+        insert_rows(JournalEntryLine, line_rows)
+        db.session.commit()
+
+    # Bump the ledger version so cached reports for these dates are dropped
+    bump_ledger_revisions(db.session.connection(), [start_date + timedelta(days=day) for day in range(days + 1)])
+    db.session.commit()
+    rebuild_snapshots()
+    return entries * 2
+
+
+def generate_employees(rng, count, password_hash):
+    """Employees, each with a login user"""
+    from models import User, Employee
+
+    offset = User.query.count()
+    user_ids = insert_rows(User, [{
+        'username': f"bench{offset + number}",
+        'email': f"bench{offset + number}@example.com",
+        'password_hash': password_hash,
+        'department': rng.choice(DEPARTMENTS)
+    } for number in range(count)], returning=True)
+
+    employee_ids = insert_rows(Employee, [{
+        'user_id': user_id,
+        'first_name': f"Bench{number}",
+        'last_name': rng.choice(['Smith', 'Jones', 'Garcia', 'Chen', 'Okafor', 'Novak']),
+        'department': rng.choice(DEPARTMENTS),
+        'position': rng.choice(['Engineer', 'Analyst', 'Manager', 'Associate']),
+        'hire_date': date(2015, 1, 1) + timedelta(days=rng.randint(0, 3000)),
+        'salary': Decimal(rng.randint(3000, 12000))
+    } for number, user_id in enumerate(user_ids)], returning=True)
+    db.session.commit()
+    return user_ids, employee_ids
+
+
+def generate_attendance(rng, employee_ids, start_date, end_date):
+    """One record per employee per weekday"""
+    from models import Attendance
+
+    weekdays = [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+    weekdays = [day for day in weekdays if day.weekday() < 5]
+
+    total = 0
+    for employee_id in employee_ids:
+        rows = []
+        for day in weekdays:
+            status = rng.choice(ATTENDANCE_STATUSES)
+            row = {'employee_id': employee_id, 'date': day, 'status': status}
+            if status != 'absent':
+                row['check_in_time'] = clock_time(9 if status == 'late' else 8, rng.randint(0, 59))
+                row['check_out_time'] = clock_time(13 if status == 'half-day' else 17, rng.randint(0, 59))
+            rows.append(row)
+        insert_rows(Attendance, rows)
+        total += len(rows)
+    db.session.commit()
+    return total
+
+
+def generate_projects(rng, count, tasks_per_project, milestones_per_project, payments_per_project,
+                      user_ids, start_date, end_date):
+    """Projects with sales records, milestones, tasks and payments"""
+    from models import Project, ProjectMilestone, Task, ProjectPayment, Sales
+    from blueprints.project_management.milestone_status import reconcile_milestones
+
+    days = (end_date - start_date).days
+    totals = {'projects': 0, 'milestones': 0, 'tasks': 0, 'payments': 0}
+
+    for start in range(0, count, CHUNK_SIZE // 10):
+        batch = range(start, min(start + CHUNK_SIZE // 10, count))
+        project_rows = []
+        for number in batch:
+            project_start = start_date + timedelta(days=rng.randint(0, days))
+            project_rows.append({
+                'name': f"Benchmark Project {number + 1}",
+                'description': 'Synthetic benchmark project',
+                'client': f"Client {rng.randint(1, 500)}",
+                'start_date': project_start,
+                'end_date': project_start + timedelta(days=rng.randint(30, 365)),
+                'status': rng.choice(['planning', 'in-progress', 'in-progress', 'completed']),
+                'budget': Decimal(rng.randint(1000, 200000))
+            })
+        project_ids = insert_rows(Project, project_rows, returning=True)
+
+        insert_rows(Sales, [{
+            'project_id': project_id,
+            'total_amount': row['budget'],
+            'received_amount': 0,
+            'difference': row['budget']
+        } for project_id, row in zip(project_ids, project_rows)])
+
+        milestone_rows = []
+        for project_id, row in zip(project_ids, project_rows):
+            for number in range(milestones_per_project):
+                milestone_rows.append({
+                    'project_id': project_id,
+                    'name': f"Milestone {number + 1}",
+                    'due_date': row['start_date'] + timedelta(days=30 * (number + 1)),
+                    'amount': (row['budget'] / max(milestones_per_project, 1)).quantize(Decimal('0.01')),
+                    'status': 'pending'
+                })
+        milestone_ids = insert_rows(ProjectMilestone, milestone_rows, returning=True)
+        milestones_by_project = {}
+        for milestone_id, row in zip(milestone_ids, milestone_rows):
+            milestones_by_project.setdefault(row['project_id'], []).append((milestone_id, row))
+
+        task_rows = []
+        payment_rows = []
+        for project_id, row in zip(project_ids, project_rows):
+            milestones = milestones_by_project.get(project_id, [])
+            for number in range(tasks_per_project):
+                task_rows.append({
+                    'project_id': project_id,
+                    'user_id': rng.choice(user_ids),
+                    'milestone_id': rng.choice(milestones)[0] if milestones and rng.random() < 0.7 else None,
+                    'title': f"Task {number + 1}",
+                    'due_date': row['start_date'] + timedelta(days=rng.randint(1, 120)),
+                    'priority': rng.choice(PRIORITIES),
+                    'status': rng.choice(TASK_STATUSES)
+                })
+            for milestone_id, milestone in milestones[:payments_per_project]:
+                payment_rows.append({
+                    'project_id': project_id,
+                    'milestone_id': milestone_id,
+                    'amount_original': milestone['amount'],
+                    'amount_received': milestone['amount'],
+                    'payment_date': milestone['due_date'],
+                    'status': rng.choice(['pending', 'in-review', 'transferred', 'reconciled'])
+                })
+        insert_rows(Task, task_rows)
+        insert_rows(ProjectPayment, payment_rows)
+        db.session.commit()
+
+        totals['projects'] += len(project_ids)
+        totals['milestones'] += len(milestone_ids)
+        totals['tasks'] += len(task_rows)
+        totals['payments'] += len(payment_rows)
+
+    # Build the task counters the milestone status engine maintains
+    reconcile_milestones()
+    return totals
+
+
+def generate(args):
+    app = create_app()
+    with app.app_context():
+        from models import User
+
+        print(f"Writing benchmark data to {db.engine.url.render_as_string(hide_password=True)}")
+        rng = random.Random(args.seed)
+        end_date = date.today()
+        start_date = end_date - timedelta(days=args.days - 1)
+        admin = User.query.filter_by(username='admin').first()
+
+        started = time.perf_counter()
+        lines = generate_journal(rng, args.journal_lines, start_date, end_date, admin.id)
+        print(f"  {lines} journal entry lines ({time.perf_counter() - started:.1f}s)")
+
+        started = time.perf_counter()
+        user_ids, employee_ids = generate_employees(rng, args.employees, generate_password_hash('benchmark'))
+        records = generate_attendance(rng, employee_ids, start_date, end_date)
+        print(f"  {len(employee_ids)} employees, {records} attendance records ({time.perf_counter() - started:.1f}s)")
+
+        started = time.perf_counter()
+        totals = generate_projects(rng, args.projects, args.tasks_per_project, args.milestones_per_project,
+                                   args.payments_per_project, user_ids or [admin.id], start_date, end_date)
+        print(f"  {totals['projects']} projects, {totals['milestones']} milestones, {totals['tasks']} tasks, "
+              f"{totals['payments']} payments ({time.perf_counter() - started:.1f}s)")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--journal-lines', type=int, default=1000000, help='journal entry lines (two per entry)')
+    parser.add_argument('--employees', type=int, default=500)
+    parser.add_argument('--days', type=int, default=730, help='days of history, ending today')
+    parser.add_argument('--projects', type=int, default=5000)
+    parser.add_argument('--tasks-per-project', type=int, default=10)
+    parser.add_argument('--milestones-per-project', type=int, default=3)
+    parser.add_argument('--payments-per-project', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=42)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    generate(parse_args())
@@ -0,0 +1,641 @@
+from bisect import bisect_right
+from collections import namedtuple, defaultdict
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import event, func, and_, or_, not_, inspect, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app import db
+from models_accounting import JournalEntry, JournalEntryLine, AccountingPeriod, AccountBalanceSnapshot, ChartOfAccount, LedgerRevision
+
+ZERO = Decimal('0.00')
+
+_UPSERT_DIALECTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert
+}
+
+
+class AccountTotals(namedtuple('AccountTotals', ['debits', 'credits'])):
+    """Summed debits and credits for a single account"""
+    __slots__ = ()
+
+    def balance(self, normal_balance):
+        """Balance on the account's normal side (DEBIT or CREDIT)"""
+        if normal_balance == 'DEBIT':
+            return self.debits - self.credits
+        return self.credits - self.debits
+
+    def __add__(self, other):
+        return AccountTotals(self.debits + other.debits, self.credits + other.credits)
+
+
+EMPTY_TOTALS = AccountTotals(ZERO, ZERO)
+
+
+def to_decimal(value):
+    if value is None:
+        return ZERO
+    if isinstance(value, Decimal):
+        return value
+    return Decimal(str(value)).quantize(ZERO)
+
+
+class PeriodIndex:
+    """
+    Date lookup over accounting periods
+
+    Snapshots bucket journal entry lines by the period whose date range
+    contains the entry date (the latest-starting one if periods overlap),
+    independently of the period_id chosen on the entry itself.
+    """
+
+    def __init__(self, periods):
+        self.periods = sorted(periods, key=lambda p: (p.start_date, p.id))
+        self.starts = [p.start_date for p in self.periods]
+        self._open_periods = None
+
+    @classmethod
+    def load(cls, lock=False, from_date=None, to_date=None):
+        """
+        Load the periods in the current transaction
+
+        Args:
+            lock: Share-lock the periods until the transaction ends, so a
+                  period cannot be closed while entries are posted into it
+                  (PostgreSQL; ignored by SQLite)
+            from_date: Only load periods ending on or after this date (optional)
+            to_date: Only load periods starting on or before this date (optional)
+        """
+        query = AccountingPeriod.query
+        if from_date is not None:
+            query = query.filter(AccountingPeriod.end_date >= from_date)
+        if to_date is not None:
+            query = query.filter(AccountingPeriod.start_date <= to_date)
+        if lock:
+            query = query.with_for_update(read=True)
+        return cls(query.all())
+
+    def period_for(self, entry_date):
+        """Return the period containing entry_date, or None"""
+        index = bisect_right(self.starts, entry_date) - 1
+        while index >= 0:
+            period = self.periods[index]
+            if period.end_date >= entry_date:
+                return period
+            index -= 1
+        return None
+
+    def open_period_for(self, entry_date):
+        """
+        Open period to post an entry of this date into
+
+        The open period containing the date, or else the most recent open
+        period; None if every period is closed.
+        """
+        if self._open_periods is None:
+            self._open_periods = PeriodIndex([period for period in self.periods if not period.is_closed])
+        open_periods = self._open_periods
+        return open_periods.period_for(entry_date) or max(
+            open_periods.periods, key=lambda p: (p.end_date, p.id), default=None
+        )
+
+    def overlaps(self, period):
+        """Check if another period shares any date with this one"""
+        return any(
+            other.id != period.id and other.start_date <= period.end_date and other.end_date >= period.start_date
+            for other in self.periods
+        )
+
+
+def _snapshot_periods(from_date, to_date):
+    """Closed, non-overlapping periods that lie entirely inside the date range"""
+    index = PeriodIndex.load()
+    return [
+        period for period in index.periods
+        if period.is_closed
+        and (from_date is None or period.start_date >= from_date)
+        and (to_date is None or period.end_date <= to_date)
+        and not index.overlaps(period)
+    ]
+
+
+def _line_totals(from_date, to_date, account_ids, status, exclude_periods=()):
+    query = db.session.query(
+        JournalEntryLine.account_id,
+        func.coalesce(func.sum(JournalEntryLine.debit_amount), 0),
+        func.coalesce(func.sum(JournalEntryLine.credit_amount), 0)
+    ).join(
+        JournalEntry,
+        JournalEntryLine.journal_entry_id == JournalEntry.id
+    )
+
+    if status:
+        query = query.filter(JournalEntry.status == status)
+
+    if from_date:
+        query = query.filter(JournalEntry.date >= from_date)
+
+    if to_date:
+        query = query.filter(JournalEntry.date <= to_date)
+
+    if account_ids is not None:
+        query = query.filter(JournalEntryLine.account_id.in_(account_ids))
+
+    if exclude_periods:
+        query = query.filter(not_(or_(*[
+            and_(JournalEntry.date >= period.start_date, JournalEntry.date <= period.end_date)
+            for period in exclude_periods
+        ])))
+
+    query = query.group_by(JournalEntryLine.account_id)
+
+    return {
+        account_id: AccountTotals(to_decimal(debits), to_decimal(credits))
+        for account_id, debits, credits in query
+    }
+
+
+def _snapshot_totals(periods, account_ids):
+    query = db.session.query(
+        AccountBalanceSnapshot.account_id,
+        func.sum(AccountBalanceSnapshot.debit_total),
+        func.sum(AccountBalanceSnapshot.credit_total)
+    ).filter(
+        AccountBalanceSnapshot.period_id.in_([period.id for period in periods])
+    )
+
+    if account_ids is not None:
+        query = query.filter(AccountBalanceSnapshot.account_id.in_(account_ids))
+
+    query = query.group_by(AccountBalanceSnapshot.account_id)
+
+    return {
+        account_id: AccountTotals(to_decimal(debits), to_decimal(credits))
+        for account_id, debits, credits in query
+    }
+
+
+def get_account_totals(from_date=None, to_date=None, account_ids=None, status='POSTED', use_snapshots=True):
+    """
+    Sum debits and credits for every account with grouped queries
+
+    Closed accounting periods that fall entirely inside the date range are
+    read from the balance snapshots; only the remaining dates are summed
+    from the raw journal entry lines.
+
+    Args:
+        from_date: Only include entries dated on or after this date (optional)
+        to_date: Only include entries dated on or before this date (optional)
+        account_ids: Restrict the result to these accounts (optional)
+        status: Journal entry status to include (defaults to POSTED)
+        use_snapshots: Read closed periods from snapshots (only for POSTED)
+
+    Returns:
+        Dictionary of account_id -> AccountTotals. Accounts without any
+        matching lines are omitted; use EMPTY_TOTALS as the default.
+    """
+    periods = _snapshot_periods(from_date, to_date) if use_snapshots and status == 'POSTED' else []
+
+    totals = _line_totals(from_date, to_date, account_ids, status, exclude_periods=periods)
+
+    if periods:
+        for account_id, snapshot in _snapshot_totals(periods, account_ids).items():
+            totals[account_id] = totals.get(account_id, EMPTY_TOTALS) + snapshot
+
+    return totals
+
+
+def apply_balances(accounts, totals):
+    """
+    Set balance_amount on each account from precomputed totals
+
+    Args:
+        accounts: Iterable of ChartOfAccount objects
+        totals: Dictionary returned by get_account_totals
+    """
+    for account in accounts:
+        account.balance_amount = totals.get(account.id, EMPTY_TOTALS).balance(account.normal_balance)
+
+
+def preload_account_balances(accounts):
+    """
+    Attach all-time balances to accounts with one grouped query
+
+    After this, ChartOfAccount.balance, display_balance, is_debit_balance
+    and has_journal_entry_lines no longer query the database per account.
+    Like ChartOfAccount.balance, this includes lines of every status.
+    """
+    totals = get_account_totals(status=None, use_snapshots=False)
+    for account in accounts:
+        account_totals = totals.get(account.id)
+        if account_totals:
+            account.preload_totals(account_totals.debits, account_totals.credits)
+        else:
+            account.preload_totals(ZERO, ZERO, has_lines=False)
+
+
+def ledger_version(from_date=None, to_date=None):
+    """
+    Version of everything a financial report for the date range depends on
+    
+    Changes whenever posted lines dated inside the range change (see
+    record_posted_lines) or any account is added, removed or edited.
+    
+    Returns:
+        Version string, suitable as part of a cache key
+    """
+    # Counters only grow, so their sum over the range changes with every
+    # change inside it
+    query = db.session.query(func.count(LedgerRevision.entry_date), func.sum(LedgerRevision.revision))
+    if from_date:
+        query = query.filter(LedgerRevision.entry_date >= from_date)
+    if to_date:
+        query = query.filter(LedgerRevision.entry_date <= to_date)
+    dates, revision = query.one()
+    
+    account_count, accounts_updated = db.session.query(
+        func.count(ChartOfAccount.id),
+        func.max(ChartOfAccount.updated_at)
+    ).one()
+    
+    return f"{dates}/{revision or 0}:{account_count}:{accounts_updated.isoformat() if accounts_updated else ''}"
+
+
+# Balance snapshot maintenance
+
+def record_posted_lines(entry_date, lines, sign=1):
+    """
+    Add posted journal entry lines to the balance snapshots
+
+    Must be called inside the transaction that posts the entry; the caller
+    commits. Totals are incremented in SQL so concurrent postings do not
+    overwrite each other.
+
+    Args:
+        entry_date: Date of the journal entry
+        lines: Iterable of objects or dictionaries with account_id,
+               debit_amount and credit_amount
+        sign: 1 to add the lines, -1 to remove them
+    """
+    record_posted_batch([(entry_date, lines)], sign)
+
+
+def record_posted_batch(dated_lines, sign=1):
+    """
+    Add the lines of many posted journal entries to the balance snapshots
+
+    Lines are summed per (account, period) first, so each snapshot is
+    updated once however many entries touch it, and the ledger revision of
+    each distinct entry date is bumped once.
+
+    Args:
+        dated_lines: Iterable of (entry_date, lines) tuples, lines as for
+                     record_posted_lines
+        sign: 1 to add the lines, -1 to remove them
+    """
+    dated_lines = list(dated_lines)
+    if not dated_lines:
+        return
+    dates = {entry_date for entry_date, _ in dated_lines}
+
+    # Periods come from the transaction, not the reference data cache: a
+    # period another worker just created must get its lines. Only the
+    # periods overlapping the batch's dates are read.
+    periods = PeriodIndex.load(from_date=min(dates), to_date=max(dates))
+    deltas = defaultdict(lambda: EMPTY_TOTALS)
+    for entry_date, lines in dated_lines:
+        period = periods.period_for(entry_date)
+        if not period:
+            continue  # Dates outside every period are always read from the raw lines
+
+        for line in lines:
+            if isinstance(line, dict):
+                account_id = line['account_id']
+                debit, credit = line.get('debit_amount', 0), line.get('credit_amount', 0)
+            else:
+                account_id, debit, credit = line.account_id, line.debit_amount, line.credit_amount
+            deltas[(account_id, period.id)] += AccountTotals(to_decimal(debit) * sign, to_decimal(credit) * sign)
+
+    # Invalidate cached report exports covering these dates
+    bump_ledger_revisions(db.session.connection(), dates)
+
+    if deltas:
+        _add_to_snapshots(sorted(deltas.items()))
+
+
+def bump_ledger_revisions(connection, dates):
+    """
+    Advance the revision counter of each date, creating missing counters
+
+    There is one ledger_revision row per entry date, so the table grows
+    with the calendar rather than with every posting. Uses INSERT ... ON
+    CONFLICT DO UPDATE on PostgreSQL and SQLite, and a savepoint around
+    the INSERT elsewhere, as for the snapshots.
+
+    Args:
+        connection: Connection of the transaction that changed the lines
+        dates: Entry dates whose posted lines changed
+    """
+    revision = LedgerRevision.__table__
+    dates = sorted(set(dates))
+    if not dates:
+        return
+    now = datetime.utcnow()
+    upsert = _UPSERT_DIALECTS.get(connection.dialect.name)
+
+    if upsert is not None:
+        stmt = upsert(revision).values([{'entry_date': day, 'revision': 1, 'updated_at': now} for day in dates])
+        connection.execute(stmt.on_conflict_do_update(
+            index_elements=['entry_date'],
+            set_={'revision': revision.c.revision + 1, 'updated_at': now}
+        ))
+        return
+
+    for day in dates:
+        increment = revision.update().where(revision.c.entry_date == day).values(
+            revision=revision.c.revision + 1,
+            updated_at=now
+        )
+        if connection.execute(increment).rowcount:
+            continue
+        try:
+            with connection.begin_nested():
+                connection.execute(revision.insert().values(entry_date=day, revision=1, updated_at=now))
+        except IntegrityError:
+            connection.execute(increment)
+
+
+def _add_to_snapshots(deltas):
+    """
+    Increment snapshot totals, creating the snapshots that do not exist yet
+
+    On PostgreSQL and SQLite this is one INSERT ... ON CONFLICT DO UPDATE,
+    so two workers posting the first lines of an (account, period) do not
+    both insert it. Other databases insert inside a savepoint and fall back
+    to the UPDATE when another transaction created the row first.
+
+    Args:
+        deltas: List of ((account_id, period_id), AccountTotals), sorted so
+                concurrent postings lock the rows in the same order
+    """
+    snapshot = AccountBalanceSnapshot.__table__
+    now = datetime.utcnow()
+    upsert = _UPSERT_DIALECTS.get(db.session.get_bind().dialect.name)
+
+    if upsert is not None:
+        stmt = upsert(snapshot).values([
+            {
+                'account_id': account_id,
+                'period_id': period_id,
+                'debit_total': delta.debits,
+                'credit_total': delta.credits,
+                'created_at': now,
+                'updated_at': now
+            }
+            for (account_id, period_id), delta in deltas
+        ])
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=['account_id', 'period_id'],
+            set_={
+                'debit_total': snapshot.c.debit_total + stmt.excluded.debit_total,
+                'credit_total': snapshot.c.credit_total + stmt.excluded.credit_total,
+                'updated_at': now
+            }
+        ))
+        return
+
+    for (account_id, period_id), delta in deltas:
+        increment = snapshot.update().where(
+            (snapshot.c.account_id == account_id) & (snapshot.c.period_id == period_id)
+        ).values(
+            debit_total=snapshot.c.debit_total + delta.debits,
+            credit_total=snapshot.c.credit_total + delta.credits,
+            updated_at=now
+        )
+        if db.session.execute(increment).rowcount:
+            continue
+        try:
+            with db.session.begin_nested():
+                db.session.execute(snapshot.insert().values(
+                    account_id=account_id,
+                    period_id=period_id,
+                    debit_total=delta.debits,
+                    credit_total=delta.credits,
+                    created_at=now,
+                    updated_at=now
+                ))
+        except IntegrityError:
+            db.session.execute(increment)
+
+
+def record_posted_entry(entry, sign=1):
+    """Add all lines of a posted journal entry to the balance snapshots"""
+    record_posted_lines(entry.date, entry.lines, sign)
+
+
+def rebuild_period_snapshots(connection, ranges, deleted_period_ids=()):
+    """
+    Recompute the snapshots of every period overlapping some date ranges
+
+    A new, moved or removed period changes which period the lines around it
+    are bucketed into, so the snapshots of all periods overlapping the old
+    and new date ranges are replaced with totals summed from the raw lines.
+    The ledger revision of each range boundary is bumped, so cached reports
+    covering those periods are invalidated.
+
+    Args:
+        connection: Connection of the transaction that changed the periods
+        ranges: Iterable of (start_date, end_date) tuples
+        deleted_period_ids: Periods whose snapshots are only removed
+    """
+    ranges = sorted(ranges)
+    period_table = AccountingPeriod.__table__
+    snapshot = AccountBalanceSnapshot.__table__
+
+    index = PeriodIndex(connection.execute(select(
+        period_table.c.id, period_table.c.start_date, period_table.c.end_date
+    )).all())
+    low = min(start for start, _ in ranges)
+    high = max(end for _, end in ranges)
+    affected = [period for period in index.periods if period.start_date <= high and period.end_date >= low]
+    affected_ids = {period.id for period in affected}
+
+    stale_ids = affected_ids | set(deleted_period_ids)
+    if stale_ids:
+        connection.execute(snapshot.delete().where(snapshot.c.period_id.in_(stale_ids)))
+
+    if affected:
+        query = select(
+            JournalEntry.date,
+            JournalEntryLine.account_id,
+            func.coalesce(func.sum(JournalEntryLine.debit_amount), 0),
+            func.coalesce(func.sum(JournalEntryLine.credit_amount), 0)
+        ).join(
+            JournalEntry,
+            JournalEntryLine.journal_entry_id == JournalEntry.id
+        ).where(
+            JournalEntry.status == 'POSTED',
+            JournalEntry.date >= min(period.start_date for period in affected),
+            JournalEntry.date <= max(period.end_date for period in affected)
+        ).group_by(
+            JournalEntry.date,
+            JournalEntryLine.account_id
+        )
+
+        totals = defaultdict(lambda: EMPTY_TOTALS)
+        for entry_date, account_id, debits, credits in connection.execute(query):
+            period = index.period_for(entry_date)
+            if period and period.id in affected_ids:
+                totals[(account_id, period.id)] += AccountTotals(to_decimal(debits), to_decimal(credits))
+
+        if totals:
+            now = datetime.utcnow()
+            connection.execute(snapshot.insert(), [
+                {
+                    'account_id': account_id,
+                    'period_id': period_id,
+                    'debit_total': period_totals.debits,
+                    'credit_total': period_totals.credits,
+                    'created_at': now,
+                    'updated_at': now
+                }
+                for (account_id, period_id), period_totals in sorted(totals.items())
+            ])
+
+    bump_ledger_revisions(connection, {day for period_range in ranges for day in period_range})
+
+
+def _changed_period_ranges(session):
+    """
+    Date ranges of the periods a flush inserts, deletes or changes
+
+    Returns:
+        Tuple of (set of (start_date, end_date), set of deleted period ids).
+        For changed periods both the old and the new range are included.
+    """
+    ranges = set()
+    deleted_ids = set()
+
+    for period in session.new:
+        if isinstance(period, AccountingPeriod):
+            ranges.add((period.start_date, period.end_date))
+
+    for period in session.deleted:
+        if isinstance(period, AccountingPeriod):
+            ranges.add((period.start_date, period.end_date))
+            deleted_ids.add(period.id)
+
+    for period in session.dirty:
+        if not isinstance(period, AccountingPeriod):
+            continue
+        attrs = inspect(period).attrs
+        start, end, closed = attrs.start_date.history, attrs.end_date.history, attrs.is_closed.history
+        if not (start.has_changes() or end.has_changes() or closed.has_changes()):
+            continue
+        ranges.add((period.start_date, period.end_date))
+        ranges.add((
+            start.deleted[0] if start.deleted else period.start_date,
+            end.deleted[0] if end.deleted else period.end_date
+        ))
+
+    return {(start, end) for start, end in ranges if start and end}, deleted_ids
+
+
+@event.listens_for(Session, 'after_flush')
+def _rebuild_changed_period_snapshots(session, flush_context):
+    # Snapshots are otherwise only written when lines are posted, so a new
+    # or moved period would be read from an empty or stale snapshot
+    ranges, deleted_ids = _changed_period_ranges(session)
+    if ranges:
+        rebuild_period_snapshots(session.connection(), ranges, deleted_ids)
+
+
+def compute_snapshots():
+    """
+    Recompute snapshot totals from the raw posted journal entry lines
+
+    Returns:
+        Dictionary of (account_id, period_id) -> AccountTotals
+    """
+    index = PeriodIndex.load()
+    query = db.session.query(
+        JournalEntry.date,
+        JournalEntryLine.account_id,
+        func.coalesce(func.sum(JournalEntryLine.debit_amount), 0),
+        func.coalesce(func.sum(JournalEntryLine.credit_amount), 0)
+    ).join(
+        JournalEntry,
+        JournalEntryLine.journal_entry_id == JournalEntry.id
+    ).filter(
+        JournalEntry.status == 'POSTED'
+    ).group_by(
+        JournalEntry.date,
+        JournalEntryLine.account_id
+    )
+
+    snapshots = defaultdict(lambda: EMPTY_TOTALS)
+    for entry_date, account_id, debits, credits in query:
+        period = index.period_for(entry_date)
+        if period:
+            snapshots[(account_id, period.id)] += AccountTotals(to_decimal(debits), to_decimal(credits))
+    return dict(snapshots)
+
+
+def verify_snapshots():
+    """
+    Compare stored snapshots against totals recomputed from the raw lines
+
+    Returns:
+        List of dictionaries describing each drifted (account, period) pair
+    """
+    expected = compute_snapshots()
+    stored = {
+        (row.account_id, row.period_id): AccountTotals(to_decimal(row.debit_total), to_decimal(row.credit_total))
+        for row in AccountBalanceSnapshot.query.all()
+    }
+
+    accounts = {account.id: account for account in ChartOfAccount.query.all()}
+    periods = {period.id: period for period in AccountingPeriod.query.all()}
+
+    drift = []
+    for key in sorted(set(expected) | set(stored)):
+        want = expected.get(key, EMPTY_TOTALS)
+        have = stored.get(key, EMPTY_TOTALS)
+        if want != have:
+            account_id, period_id = key
+            account = accounts.get(account_id)
+            period = periods.get(period_id)
+            drift.append({
+                'account': f"{account.code} - {account.name}" if account else account_id,
+                'period': period.name if period else period_id,
+                'expected_debits': want.debits,
+                'expected_credits': want.credits,
+                'stored_debits': have.debits,
+                'stored_credits': have.credits
+            })
+    return drift
+
+
+def rebuild_snapshots():
+    """
+    Replace all balance snapshots with totals recomputed from the raw lines
+
+    Returns:
+        Number of snapshot rows written
+    """
+    snapshots = compute_snapshots()
+
+    AccountBalanceSnapshot.query.delete(synchronize_session=False)
+    db.session.add_all([
+        AccountBalanceSnapshot(
+            account_id=account_id,
+            period_id=period_id,
+            debit_total=totals.debits,
+            credit_total=totals.credits
+        )
+        for (account_id, period_id), totals in snapshots.items()
+    ])
+    db.session.commit()
+    return len(snapshots)
@@ -0,0 +1,151 @@
+from datetime import timedelta
+from decimal import Decimal
+from sqlalchemy.orm import aliased
+from app import db
+from models_accounting import ChartOfAccount, JournalEntry, JournalEntryLine
+from .balances import get_account_totals
+
+OPERATING = 'Operating'
+INVESTING = 'Investing'
+FINANCING = 'Financing'
+
+
+def classify_account(account):
+    """
+    Cash flow category for a counter account
+
+    This is a simplified categorization - in a production system
+    you might want more specific rules
+    """
+    # Revenue and expense accounts typically represent operating activities
+    if account.account_type in ['Revenue', 'Expense']:
+        return OPERATING
+    # Long-term assets typically represent investing activities
+    if account.account_type == 'Asset' and 'long-term' in account.name.lower():
+        return INVESTING
+    # Liabilities and equity typically represent financing activities
+    if account.account_type in ['Liability', 'Equity']:
+        return FINANCING
+    # Default to operating activities for anything else
+    return OPERATING
+
+
+def get_cash_accounts():
+    """Active asset accounts that hold cash or bank balances"""
+    return ChartOfAccount.query.filter(
+        ChartOfAccount.account_type == 'Asset',
+        ChartOfAccount.is_active == True,
+        (ChartOfAccount.name.like('%Cash%') | ChartOfAccount.name.like('%Bank%'))
+    ).order_by(ChartOfAccount.code).all()
+
+
+def build_cash_flow(from_date, to_date):
+    """
+    Build the cash flow statement for a date range
+
+    All cash account lines in the period are fetched together with their
+    counter lines in one joined query and classified in memory.
+
+    Returns:
+        Dictionary with the activity lists, section totals and the
+        beginning, ending and net change in cash
+    """
+    cash_accounts = get_cash_accounts()
+    cash_account_ids = [account.id for account in cash_accounts]
+
+    # Precomputed counter account names and categories
+    account_map = {
+        account.id: (account.name, classify_account(account))
+        for account in ChartOfAccount.query.all()
+    }
+
+    activities = {OPERATING: [], INVESTING: [], FINANCING: []}
+    totals = {OPERATING: Decimal('0.00'), INVESTING: Decimal('0.00'), FINANCING: Decimal('0.00')}
+
+    # Calculate beginning cash balance (as of from_date - 1 day); cash is a debit-normal account
+    beginning_date = from_date - timedelta(days=1)
+    beginning_cash = Decimal('0.00')
+    if cash_account_ids:
+        opening = get_account_totals(to_date=beginning_date, account_ids=cash_account_ids)
+        for account_totals in opening.values():
+            beginning_cash += account_totals.debits - account_totals.credits
+
+        cash_line = aliased(JournalEntryLine)
+        counter_line = aliased(JournalEntryLine)
+        cash_account = aliased(ChartOfAccount)
+
+        rows = db.session.query(
+            JournalEntry.id,
+            JournalEntry.date,
+            JournalEntry.memo,
+            JournalEntry.reference,
+            cash_line.debit_amount,
+            cash_line.credit_amount,
+            counter_line.account_id
+        ).join(
+            cash_line,
+            cash_line.journal_entry_id == JournalEntry.id
+        ).join(
+            cash_account,
+            cash_line.account_id == cash_account.id
+        ).join(
+            counter_line,
+            (counter_line.journal_entry_id == JournalEntry.id) & (counter_line.account_id != cash_line.account_id)
+        ).filter(
+            cash_line.account_id.in_(cash_account_ids),
+            JournalEntry.date >= from_date,
+            JournalEntry.date <= to_date,
+            JournalEntry.status == 'POSTED'
+        ).order_by(
+            cash_account.code,
+            JournalEntry.date,
+            cash_line.id,
+            counter_line.id
+        )
+
+        # If this is a cash debit (increase), counter account was credited
+        # If this is a cash credit (decrease), counter account was debited
+        for entry_id, entry_date, memo, reference, debit_amount, credit_amount, counter_account_id in rows:
+            if debit_amount and debit_amount > 0:  # Cash inflow
+                amount = debit_amount
+                flow_type = 'inflow'
+            else:  # Cash outflow
+                amount = credit_amount or Decimal('0.00')
+                flow_type = 'outflow'
+
+            # Skip zero amounts
+            if amount == 0:
+                continue
+
+            counter_name, category = account_map[counter_account_id]
+            activities[category].append({
+                'date': entry_date,
+                'description': f"{memo or 'No description'} - {counter_name}",
+                'amount': amount,
+                'type': flow_type,
+                'reference': reference or f'JE-{entry_id}'
+            })
+
+            if flow_type == 'inflow':
+                totals[category] += amount
+            else:
+                totals[category] -= amount
+
+    # Sort activities by date
+    for activity_list in activities.values():
+        activity_list.sort(key=lambda x: x['date'])
+
+    # Calculate ending cash balance
+    net_change = totals[OPERATING] + totals[INVESTING] + totals[FINANCING]
+
+    return {
+        'operating_activities': activities[OPERATING],
+        'investing_activities': activities[INVESTING],
+        'financing_activities': activities[FINANCING],
+        'total_operating': totals[OPERATING],
+        'total_investing': totals[INVESTING],
+        'total_financing': totals[FINANCING],
+        'beginning_cash': beginning_cash,
+        'ending_cash': beginning_cash + net_change,
+        'net_change': net_change
+    }
@@ -0,0 +1,148 @@
+import os
+import threading
+from collections import Counter
+from datetime import datetime
+from flask import current_app
+from sqlalchemy.dialects import postgresql, sqlite
+from app import db
+from models_accounting import EntryNumberSequence
+
+_INSERT_IGNORE_DIALECTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert
+}
+
+
+def format_entry_number(month, prefix, value):
+    """JE-YYYYMM-PP-NNNNNN; six digits never collide with the older four-digit random suffixes"""
+    return f"JE-{month}-{prefix}-{value:06d}"
+
+
+def counter_key(entry_date, entry_type):
+    """(month, prefix) counter an entry of this date and type is numbered from"""
+    return entry_date.strftime('%Y%m'), (entry_type or 'JE')[:2].upper()
+
+
+def _create_counter(conn, month, prefix):
+    """Create a counter row, doing nothing if another worker just created it"""
+    table = EntryNumberSequence.__table__
+    insert = _INSERT_IGNORE_DIALECTS.get(conn.dialect.name)
+    if insert is not None:
+        conn.execute(insert(table).values(month=month, prefix=prefix, next_value=1)
+                     .on_conflict_do_nothing(index_elements=['month', 'prefix']))
+    else:
+        conn.execute(table.insert().values(month=month, prefix=prefix, next_value=1))
+
+
+def _reserve(conn, month, prefix, size):
+    """
+    Advance a counter by size on conn and return the first reserved value
+
+    The UPDATE locks the counter row until conn's transaction ends.
+    """
+    table = EntryNumberSequence.__table__
+    key = (table.c.month == month) & (table.c.prefix == prefix)
+    advance = table.update().where(key).values(
+        next_value=table.c.next_value + size,
+        updated_at=datetime.utcnow()
+    )
+
+    if not conn.execute(advance).rowcount:
+        _create_counter(conn, month, prefix)
+        conn.execute(advance)
+
+    return conn.execute(table.select().with_only_columns(table.c.next_value).where(key)).scalar() - size
+
+
+class EntryNumberAllocator:
+    """
+    Unique, increasing journal entry numbers per (month, entry type)
+
+    Each process reserves block_size numbers at a time in a short
+    transaction of its own, and hands them out from memory, so concurrent
+    workers only touch the counter row once per block instead of holding
+    its lock for every posting. Numbers are unique across workers and
+    increase within each worker's block; numbers left in a block when a
+    worker exits, or taken by an entry that is rolled back, are skipped.
+
+    With a block size of 0 the counter is advanced inside the caller's
+    transaction instead, which gives gap-free numbering at the cost of
+    serializing postings of the same month and type until they commit.
+    SQLite always works this way: it allows one writer at a time, so a
+    second connection reserving a block would wait on the caller's own
+    transaction.
+    """
+
+    def __init__(self):
+        self._blocks = {}  # (month, prefix) -> [next value, last value]
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def next_number(self, entry_date, entry_type, block_size=None):
+        """
+        Allocate the next entry number for a date and entry type
+
+        Args:
+            entry_date: Date of the journal entry; numbers restart each month
+            entry_type: Entry type; its first two letters become the prefix
+            block_size: Numbers reserved per block (defaults to ENTRY_NUMBER_BLOCK_SIZE)
+
+        Returns:
+            Entry number string
+        """
+        month, prefix = counter_key(entry_date, entry_type)
+        if block_size is None:
+            block_size = current_app.config.get('ENTRY_NUMBER_BLOCK_SIZE', 0)
+
+        if block_size <= 0 or db.engine.dialect.name == 'sqlite':
+            return format_entry_number(month, prefix, _reserve(db.session.connection(), month, prefix, 1))
+
+        with self._lock:
+            # Blocks reserved before a fork belong to the parent process
+            if self._pid != os.getpid():
+                self._blocks = {}
+                self._pid = os.getpid()
+
+            block = self._blocks.get((month, prefix))
+            if block is None or block[0] > block[1]:
+                with db.engine.begin() as conn:
+                    first = _reserve(conn, month, prefix, block_size)
+                block = self._blocks[(month, prefix)] = [first, first + block_size - 1]
+
+            value = block[0]
+            block[0] += 1
+        return format_entry_number(month, prefix, value)
+
+
+allocator = EntryNumberAllocator()
+
+
+def next_entry_number(entry_date, entry_type):
+    """Allocate a journal entry number with the process-wide allocator"""
+    return allocator.next_number(entry_date, entry_type)
+
+
+def reserve_entry_numbers(keys):
+    """
+    Allocate numbers for many entries inside the caller's transaction
+
+    Each counter is advanced once for all of its entries, so a batch gets
+    consecutive, gap-free numbers per month and type; the counters stay
+    locked until the caller commits.
+
+    Args:
+        keys: List of (entry_date, entry_type) tuples, one per entry
+
+    Returns:
+        List of entry numbers in the order of keys
+    """
+    counts = Counter(counter_key(entry_date, entry_type) for entry_date, entry_type in keys)
+    conn = db.session.connection()
+    next_values = {key: _reserve(conn, *key, count) for key, count in sorted(counts.items())}
+
+    numbers = []
+    for entry_date, entry_type in keys:
+        key = counter_key(entry_date, entry_type)
+        numbers.append(format_entry_number(*key, next_values[key]))
+        next_values[key] += 1
+    return numbers
@@ -0,0 +1,275 @@
+import base64
+import json
+import sqlite3
+from datetime import date
+from sqlalchemy import case, func, and_, or_, not_, tuple_
+from app import db
+from models_accounting import ChartOfAccount, JournalEntry, JournalEntryLine, AccountBalanceSnapshot
+from .balances import AccountTotals, _snapshot_periods, to_decimal, ZERO
+
+LEDGER_PAGE_SIZE = 100
+
+
+def encode_cursor(row):
+    """Encode the ordering key of a ledger row as an opaque URL-safe cursor"""
+    key = [row.account_code, row.date.isoformat(), row.entry_id, row.line_id]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Decode a cursor into (account_code, date, entry_id, line_id), or None if invalid"""
+    if not cursor:
+        return None
+    try:
+        code, date_str, entry_id, line_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return code, date.fromisoformat(date_str), int(entry_id), int(line_id)
+    except (ValueError, TypeError):
+        return None
+
+
+def supports_window_functions():
+    """Check if the database can compute running balances with window functions"""
+    if db.engine.dialect.name == 'sqlite':
+        return sqlite3.sqlite_version_info >= (3, 25, 0)
+    return True
+
+
+def _signed_amount():
+    """Line amount on the account's normal balance side"""
+    debit = func.coalesce(JournalEntryLine.debit_amount, 0)
+    credit = func.coalesce(JournalEntryLine.credit_amount, 0)
+    return case(
+        (ChartOfAccount.normal_balance == 'DEBIT', debit - credit),
+        else_=credit - debit
+    )
+
+
+def _filtered(query, account_id=None, from_date=None, to_date=None, entry_type=None):
+    if account_id:
+        query = query.filter(JournalEntryLine.account_id == account_id)
+    if from_date:
+        query = query.filter(JournalEntry.date >= from_date)
+    if to_date:
+        query = query.filter(JournalEntry.date <= to_date)
+    if entry_type:
+        query = query.filter(JournalEntry.entry_type == entry_type)
+    return query
+
+
+def _snapshot_openings(first_rows, snapshot_periods):
+    """Signed snapshot totals of each account's periods in snapshot_periods"""
+    period_ids = {period.id for periods in snapshot_periods.values() for period in periods}
+    if not period_ids:
+        return {}
+
+    accounts = {row.account_id: row for row in first_rows}
+    query = db.session.query(
+        AccountBalanceSnapshot.account_id,
+        AccountBalanceSnapshot.period_id,
+        AccountBalanceSnapshot.debit_total,
+        AccountBalanceSnapshot.credit_total
+    ).filter(
+        AccountBalanceSnapshot.account_id.in_(list(accounts)),
+        AccountBalanceSnapshot.period_id.in_(period_ids)
+    )
+
+    openings = {}
+    for acct_id, period_id, debits, credits in query:
+        if any(period.id == period_id for period in snapshot_periods[acct_id]):
+            balance = AccountTotals(to_decimal(debits), to_decimal(credits)).balance(accounts[acct_id].normal_balance)
+            openings[acct_id] = openings.get(acct_id, ZERO) + balance
+    return openings
+
+
+def _opening_balances(first_rows, account_id, to_date, entry_type):
+    """
+    Running balance before each account's first row on the page
+
+    Closed accounting periods that end before an account's first row are
+    read from the balance snapshots. Every other matching line of the
+    page's accounts that sorts before that account's first row, including
+    lines dated before from_date, is summed in one aggregate. Snapshots
+    hold the posted lines of every entry type, so they are not used when
+    the ledger is filtered by entry type.
+    """
+    if not first_rows:
+        return {}
+
+    snapshot_periods = {}
+    if not entry_type:
+        periods = _snapshot_periods(None, max(row.date for row in first_rows))
+        snapshot_periods = {
+            row.account_id: [period for period in periods if period.end_date < row.date]
+            for row in first_rows
+        }
+    openings = _snapshot_openings(first_rows, snapshot_periods)
+
+    conditions = []
+    for row in first_rows:
+        condition = and_(
+            JournalEntryLine.account_id == row.account_id,
+            tuple_(JournalEntry.date, JournalEntry.id, JournalEntryLine.id) < tuple_(row.date, row.entry_id, row.line_id)
+        )
+        periods = snapshot_periods.get(row.account_id)
+        if periods:
+            # Posted lines of these periods are already in the snapshots
+            condition = and_(condition, or_(
+                JournalEntry.status.is_distinct_from('POSTED'),
+                not_(or_(*[JournalEntry.date.between(period.start_date, period.end_date) for period in periods]))
+            ))
+        conditions.append(condition)
+
+    query = db.session.query(
+        JournalEntryLine.account_id,
+        func.sum(_signed_amount())
+    ).join(
+        JournalEntry,
+        JournalEntryLine.journal_entry_id == JournalEntry.id
+    ).join(
+        ChartOfAccount,
+        JournalEntryLine.account_id == ChartOfAccount.id
+    ).filter(or_(*conditions)).group_by(JournalEntryLine.account_id)
+
+    query = _filtered(query, account_id=account_id, to_date=to_date, entry_type=entry_type)
+
+    for acct_id, total in query:
+        openings[acct_id] = openings.get(acct_id, ZERO) + to_decimal(total)
+    return openings
+
+
+def _ledger_query(account_id=None, from_date=None, to_date=None, entry_type=None):
+    """Ledger rows for the filters, one per journal entry line"""
+    query = db.session.query(
+        JournalEntryLine.id.label('line_id'),
+        JournalEntryLine.description.label('description'),
+        JournalEntryLine.debit_amount.label('debit_amount'),
+        JournalEntryLine.credit_amount.label('credit_amount'),
+        _signed_amount().label('signed_amount'),
+        JournalEntry.id.label('entry_id'),
+        JournalEntry.entry_number.label('entry_number'),
+        JournalEntry.date.label('date'),
+        JournalEntry.memo.label('memo'),
+        JournalEntry.reference.label('reference'),
+        JournalEntry.entry_type.label('entry_type'),
+        ChartOfAccount.id.label('account_id'),
+        ChartOfAccount.code.label('account_code'),
+        ChartOfAccount.name.label('account_name'),
+        ChartOfAccount.normal_balance.label('normal_balance')
+    ).join(
+        JournalEntry,
+        JournalEntryLine.journal_entry_id == JournalEntry.id
+    ).join(
+        ChartOfAccount,
+        JournalEntryLine.account_id == ChartOfAccount.id
+    )
+
+    return _filtered(query, account_id, from_date, to_date, entry_type)
+
+
+def _ordered(query):
+    return query.order_by(
+        ChartOfAccount.code,
+        JournalEntry.date,
+        JournalEntry.id,
+        JournalEntryLine.id
+    )
+
+
+def get_ledger_page(account_id=None, from_date=None, to_date=None, entry_type=None,
+                    cursor=None, per_page=LEDGER_PAGE_SIZE):
+    """
+    Fetch one keyset-paginated page of the general ledger
+
+    Rows are ordered by (account code, date, entry id, line id) and carry a
+    running_balance per account that starts from the account's balance
+    before from_date.
+
+    Returns:
+        Tuple of (rows, next_cursor); next_cursor is None on the last page
+    """
+    query = _ledger_query(account_id, from_date, to_date, entry_type)
+
+    position = decode_cursor(cursor)
+    if position:
+        query = query.filter(
+            tuple_(ChartOfAccount.code, JournalEntry.date, JournalEntry.id, JournalEntryLine.id) > tuple_(*position)
+        )
+
+    # Fetch one extra row to know whether there is a next page
+    query = _ordered(query).limit(per_page + 1)
+
+    if supports_window_functions():
+        page = query.subquery()
+        running = func.sum(page.c.signed_amount).over(
+            partition_by=page.c.account_id,
+            order_by=(page.c.date, page.c.entry_id, page.c.line_id)
+        )
+        rows = db.session.query(page, running.label('page_running')).order_by(
+            page.c.account_code, page.c.date, page.c.entry_id, page.c.line_id
+        ).all()
+    else:
+        rows = query.all()
+
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+
+    first_rows = {}
+    for row in rows:
+        first_rows.setdefault(row.account_id, row)
+    openings = _opening_balances(list(first_rows.values()), account_id, to_date, entry_type)
+
+    results = []
+    page_totals = {}
+    for row in rows:
+        values = row._asdict()
+        if 'page_running' in values:
+            page_running = to_decimal(values.pop('page_running'))
+        else:
+            page_running = page_totals.get(row.account_id, ZERO) + to_decimal(row.signed_amount)
+            page_totals[row.account_id] = page_running
+        values['running_balance'] = openings.get(row.account_id, ZERO) + page_running
+        results.append(values)
+
+    next_cursor = encode_cursor(rows[-1]) if has_next else None
+    return results, next_cursor
+
+
+def iter_ledger_rows(account_id=None, from_date=None, to_date=None, entry_type=None, batch_size=1000):
+    """
+    Stream every matching ledger row with its running balance
+
+    Rows are read from the database in batches of batch_size, so memory
+    stays flat however many lines the ledger holds.
+
+    Yields:
+        Ledger row dictionaries as returned by get_ledger_page
+    """
+    openings = {}
+    if from_date:
+        opening_query = db.session.query(
+            JournalEntryLine.account_id,
+            func.sum(_signed_amount())
+        ).join(
+            JournalEntry,
+            JournalEntryLine.journal_entry_id == JournalEntry.id
+        ).join(
+            ChartOfAccount,
+            JournalEntryLine.account_id == ChartOfAccount.id
+        ).filter(
+            JournalEntry.date < from_date
+        ).group_by(JournalEntryLine.account_id)
+        opening_query = _filtered(opening_query, account_id=account_id, entry_type=entry_type)
+        openings = {acct_id: to_decimal(total) for acct_id, total in opening_query}
+
+    query = _ordered(_ledger_query(account_id, from_date, to_date, entry_type))
+
+    current_account = None
+    balance = ZERO
+    for row in query.yield_per(batch_size):
+        if row.account_id != current_account:
+            current_account = row.account_id
+            balance = openings.get(current_account, ZERO)
+        balance += to_decimal(row.signed_amount)
+        values = row._asdict()
+        values['running_balance'] = balance
+        yield values
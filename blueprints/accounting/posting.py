@@ -0,0 +1,237 @@
+from datetime import date
+from app import db
+from models_accounting import JournalEntry, JournalEntryLine, AccountingPeriod
+from .balances import PeriodIndex, record_posted_batch, to_decimal, ZERO
+from .entry_numbers import next_entry_number, reserve_entry_numbers
+from .reference_data import get_reference_data, invalidate_reference_data
+
+POSTING_BATCH_SIZE = 5000  # Entries per transaction when posting a large backlog
+ID_LOOKUP_CHUNK_SIZE = 1000  # Entry numbers per IN list when reading back new ids
+
+
+class JournalBatchError(ValueError):
+    """An entry of a journal batch cannot be posted; nothing was written"""
+
+
+def _entry_label(position, entry):
+    return f"Entry {position + 1}" + (f" ({entry['reference']})" if entry.get('reference') else '')
+
+
+def _posting_periods(entry_dates, cached):
+    """
+    Period index to pick the open period of each entry from
+
+    Periods are picked from the cached index, then only the periods picked
+    are read again and share-locked until the transaction ends, so none is
+    closed while the batch posts into it. If the cache turns out to be
+    stale for any of them, every period is loaded and locked instead.
+
+    Args:
+        entry_dates: Dates of the entries to post
+        cached: PeriodIndex of the cached reference data
+
+    Returns:
+        PeriodIndex
+    """
+    picked = {cached.open_period_for(entry_date) for entry_date in entry_dates}
+    if None not in picked:
+        locked = AccountingPeriod.query.filter(
+            AccountingPeriod.id.in_([period.id for period in picked])
+        ).with_for_update(read=True).all()
+        current = {(period.id, period.start_date, period.end_date) for period in locked if not period.is_closed}
+        if all((period.id, period.start_date, period.end_date) in current for period in picked):
+            return cached
+
+    invalidate_reference_data()
+    return PeriodIndex.load(lock=True)
+
+
+def post_journal_batch(entries, user_id, status='POSTED', gap_free=False):
+    """
+    Post many system-generated journal entries in one transaction
+
+    Accounts and periods are resolved from the cached reference data; the
+    periods picked are re-read and share-locked in the posting transaction,
+    so none is closed underneath the batch. Every entry is checked to balance while its rows
+    are built, and headers and lines are then written with two bulk
+    inserts. If any entry is invalid nothing is written.
+
+    Args:
+        entries: Iterable of dictionaries with date, entry_type (used for the
+                 entry number), reference, memo and lines. Each line has
+                 debit_amount, credit_amount, an optional description and
+                 either account_id or account (the account name).
+        user_id: User ID recorded as the creator of the entries
+        status: Status of the new entries (defaults to POSTED)
+        gap_free: Number the batch inside this transaction with
+                  reserve_entry_numbers: consecutive numbers per month and
+                  type, with one counter update per month and type, but the
+                  counters stay locked until the batch commits. By default
+                  numbers come from the per-worker blocks of the allocator,
+                  reserved outside this transaction.
+
+    Returns:
+        List of the new journal entry ids, in the order of entries
+
+    Raises:
+        JournalBatchError: If an entry is unbalanced, empty, has negative
+                           amounts, uses an unknown account or has no open
+                           accounting period to post into
+    """
+    entries = list(entries)
+    if not entries:
+        return []
+
+    reference = get_reference_data()
+    entry_dates = [entry.get('date') or date.today() for entry in entries]
+    periods = _posting_periods(entry_dates, reference.periods)
+
+    headers = []
+    entry_lines = []
+    for position, (entry, entry_date) in enumerate(zip(entries, entry_dates)):
+        period = periods.open_period_for(entry_date)
+        if not period:
+            raise JournalBatchError(f"{_entry_label(position, entry)}: no open accounting period")
+
+        lines = []
+        total_debits = total_credits = ZERO
+        for item in entry['lines']:
+            if 'account_id' in item:
+                account_id = item['account_id']
+            else:
+                account = reference.account_by_name(item['account'])
+                if account is None:
+                    raise JournalBatchError(f"{_entry_label(position, entry)}: unknown account {item['account']!r}")
+                account_id = account.id
+
+            debit = to_decimal(item.get('debit_amount', 0))
+            credit = to_decimal(item.get('credit_amount', 0))
+            if debit < 0 or credit < 0:
+                raise JournalBatchError(f"{_entry_label(position, entry)}: negative amount")
+
+            total_debits += debit
+            total_credits += credit
+            lines.append({
+                'account_id': account_id,
+                'description': item.get('description', ''),
+                'debit_amount': debit,
+                'credit_amount': credit
+            })
+
+        if total_debits != total_credits:
+            raise JournalBatchError(
+                f"{_entry_label(position, entry)}: debits {total_debits} do not equal credits {total_credits}"
+            )
+        if total_debits == ZERO:
+            raise JournalBatchError(f"{_entry_label(position, entry)}: no amounts")
+
+        headers.append({
+            'date': entry_date,
+            'period_id': period.id,
+            'memo': entry.get('memo'),
+            'reference': entry.get('reference'),
+            'status': status,
+            'entry_type': 'SYSTEM',  # System-generated entries
+            'created_by': user_id
+        })
+        entry_lines.append(lines)
+
+    try:
+        keys = [(header['date'], entry.get('entry_type')) for header, entry in zip(headers, entries)]
+        if gap_free:
+            numbers = reserve_entry_numbers(keys)
+        else:
+            numbers = [next_entry_number(entry_date, entry_type) for entry_date, entry_type in keys]
+        for header, number in zip(headers, numbers):
+            header['entry_number'] = number
+
+        db.session.execute(JournalEntry.__table__.insert(), headers)
+
+        # Read the new ids back by entry number: RETURNING in parameter order
+        # falls back to one INSERT per row on SQLite
+        entry_ids_by_number = {}
+        for start in range(0, len(numbers), ID_LOOKUP_CHUNK_SIZE):
+            entry_ids_by_number.update(db.session.query(JournalEntry.entry_number, JournalEntry.id).filter(
+                JournalEntry.entry_number.in_(numbers[start:start + ID_LOOKUP_CHUNK_SIZE])
+            ))
+        entry_ids = [entry_ids_by_number[number] for number in numbers]
+
+        db.session.execute(JournalEntryLine.__table__.insert(), [
+            dict(line, journal_entry_id=entry_id)
+            for entry_id, lines in zip(entry_ids, entry_lines)
+            for line in lines
+        ])
+
+        if status == 'POSTED':
+            record_posted_batch(zip((header['date'] for header in headers), entry_lines))
+
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return entry_ids
+
+
+def payment_journal_entry(payment_id, project_name, amount, payment_date):
+    """Batch entry moving a received project payment from Accounts Receivable to Cash"""
+    description = f'Payment received for project {project_name}'
+    return {
+        'date': payment_date,
+        'entry_type': 'PAYMENT',
+        'reference': f'PMT-{payment_id}',
+        'memo': f'Payment for project: {project_name}',
+        'lines': [
+            {'account': 'Cash', 'debit_amount': amount, 'credit_amount': 0, 'description': description},
+            {'account': 'Accounts Receivable', 'debit_amount': 0, 'credit_amount': amount, 'description': description}
+        ]
+    }
+
+
+def post_payment_backlog(user_id, batch_size=POSTING_BATCH_SIZE):
+    """
+    Post journal entries for received project payments that have none yet
+
+    Payments are matched to existing entries by their PMT-<id> reference,
+    so running this again only posts what is still missing. Each batch of
+    entries is committed on its own, numbered gap-free in its own
+    transaction: the backlog runs offline, so holding the counters until
+    each batch commits blocks no request.
+
+    Args:
+        user_id: User ID recorded as the creator of the entries
+        batch_size: Entries posted per transaction
+
+    Returns:
+        Number of journal entries posted
+    """
+    from models import Project, ProjectPayment
+
+    posted_references = {
+        reference for (reference,) in db.session.query(JournalEntry.reference).filter(
+            JournalEntry.reference.like('PMT-%')
+        )
+    }
+
+    payments = db.session.query(
+        ProjectPayment.id,
+        ProjectPayment.amount_received,
+        ProjectPayment.payment_date,
+        Project.name
+    ).join(
+        Project,
+        ProjectPayment.project_id == Project.id
+    ).filter(
+        ProjectPayment.status.in_(['transferred', 'reconciled']),
+        ProjectPayment.amount_received > 0
+    ).order_by(ProjectPayment.id).all()
+
+    pending = [
+        payment_journal_entry(payment_id, project_name, amount, payment_date or date.today())
+        for payment_id, amount, payment_date, project_name in payments
+        if f'PMT-{payment_id}' not in posted_references
+    ]
+
+    for start in range(0, len(pending), batch_size):
+        post_journal_batch(pending[start:start + batch_size], user_id, gap_free=True)
+    return len(pending)
@@ -0,0 +1,135 @@
+import itertools
+import threading
+import time
+from collections import namedtuple
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app import db
+from models_accounting import ChartOfAccount, AccountingPeriod
+from .balances import PeriodIndex
+
+AccountRef = namedtuple('AccountRef', ['id', 'code', 'name', 'account_type', 'normal_balance', 'is_active'])
+PeriodRef = namedtuple('PeriodRef', ['id', 'name', 'start_date', 'end_date', 'is_closed'])
+
+REFERENCE_MODELS = (ChartOfAccount, AccountingPeriod)
+
+
+class ReferenceData:
+    """
+    Read-only snapshot of the chart of accounts and the accounting periods
+
+    Holds plain tuples rather than model objects, so one snapshot can be
+    shared by every request of the process. Periods may be up to
+    REFERENCE_DATA_TTL seconds behind other workers, so posting re-checks
+    the period it picked under a row lock before using it.
+    """
+
+    def __init__(self, accounts, periods):
+        self.accounts = {account.id: account for account in accounts}
+        self.accounts_by_code = {account.code: account for account in accounts}
+        self.accounts_by_name = {}
+        for account in sorted(accounts, key=lambda a: a.id):
+            self.accounts_by_name.setdefault(account.name, account)
+
+        self.periods = PeriodIndex(periods)
+
+    @classmethod
+    def load(cls):
+        accounts = [AccountRef(*row) for row in db.session.query(
+            ChartOfAccount.id, ChartOfAccount.code, ChartOfAccount.name,
+            ChartOfAccount.account_type, ChartOfAccount.normal_balance, ChartOfAccount.is_active
+        )]
+        periods = [PeriodRef(*row) for row in db.session.query(
+            AccountingPeriod.id, AccountingPeriod.name, AccountingPeriod.start_date,
+            AccountingPeriod.end_date, AccountingPeriod.is_closed
+        )]
+        return cls(accounts, periods)
+
+    def account_by_code(self, code):
+        return self.accounts_by_code.get(code)
+
+    def account_by_name(self, name):
+        """Account with this name; the lowest id wins for duplicate names"""
+        return self.accounts_by_name.get(name)
+
+
+_cache = {}  # 'reference' -> (expires_at, generation, ReferenceData)
+_generation = 0  # Number of invalidations so far
+_cache_lock = threading.Lock()
+
+
+def get_reference_data():
+    """
+    Return the per-process reference data snapshot, loading it on a miss
+
+    The snapshot is dropped as soon as this process commits a change to an
+    account or period, and expires after REFERENCE_DATA_TTL seconds so
+    changes committed by other processes are picked up. Inside a
+    transaction that has changed accounts or periods itself, a fresh
+    snapshot that sees those changes is loaded and not cached.
+
+    Returns:
+        ReferenceData
+    """
+    if _pending_changes(db.session):
+        return ReferenceData.load()
+
+    ttl = current_app.config.get('REFERENCE_DATA_TTL', 0)
+    if ttl <= 0:
+        return ReferenceData.load()
+
+    now = time.monotonic()
+    with _cache_lock:
+        generation = _generation
+        entry = _cache.get('reference')
+    if entry and entry[0] > now and entry[1] == generation:
+        return entry[2]
+
+    data = ReferenceData.load()
+    with _cache_lock:
+        # Don't store data loaded while an invalidation happened
+        if _generation == generation:
+            _cache['reference'] = (now + ttl, generation, data)
+    return data
+
+
+def invalidate_reference_data():
+    """Drop the cached reference data snapshot"""
+    global _generation
+    with _cache_lock:
+        _generation += 1
+        _cache.clear()
+
+
+def _pending_changes(session):
+    if session.info.get('reference_data_changed', False):
+        return True
+    # Changes not flushed yet
+    return any(isinstance(obj, REFERENCE_MODELS) for obj in itertools.chain(session.new, session.dirty, session.deleted))
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_flushed_changes(session, flush_context):
+    if any(isinstance(obj, REFERENCE_MODELS) for obj in itertools.chain(session.new, session.dirty, session.deleted)):
+        session.info['reference_data_changed'] = True
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _track_bulk_changes(orm_execute_state):
+    # Bulk query.update()/delete() and insert() statements bypass the flush
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and issubclass(mapper.class_, REFERENCE_MODELS):
+            orm_execute_state.session.info['reference_data_changed'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed_changes(session):
+    if session.info.pop('reference_data_changed', False):
+        invalidate_reference_data()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_rolled_back_changes(session):
+    session.info.pop('reference_data_changed', None)
@@ -2,15 +2,22 @@ from flask import render_template, redirect, url_for, flash, request, jsonify
 from flask_login import login_required, current_user
 from datetime import datetime, date, timedelta
 from decimal import Decimal
-import random
 from sqlalchemy import func
+from sqlalchemy.orm import selectinload, joinedload
 from app import db
-from models_accounting import ChartOfAccount, FiscalYear, AccountingPeriod, JournalEntry, JournalEntryLine
+from list_query import ListQuery, ListFilter, SearchFilter
+from models_accounting import ChartOfAccount, FiscalYear, AccountingPeriod, JournalEntry, JournalEntryLine, AccountBalanceSnapshot
 from models_accounting import Currency, ExchangeRate, Tax, Vendor, VendorInvoice, VendorPayment
 from models_accounting import Customer, CustomerInvoice, CustomerPayment, BankAccount, BankReconciliation, BankTransaction
 from models_accounting import AccountType, DebitCredit
-from utils import generate_csv, generate_pdf, format_currency, export_trial_balance, export_balance_sheet, export_income_statement, export_cash_flow_statement
+from utils import generate_csv, generate_pdf, format_currency, export_trial_balance, export_balance_sheet, export_income_statement, export_cash_flow_statement, export_general_ledger, EXPORT_BATCH_SIZE
+from report_cache import report_cache_key, cached_export_response
 from . import accounting_bp
+from .balances import get_account_totals, apply_balances, preload_account_balances, EMPTY_TOTALS, record_posted_lines, record_posted_entry, ledger_version
+from .cash_flow import build_cash_flow
+from .entry_numbers import next_entry_number
+from .posting import post_journal_batch, JournalBatchError
+from .ledger import get_ledger_page, iter_ledger_rows
 from .forms import ChartOfAccountForm, FiscalYearForm, AccountingPeriodForm, JournalEntryForm, JournalEntryLineForm
 from .forms import CurrencyForm, ExchangeRateForm, TaxForm, VendorForm, VendorInvoiceForm, VendorPaymentForm
 from .forms import CustomerForm, CustomerInvoiceForm, CustomerPaymentForm, BankAccountForm, BankReconciliationForm, BankTransactionForm
@@ -25,67 +32,32 @@ def create_journal_entry(entry_type, transaction_date, reference, memo, line_ite
         transaction_date: Date of the transaction
         reference: Reference number/ID
         memo: Description of the transaction
-        line_items: List of dictionaries with account_id, debit_amount, credit_amount, description
+        line_items: List of dictionaries with account_id (or account, the
+                    account name), debit_amount, credit_amount, description
         user_id: User ID who created the transaction (defaults to current_user.id)
     
     Returns:
         Created JournalEntry object or None if error
     """
     try:
-        # Get the current accounting period
-        current_period = AccountingPeriod.query.filter(
-            AccountingPeriod.start_date <= transaction_date,
-            AccountingPeriod.end_date >= transaction_date,
-            AccountingPeriod.is_closed == False
-        ).first()
-        
-        if not current_period:
-            # Fallback to the most recent period if no matching period found
-            current_period = AccountingPeriod.query.filter(
-                AccountingPeriod.is_closed == False
-            ).order_by(AccountingPeriod.end_date.desc()).first()
-            
-        if not current_period:
-            return None  # No available accounting period
-        
-        # Generate a unique entry number
-        timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-        random_suffix = ''.join(random.choices('0123456789', k=4))
-        entry_number = f"JE-{transaction_date.strftime('%Y%m')}-{entry_type[:2]}-{random_suffix}"
-        
-        # Create journal entry
-        journal_entry = JournalEntry(
-            entry_number=entry_number,
-            date=transaction_date,
-            period_id=current_period.id,
-            memo=memo,
-            reference=reference,
-            status='POSTED',  # Auto-created entries are posted automatically
-            entry_type='SYSTEM',  # System-generated entries
-            created_by=user_id if user_id else current_user.id
-        )
-        
-        db.session.add(journal_entry)
-        db.session.flush()  # Get the ID without committing
-        
-        # Add line items
-        for item in line_items:
-            line = JournalEntryLine(
-                journal_entry_id=journal_entry.id,
-                account_id=item['account_id'],
-                description=item.get('description', ''),
-                debit_amount=item.get('debit_amount', 0),
-                credit_amount=item.get('credit_amount', 0)
-            )
-            db.session.add(line)
-        
-        db.session.commit()
-        return journal_entry
-    
+        entry_ids = post_journal_batch([{
+            'date': transaction_date,
+            'entry_type': entry_type,
+            'reference': reference,
+            'memo': memo,
+            'lines': line_items
+        }], user_id if user_id else current_user.id)
+    except JournalBatchError as e:
+        # Raised before anything is written; the caller's pending changes
+        # are left for it to commit
+        print(f"Error creating journal entry: {str(e)}")
+        return None
     except Exception as e:
         db.session.rollback()
         print(f"Error creating journal entry: {str(e)}")
         return None
+    
+    return db.session.get(JournalEntry, entry_ids[0])
 
 # Initialize default accounting data
 def initialize_accounting():
@@ -203,7 +175,12 @@ def chart_of_accounts():
     # Initialize accounting data if not exists
     initialize_accounting()
     
-    accounts = ChartOfAccount.query.order_by(ChartOfAccount.code).all()
+    accounts = ChartOfAccount.query.options(
+        selectinload(ChartOfAccount.children)
+    ).order_by(ChartOfAccount.code).all()
+    
+    # Load every account balance in one grouped query instead of per row
+    preload_account_balances(accounts)
     
     # Group by account type
     account_groups = {}
@@ -310,6 +287,9 @@ def delete_account(id):
         flash('Cannot delete an account with journal entries.', 'danger')
         return redirect(url_for('accounting.chart_of_accounts'))
     
+    # Snapshots of lines that were posted and later removed stay behind with
+    # zero totals
+    AccountBalanceSnapshot.query.filter_by(account_id=account.id).delete()
     db.session.delete(account)
     db.session.commit()
     
@@ -419,6 +399,23 @@ def year_end():
     check_admin()
     return render_template('accounting/year_end.html', title='Year End Closing')
 
+# The journal grows without bound, so it is paged with cursors
+JOURNAL_LIST = ListQuery(
+    JournalEntry.id,
+    {'date': JournalEntry.date, 'entry_number': JournalEntry.entry_number},
+    '-date',
+    filters={
+        'status': ListFilter(JournalEntry.status),
+        'entry_type': ListFilter(JournalEntry.entry_type),
+        'from_date': ListFilter(JournalEntry.date, type=date, op='ge'),
+        'to_date': ListFilter(JournalEntry.date, type=date, op='le'),
+        'q': SearchFilter(JournalEntry.entry_number, JournalEntry.reference, JournalEntry.memo)
+    },
+    per_page=50,
+    keyset=True,
+    loaders=lambda: [joinedload(JournalEntry.period), joinedload(JournalEntry.user), selectinload(JournalEntry.lines)]
+)
+
 @accounting_bp.route('/journal-entries')
 @login_required
 def journal_entries():
@@ -428,7 +425,7 @@ def journal_entries():
     # Initialize accounting data if not exists
     initialize_accounting()
     
-    entries = JournalEntry.query.order_by(JournalEntry.date.desc()).all()
+    entries = JOURNAL_LIST.apply(JournalEntry.query)
     return render_template('accounting/journal_entries.html', 
                           entries=entries, 
                           title='Journal Entries')
@@ -447,10 +444,6 @@ def new_journal_entry():
     form.period_id.choices = period_choices
     
     if form.validate_on_submit():
-        # Generate a unique entry number - add timestamp to ensure uniqueness
-        now = datetime.now()
-        timestamp = now.strftime('%Y%m%d%H%M%S')
-        
         if form.entry_number.data:
             # Check if user-provided entry number is unique
             existing = JournalEntry.query.filter_by(entry_number=form.entry_number.data).first()
@@ -460,10 +453,7 @@ def new_journal_entry():
                 return render_template('accounting/journal_entry_form.html', form=form, title='New Journal Entry')
             entry_number = form.entry_number.data
         else:
-            # Generate a unique entry number with random suffix to avoid collisions
-            import random
-            random_suffix = random.randint(1000, 9999)
-            entry_number = f"JE-{now.strftime('%Y%m')}-{timestamp[-4:]}-{random_suffix}"
+            entry_number = next_entry_number(form.date.data, form.entry_type.data)
         
         entry = JournalEntry(
             entry_number=entry_number,
@@ -509,6 +499,11 @@ def edit_journal_entry_lines(id):
         )
         
         db.session.add(line)
+        
+        # Lines added to an already posted entry change the posted balances
+        if entry.status == 'POSTED':
+            record_posted_lines(entry.date, [line])
+        
         db.session.commit()
         
         flash('Journal entry line added.', 'success')
@@ -531,6 +526,9 @@ def delete_journal_entry_line(id, line_id):
         flash('Invalid journal entry line.', 'danger')
         return redirect(url_for('accounting.edit_journal_entry_lines', id=id))
     
+    if line.journal_entry.status == 'POSTED':
+        record_posted_lines(line.journal_entry.date, [line], sign=-1)
+    
     db.session.delete(line)
     db.session.commit()
     
@@ -554,6 +552,7 @@ def post_journal_entry(id):
         return redirect(url_for('accounting.edit_journal_entry_lines', id=id))
     
     entry.status = 'POSTED'
+    record_posted_entry(entry)
     db.session.commit()
     
     flash(f'Journal Entry {entry.entry_number} has been posted.', 'success')
@@ -592,38 +591,25 @@ def general_ledger():
         except ValueError:
             pass
     
-    # Base query for journal entry lines with joins
-    query = db.session.query(
-        JournalEntryLine, 
-        JournalEntry, 
-        ChartOfAccount
-    ).join(
-        JournalEntry, 
-        JournalEntryLine.journal_entry_id == JournalEntry.id
-    ).join(
-        ChartOfAccount, 
-        JournalEntryLine.account_id == ChartOfAccount.id
-    )
-    
-    # Apply filters
-    if account_id:
-        query = query.filter(JournalEntryLine.account_id == account_id)
-    
-    if from_date:
-        query = query.filter(JournalEntry.date >= from_date)
-    
-    if to_date:
-        query = query.filter(JournalEntry.date <= to_date)
-    
-    if entry_type:
-        query = query.filter(JournalEntry.entry_type == entry_type)
+    # Stream the whole filtered ledger for CSV exports
+    if request.args.get('export') == 'csv':
+        rows = iter_ledger_rows(
+            account_id=account_id,
+            from_date=from_date,
+            to_date=to_date,
+            entry_type=entry_type,
+            batch_size=EXPORT_BATCH_SIZE
+        )
+        return export_general_ledger(rows, from_date, to_date)
     
-    # Order by account, then date
-    results = query.order_by(
-        ChartOfAccount.code,
-        JournalEntry.date,
-        JournalEntry.id
-    ).all()
+    # Fetch one page of ledger lines, continuing after the cursor if given
+    results, next_cursor = get_ledger_page(
+        account_id=account_id,
+        from_date=from_date,
+        to_date=to_date,
+        entry_type=entry_type,
+        cursor=request.args.get('cursor')
+    )
     
     # Entry types for filter dropdown
     entry_types = [
@@ -641,7 +627,9 @@ def general_ledger():
         selected_account_id=account_id,
         selected_from_date=from_date,
         selected_to_date=to_date,
-        selected_entry_type=entry_type
+        selected_entry_type=entry_type,
+        next_cursor=next_cursor,
+        is_first_page=not request.args.get('cursor')
     )
 
 # Financial Statements Routes
@@ -663,6 +651,14 @@ def balance_sheet():
     else:
         as_of_date = date.today()
     
+    # Serve repeat exports from the report cache
+    cache_key = None
+    if export_format in ['csv', 'pdf']:
+        cache_key = report_cache_key('balance_sheet', export_format, ledger_version(to_date=as_of_date), as_of_date=as_of_date)
+        cached = cached_export_response(cache_key)
+        if cached:
+            return cached
+    
     # Get asset accounts
     asset_accounts = ChartOfAccount.query.filter_by(
         account_type='Asset', 
@@ -681,27 +677,9 @@ def balance_sheet():
         is_active=True
     ).order_by(ChartOfAccount.code).all()
     
-    # Calculate account balances as of the specified date
-    for account in asset_accounts + liability_accounts + equity_accounts:
-        # Get journal entry lines for this account up to the specified date
-        query = JournalEntryLine.query.join(
-            JournalEntry, 
-            JournalEntryLine.journal_entry_id == JournalEntry.id
-        ).filter(
-            JournalEntryLine.account_id == account.id,
-            JournalEntry.date <= as_of_date,
-            JournalEntry.status == 'POSTED'  # Only consider posted entries
-        )
-        
-        # Calculate debits and credits
-        debits = sum(line.debit_amount for line in query.all())
-        credits = sum(line.credit_amount for line in query.all())
-        
-        # Calculate balance based on normal balance type
-        if account.normal_balance == 'DEBIT':
-            account.balance_amount = debits - credits
-        else:  # CREDIT
-            account.balance_amount = credits - debits
+    # Calculate account balances as of the specified date in a single grouped query
+    totals = get_account_totals(to_date=as_of_date)
+    apply_balances(asset_accounts + liability_accounts + equity_accounts, totals)
     
     # Calculate totals
     total_assets = sum(account.balance_amount for account in asset_accounts)
@@ -719,7 +697,8 @@ def balance_sheet():
             total_liabilities, 
             total_equity, 
             as_of_date, 
-            export_format
+            export_format,
+            cache_key
         )
     
     return render_template(
@@ -763,6 +742,14 @@ def income_statement():
     else:
         to_date = date.today()
     
+    # Serve repeat exports from the report cache
+    cache_key = None
+    if export_format in ['csv', 'pdf']:
+        cache_key = report_cache_key('income_statement', export_format, ledger_version(from_date=from_date, to_date=to_date), from_date=from_date, to_date=to_date)
+        cached = cached_export_response(cache_key)
+        if cached:
+            return cached
+    
     # Get revenue accounts
     revenue_accounts = ChartOfAccount.query.filter_by(
         account_type='Revenue', 
@@ -775,28 +762,9 @@ def income_statement():
         is_active=True
     ).order_by(ChartOfAccount.code).all()
     
-    # Calculate account balances for the specified period
-    for account in revenue_accounts + expense_accounts:
-        # Get journal entry lines for this account within the specified period
-        query = JournalEntryLine.query.join(
-            JournalEntry, 
-            JournalEntryLine.journal_entry_id == JournalEntry.id
-        ).filter(
-            JournalEntryLine.account_id == account.id,
-            JournalEntry.date >= from_date,
-            JournalEntry.date <= to_date,
-            JournalEntry.status == 'POSTED'  # Only consider posted entries
-        )
-        
-        # Calculate debits and credits
-        debits = sum(line.debit_amount for line in query.all())
-        credits = sum(line.credit_amount for line in query.all())
-        
-        # Calculate balance based on normal balance type
-        if account.normal_balance == 'DEBIT':
-            account.balance_amount = debits - credits
-        else:  # CREDIT
-            account.balance_amount = credits - debits
+    # Calculate account balances for the specified period in a single grouped query
+    totals = get_account_totals(from_date=from_date, to_date=to_date)
+    apply_balances(revenue_accounts + expense_accounts, totals)
     
     # Calculate totals
     total_revenue = sum(account.balance_amount for account in revenue_accounts)
@@ -813,7 +781,8 @@ def income_statement():
             net_income, 
             from_date, 
             to_date, 
-            export_format
+            export_format,
+            cache_key
         )
     
     return render_template(
@@ -856,178 +825,33 @@ def cash_flow_statement():
     else:
         to_date = date.today()
     
-    # Get cash and bank accounts
-    cash_accounts = ChartOfAccount.query.filter(
-        ChartOfAccount.account_type == 'Asset',
-        ChartOfAccount.is_active == True,
-        (ChartOfAccount.name.like('%Cash%') | ChartOfAccount.name.like('%Bank%'))
-    ).order_by(ChartOfAccount.code).all()
+    # Serve repeat exports from the report cache
+    cache_key = None
+    if export_format in ['csv', 'pdf']:
+        cache_key = report_cache_key('cash_flow', export_format, ledger_version(to_date=to_date), from_date=from_date, to_date=to_date)
+        cached = cached_export_response(cache_key)
+        if cached:
+            return cached
     
-    # Get all journal entries related to cash flow categories within the date range
-    # Categorize transactions by cash flow type
-    operating_activities = []
-    investing_activities = []
-    financing_activities = []
-    
-    # Initialize totals
-    total_operating = Decimal('0.00')
-    total_investing = Decimal('0.00')
-    total_financing = Decimal('0.00')
-    beginning_cash = Decimal('0.00')
-    ending_cash = Decimal('0.00')
-    
-    # Calculate beginning cash balance (as of from_date - 1 day)
-    beginning_date = from_date - timedelta(days=1)
-    
-    for cash_account in cash_accounts:
-        # Get beginning balance
-        query = JournalEntryLine.query.join(
-            JournalEntry, 
-            JournalEntryLine.journal_entry_id == JournalEntry.id
-        ).filter(
-            JournalEntryLine.account_id == cash_account.id,
-            JournalEntry.date <= beginning_date,
-            JournalEntry.status == 'POSTED'
-        )
-        
-        debits = sum(line.debit_amount for line in query.all())
-        credits = sum(line.credit_amount for line in query.all())
-        
-        # Cash is a debit-normal account
-        beginning_cash += (debits - credits)
-        
-        # Find all transactions within the period for categorization
-        transactions = JournalEntryLine.query.join(
-            JournalEntry, 
-            JournalEntryLine.journal_entry_id == JournalEntry.id
-        ).filter(
-            JournalEntryLine.account_id == cash_account.id,
-            JournalEntry.date >= from_date,
-            JournalEntry.date <= to_date,
-            JournalEntry.status == 'POSTED'
-        ).order_by(JournalEntry.date).all()
-        
-        # For each cash transaction, find the counter account to categorize
-        for line in transactions:
-            # Get the journal entry this line belongs to
-            journal_entry = JournalEntry.query.get(line.journal_entry_id)
-            
-            # Find counter accounts (other lines in the same entry)
-            counter_lines = JournalEntryLine.query.filter(
-                JournalEntryLine.journal_entry_id == journal_entry.id,
-                JournalEntryLine.account_id != cash_account.id
-            ).all()
-            
-            # If this is a cash debit (increase), counter account was credited
-            # If this is a cash credit (decrease), counter account was debited
-            for counter_line in counter_lines:
-                counter_account = ChartOfAccount.query.get(counter_line.account_id)
-                
-                # Determine the amount and direction (inflow or outflow)
-                amount = Decimal('0.00')
-                if line.debit_amount > 0:  # Cash inflow
-                    amount = line.debit_amount
-                    flow_type = 'inflow'
-                else:  # Cash outflow
-                    amount = line.credit_amount
-                    flow_type = 'outflow'
-                
-                # Skip zero amounts
-                if amount == 0:
-                    continue
-                
-                # Categorize based on counter account type
-                # This is a simplified categorization - in a production system
-                # you might want more specific rules
-                
-                # Revenue and expense accounts typically represent operating activities
-                if counter_account.account_type in ['Revenue', 'Expense']:
-                    category = 'Operating'
-                    operating_activities.append({
-                        'date': journal_entry.date,
-                        'description': f"{journal_entry.memo or 'No description'} - {counter_account.name}",
-                        'amount': amount,
-                        'type': flow_type,
-                        'reference': journal_entry.reference or f'JE-{journal_entry.id}'
-                    })
-                    
-                    if flow_type == 'inflow':
-                        total_operating += amount
-                    else:
-                        total_operating -= amount
-                
-                # Long-term assets typically represent investing activities
-                elif counter_account.account_type == 'Asset' and 'long-term' in counter_account.name.lower():
-                    category = 'Investing'
-                    investing_activities.append({
-                        'date': journal_entry.date,
-                        'description': f"{journal_entry.memo or 'No description'} - {counter_account.name}",
-                        'amount': amount,
-                        'type': flow_type,
-                        'reference': journal_entry.reference or f'JE-{journal_entry.id}'
-                    })
-                    
-                    if flow_type == 'inflow':
-                        total_investing += amount
-                    else:
-                        total_investing -= amount
-                
-                # Liabilities and equity typically represent financing activities
-                elif counter_account.account_type in ['Liability', 'Equity']:
-                    category = 'Financing'
-                    financing_activities.append({
-                        'date': journal_entry.date,
-                        'description': f"{journal_entry.memo or 'No description'} - {counter_account.name}",
-                        'amount': amount,
-                        'type': flow_type,
-                        'reference': journal_entry.reference or f'JE-{journal_entry.id}'
-                    })
-                    
-                    if flow_type == 'inflow':
-                        total_financing += amount
-                    else:
-                        total_financing -= amount
-                
-                # Default to operating activities for anything else
-                else:
-                    category = 'Operating'
-                    operating_activities.append({
-                        'date': journal_entry.date,
-                        'description': f"{journal_entry.memo or 'No description'} - {counter_account.name}",
-                        'amount': amount,
-                        'type': flow_type,
-                        'reference': journal_entry.reference or f'JE-{journal_entry.id}'
-                    })
-                    
-                    if flow_type == 'inflow':
-                        total_operating += amount
-                    else:
-                        total_operating -= amount
-    
-    # Calculate ending cash balance
-    net_change = total_operating + total_investing + total_financing
-    ending_cash = beginning_cash + net_change
-    
-    # Sort activities by date
-    operating_activities.sort(key=lambda x: x['date'])
-    investing_activities.sort(key=lambda x: x['date'])
-    financing_activities.sort(key=lambda x: x['date'])
+    # Classify all cash transactions for the period in one pass
+    cash_flow = build_cash_flow(from_date, to_date)
     
     # Handle export requests
     if export_format in ['csv', 'pdf']:
         return export_cash_flow_statement(
-            operating_activities,
-            investing_activities,
-            financing_activities,
-            total_operating,
-            total_investing,
-            total_financing,
-            beginning_cash,
-            ending_cash,
-            net_change,
+            cash_flow['operating_activities'],
+            cash_flow['investing_activities'],
+            cash_flow['financing_activities'],
+            cash_flow['total_operating'],
+            cash_flow['total_investing'],
+            cash_flow['total_financing'],
+            cash_flow['beginning_cash'],
+            cash_flow['ending_cash'],
+            cash_flow['net_change'],
             from_date,
             to_date,
-            export_format
+            export_format,
+            cache_key
         )
     
     return render_template(
@@ -1035,15 +859,7 @@ def cash_flow_statement():
         title='Cash Flow Statement',
         from_date=from_date,
         to_date=to_date,
-        operating_activities=operating_activities,
-        investing_activities=investing_activities,
-        financing_activities=financing_activities,
-        total_operating=total_operating,
-        total_investing=total_investing,
-        total_financing=total_financing,
-        beginning_cash=beginning_cash,
-        ending_cash=ending_cash,
-        net_change=net_change
+        **cash_flow
     )
 
 @accounting_bp.route('/trial_balance', methods=['GET'])
@@ -1063,6 +879,14 @@ def trial_balance():
     else:
         as_of_date = date.today()
     
+    # Serve repeat exports from the report cache
+    cache_key = None
+    if export_format in ['csv', 'pdf']:
+        cache_key = report_cache_key('trial_balance', export_format, ledger_version(to_date=as_of_date), as_of_date=as_of_date)
+        cached = cached_export_response(cache_key)
+        if cached:
+            return cached
+    
     # Get all active accounts
     accounts = ChartOfAccount.query.filter_by(
         is_active=True
@@ -1072,21 +896,11 @@ def trial_balance():
     total_debits = Decimal('0.00')
     total_credits = Decimal('0.00')
     
-    # Calculate account balances as of the specified date
+    # Calculate account balances as of the specified date in a single grouped query
+    totals = get_account_totals(to_date=as_of_date)
+    
     for account in accounts:
-        # Get journal entry lines for this account up to the specified date
-        query = JournalEntryLine.query.join(
-            JournalEntry, 
-            JournalEntryLine.journal_entry_id == JournalEntry.id
-        ).filter(
-            JournalEntryLine.account_id == account.id,
-            JournalEntry.date <= as_of_date,
-            JournalEntry.status == 'POSTED'  # Only consider posted entries
-        )
-        
-        # Calculate debits and credits
-        debits = sum(line.debit_amount for line in query.all())
-        credits = sum(line.credit_amount for line in query.all())
+        debits, credits = totals.get(account.id, EMPTY_TOTALS)
         
         # Only include accounts with non-zero balances
         if debits > 0 or credits > 0:
@@ -1109,7 +923,7 @@ def trial_balance():
     # Handle export requests
     if export_format in ['csv', 'pdf']:
         from utils import export_trial_balance
-        return export_trial_balance(accounts_with_balances, total_debits, total_credits, as_of_date, export_format)
+        return export_trial_balance(accounts_with_balances, total_debits, total_credits, as_of_date, export_format, cache_key)
     
     return render_template(
         'accounting/trial_balance.html',
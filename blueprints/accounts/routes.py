@@ -3,6 +3,7 @@ from flask_login import login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash
 from wtforms import BooleanField
 from app import db
+from list_query import ListQuery, ListFilter, SearchFilter
 from models import User
 from blueprints.accounts.forms import LoginForm, RegistrationForm, ProfileForm
 
@@ -75,6 +76,16 @@ def profile():
     
     return render_template('accounts/profile.html', form=form)
 
+USER_LIST = ListQuery(
+    User.id,
+    {'username': User.username, 'email': User.email, 'created_at': User.created_at},
+    'username',
+    filters={
+        'department': ListFilter(User.department),
+        'q': SearchFilter(User.username, User.email)
+    }
+)
+
 @accounts_bp.route('/users')
 @login_required
 def user_list():
@@ -82,7 +93,7 @@ def user_list():
         flash('Access denied. Admin privileges required.', 'danger')
         return redirect(url_for('project_management.dashboard'))
     
-    users = User.query.all()
+    users = USER_LIST.apply(User.query)
     return render_template('accounts/user_list.html', users=users)
 
 @accounts_bp.route('/edit_user/<int:id>', methods=['GET', 'POST'])
@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta
+from sqlalchemy import tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from app import db
+from models import Attendance
+
+UPSERT_BATCH_SIZE = 500  # Rows per INSERT statement
+
+_UPSERT_DIALECTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert
+}
+
+
+def date_range(start_date, end_date, skip_weekends=False):
+    """List the dates from start_date to end_date, inclusive"""
+    dates = [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+    if skip_weekends:
+        dates = [day for day in dates if day.weekday() < 5]
+    return dates
+
+
+def upsert_attendance(rows, update_columns=()):
+    """
+    Insert attendance rows, resolving (employee_id, date) conflicts in bulk
+
+    On PostgreSQL and SQLite this is an INSERT ... ON CONFLICT against the
+    unique_employee_attendance_date constraint, one statement per
+    UPSERT_BATCH_SIZE rows. Other databases load the conflicting rows with
+    one IN query per batch and split inserts from updates.
+
+    Args:
+        rows: List of dictionaries with employee_id, date and other
+              Attendance columns; every row must have the same keys
+        update_columns: Columns overwritten on existing records; when
+                        empty, existing records are left untouched
+
+    Returns:
+        Number of rows processed
+    """
+    if not rows:
+        return 0
+
+    now = datetime.utcnow()
+    rows = [dict(row, created_at=now, updated_at=now) for row in rows]
+    update_columns = list(update_columns)
+    insert = _UPSERT_DIALECTS.get(db.engine.dialect.name)
+
+    for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+        batch = rows[start:start + UPSERT_BATCH_SIZE]
+        if insert is not None:
+            stmt = insert(Attendance).values(batch)
+            if update_columns:
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=['employee_id', 'date'],
+                    set_={**{column: stmt.excluded[column] for column in update_columns}, 'updated_at': now}
+                )
+            else:
+                stmt = stmt.on_conflict_do_nothing(index_elements=['employee_id', 'date'])
+            db.session.execute(stmt)
+        else:
+            _merge_batch(batch, update_columns, now)
+
+    return len(rows)
+
+
+def _merge_batch(batch, update_columns, now):
+    keys = [(row['employee_id'], row['date']) for row in batch]
+    existing = {
+        (employee_id, day): attendance_id
+        for attendance_id, employee_id, day in db.session.query(
+            Attendance.id, Attendance.employee_id, Attendance.date
+        ).filter(tuple_(Attendance.employee_id, Attendance.date).in_(keys))
+    }
+
+    new_rows = [row for row in batch if (row['employee_id'], row['date']) not in existing]
+    if new_rows:
+        db.session.execute(db.insert(Attendance), new_rows)
+
+    if update_columns:
+        updates = [
+            dict({column: row[column] for column in update_columns}, id=existing[key], updated_at=now)
+            for key, row in zip(keys, batch) if key in existing
+        ]
+        if updates:
+            db.session.execute(db.update(Attendance), updates)
+
+
+def mark_attendance(employee_ids, dates, status, overwrite=False):
+    """
+    Create attendance records for every employee on every date
+
+    Args:
+        employee_ids: Employees to mark
+        dates: Dates to mark
+        status: Attendance status of the new records
+        overwrite: Also set the status of records that already exist
+
+    Returns:
+        Number of employee days processed
+    """
+    rows = [
+        {'employee_id': employee_id, 'date': day, 'status': status}
+        for day in dates
+        for employee_id in employee_ids
+    ]
+    return upsert_attendance(rows, update_columns=('status',) if overwrite else ())
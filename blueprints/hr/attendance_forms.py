@@ -22,6 +22,9 @@ class AttendanceForm(FlaskForm):
 class AttendanceBulkForm(FlaskForm):
     """Form for bulk attendance update"""
     date = DateField('Date', validators=[DataRequired()])
+    end_date = DateField('End Date (optional)', validators=[Optional()])
+    department = SelectField('Department', validators=[Optional()])
+    skip_weekends = BooleanField('Skip Weekends in Date Range', default=True)
     mark_all_present = BooleanField('Mark All Present', default=False)
     submit = SubmitField('Update Attendance')
 
@@ -41,4 +44,13 @@ class PayrollCalculationForm(FlaskForm):
     bonus = StringField('Bonus', validators=[Optional()])
     deductions = StringField('Deductions', validators=[Optional()])
     payment_date = DateField('Payment Date', validators=[DataRequired()])
-    submit = SubmitField('Calculate Payroll')
\ No newline at end of file
+    submit = SubmitField('Calculate Payroll')
+
+class PayrollRunForm(FlaskForm):
+    """Form for running payroll for all employees at once"""
+    department = SelectField('Department', validators=[Optional()])
+    pay_period_start = DateField('Pay Period Start', validators=[DataRequired()])
+    pay_period_end = DateField('Pay Period End', validators=[DataRequired()])
+    attendance_based = BooleanField('Calculate Based on Attendance', default=True)
+    payment_date = DateField('Payment Date', validators=[DataRequired()])
+    submit = SubmitField('Run Payroll')
@@ -0,0 +1,229 @@
+import csv
+import io
+import json
+from datetime import datetime, time
+from sqlalchemy import tuple_
+from app import db
+from models import Employee, Attendance
+from blueprints.hr.attendance_bulk import upsert_attendance
+
+INGEST_BUFFER_SIZE = 5000  # Employee days reduced in memory before they are written
+MAX_REPORTED_ERRORS = 20
+
+IN_EVENTS = ('in', 'check-in', 'check_in')
+OUT_EVENTS = ('out', 'check-out', 'check_out')
+
+
+class EventError(ValueError):
+    """Raised for an attendance event that cannot be ingested"""
+
+
+def parse_late_cutoff(value):
+    """Parse the ATTENDANCE_LATE_CUTOFF setting (HH:MM) into a time"""
+    if isinstance(value, time):
+        return value
+    return datetime.strptime(value, '%H:%M').time()
+
+
+def iter_json_events(stream):
+    """
+    Read events from a JSON body holding an array of events, or an object
+    with an "events" array
+
+    Unlike NDJSON and CSV, the whole body is parsed at once; large batches
+    should use one of those streaming formats.
+
+    Yields:
+        Tuple of (event number, event)
+
+    Raises:
+        ValueError: If the body is not valid JSON or holds no events array
+    """
+    payload = json.load(io.TextIOWrapper(stream, encoding='utf-8'))
+    events = payload.get('events') if isinstance(payload, dict) else payload
+    if not isinstance(events, list):
+        raise ValueError('expected an array of events')
+    yield from enumerate(events, start=1)
+
+
+def iter_ndjson_events(stream):
+    """
+    Read newline-delimited JSON events one line at a time, so the body is
+    never held in memory at once
+
+    Yields:
+        Tuple of (line number, raw JSON line)
+    """
+    for number, line in enumerate(io.TextIOWrapper(stream, encoding='utf-8'), start=1):
+        if line.strip():
+            yield number, line
+
+
+def iter_csv_events(stream):
+    """
+    Read events from a CSV request body with an employee_id, timestamp and
+    event header row, one row at a time
+
+    Yields:
+        Tuple of (row number, event dictionary)
+    """
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8', newline=''))
+    for number, row in enumerate(reader, start=2):
+        yield number, row
+
+
+def parse_event(event):
+    """
+    Validate one event
+
+    Args:
+        event: Dictionary, or JSON object text, with employee_id, timestamp
+               (ISO 8601) and event ('in' or 'out')
+
+    Returns:
+        Tuple of (employee_id, timestamp, is_check_in)
+
+    Raises:
+        EventError: If the event is incomplete or malformed
+    """
+    if isinstance(event, str):
+        try:
+            event = json.loads(event)
+        except ValueError:
+            raise EventError('invalid JSON')
+    if not isinstance(event, dict):
+        raise EventError('event must be an object')
+    try:
+        employee_id = int(event['employee_id'])
+        timestamp = datetime.fromisoformat(str(event['timestamp']).strip())
+        kind = str(event['event']).strip().lower()
+    except KeyError as e:
+        raise EventError(f'missing field {e.args[0]}')
+    except (TypeError, ValueError) as e:
+        raise EventError(str(e))
+
+    if kind in IN_EVENTS:
+        return employee_id, timestamp, True
+    if kind in OUT_EVENTS:
+        return employee_id, timestamp, False
+    raise EventError(f'unknown event type {kind!r}')
+
+
+class AttendanceIngestor:
+    """
+    Reduce check-in/check-out events into attendance records
+
+    Events are folded into one entry per employee and day holding the
+    earliest check-in and the latest check-out. Every INGEST_BUFFER_SIZE
+    employee days the buffer is merged with the stored records and
+    upserted in bulk; because first-in/last-out is a min/max, flushing
+    part of a day early gives the same result as flushing it once.
+    """
+
+    def __init__(self, late_cutoff, buffer_size=INGEST_BUFFER_SIZE):
+        self.late_cutoff = parse_late_cutoff(late_cutoff)
+        self.buffer_size = buffer_size
+        self.buffer = {}  # (employee_id, date) -> [first check-in, last check-out, event count]
+        self.known_employees = set()
+        self.events = 0
+        self.employee_days = 0
+        self.rejected = 0
+        self.errors = []
+
+    def reject(self, number, message):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f'Event {number}: {message}')
+
+    def add(self, number, event):
+        """Add one raw event; malformed events are rejected and reported"""
+        try:
+            employee_id, timestamp, is_check_in = parse_event(event)
+        except EventError as e:
+            self.reject(number, str(e))
+            return
+
+        times = self.buffer.setdefault((employee_id, timestamp.date()), [None, None, 0])
+        times[2] += 1
+        moment = timestamp.time()
+        if is_check_in:
+            if times[0] is None or moment < times[0]:
+                times[0] = moment
+        elif times[1] is None or moment > times[1]:
+            times[1] = moment
+
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered employee days"""
+        if not self.buffer:
+            return
+        buffer, self.buffer = self.buffer, {}
+
+        employee_ids = {employee_id for employee_id, _ in buffer} - self.known_employees
+        if employee_ids:
+            self.known_employees.update(
+                employee_id for (employee_id,) in db.session.query(Employee.id).filter(Employee.id.in_(employee_ids))
+            )
+        for key in [key for key in buffer if key[0] not in self.known_employees]:
+            employee_id, day = key
+            self.rejected += buffer.pop(key)[2]
+            if len(self.errors) < MAX_REPORTED_ERRORS:
+                self.errors.append(f'Employee {employee_id} on {day}: unknown employee')
+        if not buffer:
+            return
+
+        existing = {
+            (record.employee_id, record.date): record
+            for record in db.session.query(
+                Attendance.employee_id, Attendance.date, Attendance.check_in_time,
+                Attendance.check_out_time, Attendance.status
+            ).filter(tuple_(Attendance.employee_id, Attendance.date).in_(list(buffer)))
+        }
+
+        rows = []
+        for (employee_id, day), (check_in, check_out, count) in buffer.items():
+            self.events += count
+            record = existing.get((employee_id, day))
+            status = None
+            if record:
+                check_in = min(filter(None, (check_in, record.check_in_time)), default=None)
+                check_out = max(filter(None, (check_out, record.check_out_time)), default=None)
+                status = record.status
+            rows.append({
+                'employee_id': employee_id,
+                'date': day,
+                'check_in_time': check_in,
+                'check_out_time': check_out,
+                'status': self.derive_status(check_in, status)
+            })
+
+        upsert_attendance(rows, update_columns=('check_in_time', 'check_out_time', 'status'))
+        self.employee_days += len(rows)
+
+    def derive_status(self, check_in, current_status=None):
+        """Late after the cutoff, otherwise present; half days set by HR are kept"""
+        if current_status == 'half-day':
+            return current_status
+        if check_in and check_in > self.late_cutoff:
+            return 'late'
+        return 'present'
+
+    def ingest(self, events):
+        """
+        Ingest an iterable of (number, event) pairs and write the result
+
+        Returns:
+            Dictionary with events, employee_days, rejected and errors
+        """
+        for number, event in events:
+            self.add(number, event)
+        self.flush()
+
+        return {
+            'events': self.events,
+            'employee_days': self.employee_days,
+            'rejected': self.rejected,
+            'errors': self.errors
+        }
@@ -0,0 +1,84 @@
+from sqlalchemy import func
+from app import db
+from models import Attendance
+
+ATTENDANCE_STATUSES = ('present', 'absent', 'late', 'half-day')
+
+
+def get_attendance_counts(start_date, end_date, employee_ids=None):
+    """
+    Count attendance records per employee and status with one grouped query
+
+    Args:
+        start_date: First day of the period
+        end_date: Last day of the period (inclusive)
+        employee_ids: Only count these employees (optional)
+
+    Returns:
+        Dictionary of employee_id -> {status: count}. Employees without
+        records in the period are omitted.
+    """
+    query = db.session.query(
+        Attendance.employee_id,
+        Attendance.status,
+        func.count(Attendance.id)
+    ).filter(
+        Attendance.date >= start_date,
+        Attendance.date <= end_date
+    )
+    if employee_ids is not None:
+        query = query.filter(Attendance.employee_id.in_(employee_ids))
+    query = query.group_by(Attendance.employee_id, Attendance.status)
+
+    counts = {}
+    for employee_id, status, count in query:
+        counts.setdefault(employee_id, {})[status] = count
+    return counts
+
+
+def build_attendance_summary(status_counts, start_date, end_date):
+    """
+    Turn one employee's status counts into an attendance summary
+
+    Args:
+        status_counts: Dictionary of status -> count
+        start_date: First day of the period
+        end_date: Last day of the period (inclusive)
+
+    Returns:
+        Dictionary as returned by Employee.get_attendance_summary
+    """
+    total_days = (end_date - start_date).days + 1
+    present_days = status_counts.get('present', 0)
+
+    return {
+        'total_days': total_days,
+        'present_days': present_days,
+        'absent_days': status_counts.get('absent', 0),
+        'late_days': status_counts.get('late', 0),
+        'half_day_days': status_counts.get('half-day', 0),
+        'attendance_percentage': (present_days / total_days * 100) if total_days > 0 else 0
+    }
+
+
+def get_attendance_summaries(start_date, end_date, employee_ids=None):
+    """
+    Attendance summaries for many employees from a single query
+
+    Args:
+        start_date: First day of the period
+        end_date: Last day of the period (inclusive)
+        employee_ids: Employees to summarize
+
+    Returns:
+        Dictionary of employee_id -> summary; every requested employee is
+        included, with zero counts if they have no records
+    """
+    counts = get_attendance_counts(start_date, end_date, employee_ids)
+    if employee_ids is None:
+        employee_ids = counts.keys()
+
+    return {
+        employee_id: build_attendance_summary(counts.get(employee_id, {}), start_date, end_date)
+        for employee_id in employee_ids
+    }
@@ -0,0 +1,123 @@
+from decimal import Decimal, ROUND_HALF_UP
+from sqlalchemy import insert
+from app import db
+from models import Employee, Payroll
+from blueprints.hr.attendance_stats import get_attendance_summaries
+
+CENT = Decimal('0.01')
+LATE_DAY_RATE = Decimal('0.5')  # Late days are paid at half the daily rate
+
+
+def count_business_days(start_date, end_date):
+    """
+    Count weekdays (Monday to Friday) between two dates, inclusive
+
+    Whole weeks contribute five days each, so only the remaining zero to
+    six days are looked at one by one.
+    """
+    if end_date < start_date:
+        return 0
+
+    weeks, extra_days = divmod((end_date - start_date).days + 1, 7)
+    first_weekday = start_date.weekday()
+    return weeks * 5 + sum(1 for offset in range(extra_days) if (first_weekday + offset) % 7 < 5)
+
+
+def calculate_attendance_pay(salary, working_days, attendance_summary):
+    """
+    Salary earned for the attended days of a period
+
+    Args:
+        salary: Salary for the whole period
+        working_days: Number of working days in the period
+        attendance_summary: Summary as returned by Employee.get_attendance_summary
+
+    Returns:
+        Dictionary with daily_salary, present_salary, late_salary and total_salary
+    """
+    salary = Decimal(salary or 0)
+    daily_salary = salary / working_days if working_days > 0 else Decimal(0)
+    present_salary = daily_salary * attendance_summary['present_days']
+    late_salary = daily_salary * LATE_DAY_RATE * attendance_summary['late_days']
+
+    return {
+        'daily_salary': daily_salary,
+        'present_salary': present_salary,
+        'late_salary': late_salary,
+        'total_salary': (present_salary + late_salary).quantize(CENT, rounding=ROUND_HALF_UP)
+    }
+
+
+def run_payroll(pay_period_start, pay_period_end, payment_date, attendance_based=True, department=None):
+    """
+    Create pending payroll records for every employee in one transaction
+
+    Attendance for all employees is counted with one grouped query and the
+    payroll rows are written with a single bulk insert. Employees who
+    already have a payroll record for exactly this period are skipped, so
+    re-running a period does not pay anyone twice.
+
+    Args:
+        pay_period_start: First day of the pay period
+        pay_period_end: Last day of the pay period
+        payment_date: Date the payroll will be paid
+        attendance_based: Pay attended days only instead of the full salary
+        department: Only run payroll for this department (optional)
+
+    Returns:
+        Tuple of (number of records created, number of employees skipped,
+        total net pay)
+    """
+    query = db.session.query(Employee.id, Employee.salary)
+    if department:
+        query = query.filter(Employee.department == department)
+    employees = query.order_by(Employee.id).all()
+
+    already_paid = {
+        employee_id for (employee_id,) in db.session.query(Payroll.employee_id).filter(
+            Payroll.pay_period_start == pay_period_start,
+            Payroll.pay_period_end == pay_period_end
+        )
+    }
+    skipped = sum(1 for employee in employees if employee.id in already_paid)
+    employees = [employee for employee in employees if employee.id not in already_paid]
+
+    if attendance_based:
+        working_days = count_business_days(pay_period_start, pay_period_end)
+        summaries = get_attendance_summaries(pay_period_start, pay_period_end, [e.id for e in employees])
+
+    rows = []
+    total_net_pay = Decimal(0)
+    for employee in employees:
+        row = {
+            'employee_id': employee.id,
+            'pay_period_start': pay_period_start,
+            'pay_period_end': pay_period_end,
+            'base_salary': employee.salary,
+            'attendance_based': attendance_based,
+            'bonus': Decimal(0),
+            'deductions': Decimal(0),
+            'payment_date': payment_date,
+            'status': 'pending'
+        }
+        if attendance_based:
+            summary = summaries[employee.id]
+            pay = calculate_attendance_pay(employee.salary, working_days, summary)
+            row.update({
+                'attendance_salary': pay['total_salary'],
+                'present_days': summary['present_days'],
+                'absent_days': summary['absent_days'],
+                'late_days': summary['late_days'],
+                'net_pay': pay['total_salary']
+            })
+        else:
+            row['net_pay'] = Decimal(employee.salary)
+
+        total_net_pay += row['net_pay']
+        rows.append(row)
+
+    if rows:
+        db.session.execute(insert(Payroll), rows)
+    db.session.commit()
+
+    return len(rows), skipped, total_net_pay
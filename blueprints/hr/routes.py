@@ -1,14 +1,90 @@
 from datetime import datetime, timedelta, date
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, current_app
 from flask_login import login_required, current_user
+from sqlalchemy.orm import joinedload
 from app import db
 from models import Employee, Leave, Payroll, User, Attendance
 from blueprints.hr.forms import EmployeeForm, LeaveForm, PayrollForm
-from blueprints.hr.attendance_forms import AttendanceForm, AttendanceBulkForm, AttendanceReportForm, PayrollCalculationForm
-from utils import generate_csv, generate_pdf, format_currency
+from blueprints.hr.attendance_forms import AttendanceForm, AttendanceBulkForm, AttendanceReportForm, PayrollCalculationForm, PayrollRunForm
+from blueprints.hr.attendance_stats import get_attendance_summaries
+from blueprints.hr.attendance_bulk import date_range, mark_attendance
+from blueprints.hr.attendance_ingest import AttendanceIngestor, iter_csv_events, iter_json_events, iter_ndjson_events
+from blueprints.hr.payroll_run import run_payroll
+from utils import generate_csv, generate_pdf, format_currency, EXPORT_BATCH_SIZE
+from list_query import ListQuery, ListFilter, SearchFilter
 
 hr_bp = Blueprint('hr', __name__, url_prefix='/hr')
 
+MAX_BULK_ATTENDANCE_DAYS = 366
+
+EMPLOYEE_LIST = ListQuery(
+    Employee.id,
+    sort_columns={
+        'id': Employee.id,
+        'name': Employee.last_name,
+        'department': Employee.department,
+        'position': Employee.position,
+        'hire_date': Employee.hire_date,
+        'salary': Employee.salary
+    },
+    default_sort='id',
+    filters={
+        'department': ListFilter(Employee.department),
+        'search': SearchFilter(Employee.first_name, Employee.last_name, Employee.position)
+    }
+)
+
+LEAVE_LIST = ListQuery(
+    Leave.id,
+    sort_columns={
+        'start_date': Leave.start_date,
+        'end_date': Leave.end_date,
+        'leave_type': Leave.leave_type,
+        'status': Leave.status
+    },
+    default_sort='-start_date',
+    filters={
+        'status': ListFilter(Leave.status),
+        'leave_type': ListFilter(Leave.leave_type),
+        'employee_id': ListFilter(Leave.employee_id, type=int)
+    },
+    loaders=lambda: [joinedload(Leave.employee)]
+)
+
+PAYROLL_LIST = ListQuery(
+    Payroll.id,
+    sort_columns={
+        'payment_date': Payroll.payment_date,
+        'pay_period_start': Payroll.pay_period_start,
+        'net_pay': Payroll.net_pay,
+        'status': Payroll.status
+    },
+    default_sort='-payment_date',
+    filters={
+        'status': ListFilter(Payroll.status),
+        'employee_id': ListFilter(Payroll.employee_id, type=int)
+    },
+    loaders=lambda: [joinedload(Payroll.employee)]
+)
+
+# Attendance grows by one row per employee per day, so it is keyset-paged
+ATTENDANCE_LIST = ListQuery(
+    Attendance.id,
+    sort_columns={
+        'date': Attendance.date
+    },
+    default_sort='-date',
+    filters={
+        'employee_id': ListFilter(Attendance.employee_id, type=int),
+        'status': ListFilter(Attendance.status),
+        'start_date': ListFilter(Attendance.date, type=date, op='ge'),
+        'end_date': ListFilter(Attendance.date, type=date, op='le')
+    },
+    per_page=50,
+    keyset=True,
+    loaders=lambda: [joinedload(Attendance.employee)]
+)
+
 @hr_bp.before_request
 @login_required
 def check_access():
@@ -19,15 +95,16 @@ def check_access():
     # For other users, only allow access to view their own employee profile and leave requests
     # Block access to sensitive HR functions (employee list, payroll, attendance management)
     if request.endpoint in ['hr.attendance', 'hr.new_attendance', 'hr.bulk_attendance', 
-                          'hr.payroll', 'hr.new_payroll', 'hr.calculate_payroll', 
+                          'hr.payroll', 'hr.new_payroll', 'hr.calculate_payroll', 'hr.payroll_run',
                           'hr.employees', 'hr.new_employee']:
         flash('Access denied. You need HR privileges to access this section.', 'danger')
         return redirect(url_for('project_management.dashboard'))
 
 @hr_bp.route('/employees')
 def employees():
-    employees = Employee.query.all()
-    return render_template('hr/employees.html', employees=employees)
+    employees = EMPLOYEE_LIST.apply(Employee.query)
+    departments = [department for (department,) in db.session.query(Employee.department).distinct().order_by(Employee.department)]
+    return render_template('hr/employees.html', employees=employees, departments=departments)
 
 @hr_bp.route('/employees/new', methods=['GET', 'POST'])
 def new_employee():
@@ -110,21 +187,21 @@ def export_employees():
         flash('Access denied. Admin or HR privileges required.', 'danger')
         return redirect(url_for('hr.employees'))
     
-    employees = Employee.query.all()
     headers = ['ID', 'Name', 'Department', 'Position', 'Hire Date', 'Salary']
     
-    data = []
-    for emp in employees:
-        data.append({
-            'ID': emp.id,
-            'Name': emp.full_name,
-            'Department': emp.department,
-            'Position': emp.position,
-            'Hire Date': emp.hire_date.strftime('%Y-%m-%d'),
-            'Salary': format_currency(emp.salary)
-        })
-    
-    return generate_csv(data, 'employees')
+    def rows():
+        # Stream employees in batches instead of loading them all at once
+        for emp in Employee.query.order_by(Employee.id).yield_per(EXPORT_BATCH_SIZE):
+            yield [
+                emp.id,
+                emp.full_name,
+                emp.department,
+                emp.position,
+                emp.hire_date.strftime('%Y-%m-%d'),
+                format_currency(emp.salary)
+            ]
+    
+    return generate_csv(rows(), 'employees', headers=headers)
 
 @hr_bp.route('/employees/report')
 def employee_report():
@@ -146,7 +223,7 @@ def employee_report():
 def leaves():
     # If user is admin or in HR department, show all leaves
     if current_user.is_admin or current_user.department == 'hr':
-        leaves = Leave.query.order_by(Leave.start_date.desc()).all()
+        leaves = LEAVE_LIST.apply(Leave.query)
         return render_template('hr/leaves.html', leaves=leaves, show_all=True)
     else:
         # Regular employees can only see their own leave requests
@@ -154,7 +231,7 @@ def leaves():
         if not employee:
             flash('You are not registered as an employee.', 'warning')
             return redirect(url_for('project_management.dashboard'))
-        leaves = Leave.query.filter_by(employee_id=employee.id).order_by(Leave.start_date.desc()).all()
+        leaves = LEAVE_LIST.apply(Leave.query.filter_by(employee_id=employee.id))
         return render_template('hr/leaves.html', leaves=leaves, show_all=False)
 
 @hr_bp.route('/leaves/new', methods=['GET', 'POST'])
@@ -272,7 +349,7 @@ def payroll():
         flash('Access denied. Admin or HR privileges required.', 'danger')
         return redirect(url_for('hr.employees'))
     
-    payrolls = Payroll.query.order_by(Payroll.payment_date.desc()).all()
+    payrolls = PAYROLL_LIST.apply(Payroll.query)
     return render_template('hr/payroll.html', payrolls=payrolls)
 
 @hr_bp.route('/payroll/new', methods=['GET', 'POST'])
@@ -349,25 +426,7 @@ def attendance():
     if current_user.is_admin or current_user.department == 'hr':
         # Admins and HR can see all attendance records
         query = Attendance.query
-        
-        # Filter by employee if specified
-        employee_id = request.args.get('employee_id', type=int)
-        if employee_id:
-            query = query.filter_by(employee_id=employee_id)
-        
-        # Filter by date range if specified
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
-        if start_date and end_date:
-            try:
-                start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-                end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-                query = query.filter(Attendance.date >= start_date, Attendance.date <= end_date)
-            except ValueError:
-                flash('Invalid date format. Use YYYY-MM-DD.', 'danger')
-        
-        attendance_records = query.order_by(Attendance.date.desc()).all()
-        employees = Employee.query.all()
+        employees = Employee.query.order_by(Employee.first_name, Employee.last_name).all()
     else:
         # Regular users can only see their own attendance
         employee = Employee.query.filter_by(user_id=current_user.id).first()
@@ -375,11 +434,65 @@ def attendance():
             flash('You are not registered as an employee.', 'warning')
             return redirect(url_for('project_management.dashboard'))
         
-        attendance_records = Attendance.query.filter_by(employee_id=employee.id).order_by(Attendance.date.desc()).all()
+        query = Attendance.query.filter_by(employee_id=employee.id)
         employees = [employee]
     
+    attendance_records = ATTENDANCE_LIST.apply(query)
+    
     return render_template('hr/attendance.html', attendance_records=attendance_records, employees=employees)
 
+@hr_bp.route('/attendance/export')
+def export_attendance():
+    """Export attendance records to CSV"""
+    if not current_user.is_admin and not current_user.department == 'hr':
+        flash('Access denied. Admin or HR privileges required.', 'danger')
+        return redirect(url_for('hr.attendance'))
+    
+    query = db.session.query(
+        Attendance.date,
+        Employee.first_name,
+        Employee.last_name,
+        Employee.department,
+        Attendance.status,
+        Attendance.check_in_time,
+        Attendance.check_out_time,
+        Attendance.remarks
+    ).join(Employee, Attendance.employee_id == Employee.id)
+    
+    # Apply the same filters as the attendance list
+    employee_id = request.args.get('employee_id', type=int)
+    if employee_id:
+        query = query.filter(Attendance.employee_id == employee_id)
+    
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    if start_date and end_date:
+        try:
+            start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+            end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+            query = query.filter(Attendance.date >= start_date, Attendance.date <= end_date)
+        except ValueError:
+            flash('Invalid date format. Use YYYY-MM-DD.', 'danger')
+            return redirect(url_for('hr.attendance'))
+    
+    headers = ['Date', 'Employee', 'Department', 'Status', 'Check In', 'Check Out', 'Remarks']
+    
+    def rows():
+        # Stream plain columns in batches; no ORM objects are kept around
+        query_rows = query.order_by(Attendance.date.desc(), Attendance.id).yield_per(EXPORT_BATCH_SIZE)
+        for record in query_rows:
+            yield [
+                record.date.strftime('%Y-%m-%d'),
+                f"{record.first_name} {record.last_name}",
+                record.department,
+                record.status,
+                record.check_in_time.strftime('%H:%M') if record.check_in_time else '',
+                record.check_out_time.strftime('%H:%M') if record.check_out_time else '',
+                record.remarks or ''
+            ]
+    
+    return generate_csv(rows(), 'attendance', headers=headers)
+
 @hr_bp.route('/attendance/new', methods=['GET', 'POST'])
 def new_attendance():
     """Create a new attendance record"""
@@ -460,28 +573,35 @@ def bulk_attendance():
         return redirect(url_for('hr.attendance'))
     
     form = AttendanceBulkForm()
+    departments = [d for (d,) in db.session.query(Employee.department).distinct().order_by(Employee.department)]
+    form.department.choices = [('', 'All Departments')] + [(d, d) for d in departments]
     
     if form.validate_on_submit():
-        date = form.date.data
-        employees = Employee.query.all()
+        start_date = form.date.data
+        end_date = form.end_date.data or start_date
         
-        for employee in employees:
-            # Check if attendance record already exists
-            existing = Attendance.query.filter_by(employee_id=employee.id, date=date).first()
-            
-            if existing:
-                # Update existing record if mark all present is checked
-                if form.mark_all_present.data:
-                    existing.status = 'present'
-                    db.session.add(existing)
-            else:
-                # Create new record
-                attendance = Attendance(
-                    employee_id=employee.id,
-                    date=date,
-                    status='present' if form.mark_all_present.data else 'absent'
-                )
-                db.session.add(attendance)
+        if start_date > end_date:
+            flash('Start date cannot be after end date.', 'danger')
+            return render_template('hr/attendance_bulk_form.html', form=form, title='Bulk Attendance Update')
+        
+        if (end_date - start_date).days >= MAX_BULK_ATTENDANCE_DAYS:
+            flash(f'Bulk attendance covers at most {MAX_BULK_ATTENDANCE_DAYS} days at a time.', 'danger')
+            return render_template('hr/attendance_bulk_form.html', form=form, title='Bulk Attendance Update')
+        
+        query = db.session.query(Employee.id)
+        if form.department.data:
+            query = query.filter(Employee.department == form.department.data)
+        employee_ids = [employee_id for (employee_id,) in query]
+        
+        # A single date is always marked; weekends are only skipped in ranges
+        dates = date_range(start_date, end_date, skip_weekends=form.skip_weekends.data and end_date > start_date)
+        
+        # Mark All Present overwrites existing records; otherwise only
+        # employees without a record are added, as absent
+        if form.mark_all_present.data:
+            mark_attendance(employee_ids, dates, 'present', overwrite=True)
+        else:
+            mark_attendance(employee_ids, dates, 'absent')
         
         db.session.commit()
         flash('Bulk attendance records updated successfully!', 'success')
@@ -489,6 +609,45 @@ def bulk_attendance():
     
     return render_template('hr/attendance_bulk_form.html', form=form, title='Bulk Attendance Update')
 
+@hr_bp.route('/attendance/events', methods=['POST'])
+def ingest_attendance_events():
+    """
+    Ingest a batch of check-in/check-out events
+    
+    The body is a JSON array of events (application/json), one JSON event
+    per line (application/x-ndjson) or CSV with an employee_id, timestamp,
+    event header (text/csv). NDJSON and CSV are read one event at a time;
+    a JSON body is parsed whole, so large batches should use those
+    formats. Each event has an employee_id, an ISO 8601
+    timestamp and an event of 'in' or 'out'. Events are reduced to one
+    attendance record per employee and day (first check-in, last
+    check-out) and written in bulk; check-ins after ATTENDANCE_LATE_CUTOFF
+    are marked late.
+    """
+    if not current_user.is_admin and not current_user.department == 'hr':
+        return jsonify({'error': 'Admin or HR privileges required.'}), 403
+    
+    content_type = request.mimetype
+    if content_type == 'application/json':
+        events = iter_json_events(request.stream)
+    elif content_type in ('application/x-ndjson', 'application/jsonl'):
+        events = iter_ndjson_events(request.stream)
+    elif content_type == 'text/csv':
+        events = iter_csv_events(request.stream)
+    else:
+        return jsonify({'error': 'Send application/json, application/x-ndjson or text/csv.'}), 415
+    
+    ingestor = AttendanceIngestor(current_app.config['ATTENDANCE_LATE_CUTOFF'])
+    try:
+        result = ingestor.ingest(events)
+    except ValueError as e:
+        # Unreadable body (e.g. invalid JSON array or encoding)
+        db.session.rollback()
+        return jsonify({'error': f'Could not read events: {e}'}), 400
+    
+    db.session.commit()
+    return jsonify(result)
+
 @hr_bp.route('/attendance/report', methods=['GET', 'POST'])
 def attendance_report():
     """Generate attendance report"""
@@ -509,16 +668,13 @@ def attendance_report():
         
         # Generate report
         if form.employee_id.data == 0:
-            # Report for all employees
+            # Report for all employees, summarized in one grouped query
             employees = Employee.query.all()
-            attendance_data = []
-            
-            for employee in employees:
-                attendance_summary = employee.get_attendance_summary(start_date, end_date)
-                attendance_data.append({
-                    'employee': employee,
-                    'summary': attendance_summary
-                })
+            summaries = get_attendance_summaries(start_date, end_date, [e.id for e in employees])
+            attendance_data = [
+                {'employee': employee, 'summary': summaries[employee.id]}
+                for employee in employees
+            ]
             
             return render_template(
                 'hr/attendance_report.html',
@@ -584,3 +740,34 @@ def calculate_payroll():
         return redirect(url_for('hr.payroll_detail', id=payroll.id))
     
     return render_template('hr/payroll_calculation_form.html', form=form, title='Calculate Payroll')
+
+@hr_bp.route('/payroll/run', methods=['GET', 'POST'])
+def payroll_run():
+    """Create payroll records for all employees of a pay period at once"""
+    if not current_user.is_admin and not current_user.department == 'hr':
+        flash('Access denied. Admin or HR privileges required.', 'danger')
+        return redirect(url_for('hr.payroll'))
+    
+    form = PayrollRunForm()
+    departments = [d for (d,) in db.session.query(Employee.department).distinct().order_by(Employee.department)]
+    form.department.choices = [('', 'All Departments')] + [(d, d) for d in departments]
+    
+    if form.validate_on_submit():
+        if form.pay_period_start.data > form.pay_period_end.data:
+            flash('Pay period start cannot be after pay period end.', 'danger')
+            return render_template('hr/payroll_run_form.html', form=form, title='Run Payroll')
+        
+        created, skipped, total_net_pay = run_payroll(
+            form.pay_period_start.data,
+            form.pay_period_end.data,
+            form.payment_date.data,
+            attendance_based=form.attendance_based.data,
+            department=form.department.data or None
+        )
+        
+        flash(f'Payroll run created {created} payroll records totalling {format_currency(total_net_pay)}.', 'success')
+        if skipped:
+            flash(f'{skipped} employees already had payroll for this period and were skipped.', 'info')
+        return redirect(url_for('hr.payroll'))
+    
+    return render_template('hr/payroll_run_form.html', form=form, title='Run Payroll')
@@ -0,0 +1,48 @@
+import os
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, send_file, abort
+from flask_login import login_required, current_user
+from app import db
+from models import ReportJob
+
+jobs_bp = Blueprint('jobs', __name__, url_prefix='/jobs')
+
+def get_user_job(id):
+    """Fetch a job, allowing access only to its owner and admins"""
+    job = ReportJob.query.get_or_404(id)
+    if not current_user.is_admin and job.user_id != current_user.id:
+        abort(404)
+    return job
+
+@jobs_bp.route('/<int:id>')
+@login_required
+def job_status(id):
+    """Show the status of a report job; poll with ?format=json"""
+    job = get_user_job(id)
+    
+    if request.args.get('format') == 'json':
+        data = job.to_dict()
+        data['download_url'] = url_for('jobs.download_job', id=job.id) if job.status == 'completed' else None
+        return jsonify(data)
+    
+    return render_template('jobs/job_status.html', job=job, title='Report Export')
+
+@jobs_bp.route('/<int:id>/download')
+@login_required
+def download_job(id):
+    """Download the result of a completed report job"""
+    job = get_user_job(id)
+    
+    if job.status != 'completed':
+        flash('This report is not ready yet.', 'warning')
+        return redirect(url_for('jobs.job_status', id=job.id))
+    
+    if not job.result_path or not os.path.exists(job.result_path):
+        flash('The report file is no longer available. Please export it again.', 'danger')
+        return redirect(url_for('jobs.job_status', id=job.id))
+    
+    return send_file(
+        job.result_path,
+        mimetype='application/pdf',
+        as_attachment=True,
+        download_name=job.filename
+    )
@@ -0,0 +1,29 @@
+from flask import Blueprint, render_template, redirect, url_for, flash, current_app
+from flask_login import login_required, current_user
+from request_metrics import get_metrics_store
+
+metrics_bp = Blueprint('metrics', __name__, url_prefix='/metrics')
+
+@metrics_bp.before_request
+@login_required
+def check_access():
+    if not current_user.is_admin:
+        flash('Access denied. Admin privileges required.', 'danger')
+        return redirect(url_for('project_management.dashboard'))
+
+@metrics_bp.route('/')
+def request_metrics():
+    """Per-endpoint query counts and latency percentiles"""
+    return render_template(
+        'metrics/request_metrics.html',
+        enabled=current_app.config['REQUEST_METRICS'],
+        window=current_app.config['REQUEST_METRICS_WINDOW'],
+        endpoints=get_metrics_store().report()
+    )
+
+@metrics_bp.route('/reset', methods=['POST'])
+def reset_metrics():
+    """Discard the recorded samples"""
+    get_metrics_store().reset()
+    flash('Request metrics have been reset.', 'success')
+    return redirect(url_for('metrics.request_metrics'))
@@ -0,0 +1,226 @@
+import itertools
+import threading
+import time
+from flask import current_app
+from sqlalchemy import case, event, func, select
+from sqlalchemy.orm import Session
+from app import db
+from models import Project, Task, Employee, Leave, Payroll, Attendance, Sales, ProjectPayment
+
+# Statistics kinds that must be recomputed when rows of a model change
+INVALIDATED_BY = {
+    Task: ('projects', 'tasks'),
+    Project: ('projects',),
+    Employee: ('hr',),
+    Leave: ('hr',),
+    Attendance: ('hr',),
+    Payroll: ('hr',),
+    Sales: ('accounting',),
+    ProjectPayment: ('accounting',)
+}
+
+_cache = {}  # (kind, scope) -> (expires_at, generation, value)
+_generations = {}  # kind -> number of invalidations so far
+_cache_lock = threading.Lock()
+
+
+def cached_stats(kind, scope, compute):
+    """
+    Return statistics from the per-process cache, computing them on a miss
+
+    Entries expire after DASHBOARD_STATS_TTL seconds and are dropped as
+    soon as this process commits a change to a model they depend on (see
+    INVALIDATED_BY). Changes committed by other processes are picked up
+    when the entry expires.
+
+    Args:
+        kind: Statistics kind, e.g. 'projects' or 'hr'
+        scope: Part of the cache key, e.g. a user id or None for org-wide
+        compute: Function computing the statistics dictionary
+
+    Returns:
+        A copy of the statistics dictionary
+    """
+    ttl = current_app.config.get('DASHBOARD_STATS_TTL', 0)
+    if ttl <= 0:
+        return compute()
+
+    key = (kind, scope)
+    now = time.monotonic()
+    with _cache_lock:
+        generation = _generations.get(kind, 0)
+        entry = _cache.get(key)
+    if entry and entry[0] > now and entry[1] == generation:
+        return dict(entry[2])
+
+    value = compute()
+    with _cache_lock:
+        # Don't store values computed while an invalidation happened
+        if _generations.get(kind, 0) == generation:
+            _cache[key] = (now + ttl, generation, value)
+    return dict(value)
+
+
+def invalidate_stats(kinds):
+    """Drop cached statistics of the given kinds"""
+    with _cache_lock:
+        for kind in kinds:
+            _generations[kind] = _generations.get(kind, 0) + 1
+        for key in [key for key in _cache if key[0] in kinds]:
+            del _cache[key]
+
+
+def _pending_kinds(session):
+    return session.info.setdefault('dashboard_stats_changed', set())
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_flushed_changes(session, flush_context):
+    kinds = _pending_kinds(session)
+    for obj in itertools.chain(session.new, session.dirty, session.deleted):
+        kinds.update(INVALIDATED_BY.get(type(obj), ()))
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _track_bulk_changes(orm_execute_state):
+    # Bulk query.update()/delete() and insert() statements bypass the flush
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None:
+            _pending_kinds(orm_execute_state.session).update(INVALIDATED_BY.get(mapper.class_, ()))
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed_changes(session):
+    kinds = session.info.pop('dashboard_stats_changed', None)
+    if kinds:
+        invalidate_stats(kinds)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_rolled_back_changes(session):
+    session.info.pop('dashboard_stats_changed', None)
+
+
+def assigned_project_ids(user_id):
+    """Subquery of the projects in which the user has assigned tasks"""
+    return select(Task.project_id).where(Task.user_id == user_id).distinct()
+
+
+def get_project_stats(user_id=None):
+    """
+    Count projects by status with one grouped query
+
+    Args:
+        user_id: Only count projects the user has tasks in (optional)
+
+    Returns:
+        Dictionary with total, completed, in_progress and planning counts
+    """
+    def compute():
+        query = db.session.query(Project.status, func.count(Project.id))
+        if user_id is not None:
+            query = query.filter(Project.id.in_(assigned_project_ids(user_id)))
+        counts = dict(query.group_by(Project.status).all())
+
+        return {
+            'total': sum(counts.values()),
+            'completed': counts.get('completed', 0),
+            'in_progress': counts.get('in-progress', 0),
+            'planning': counts.get('planning', 0)
+        }
+
+    return cached_stats('projects', user_id, compute)
+
+
+def get_task_stats(user_id=None):
+    """
+    Count tasks by status, plus urgent tasks, with one grouped query
+
+    Args:
+        user_id: Only count tasks assigned to this user (optional)
+
+    Returns:
+        Dictionary with total, completed, in_progress, todo, in_review and
+        urgent counts
+    """
+    def compute():
+        query = db.session.query(
+            Task.status,
+            func.count(Task.id),
+            func.sum(case((Task.priority == 'urgent', 1), else_=0))
+        )
+        if user_id is not None:
+            query = query.filter(Task.user_id == user_id)
+
+        counts = {}
+        urgent = 0
+        for status, count, urgent_count in query.group_by(Task.status):
+            counts[status] = count
+            urgent += urgent_count or 0
+
+        return {
+            'total': sum(counts.values()),
+            'completed': counts.get('completed', 0),
+            'in_progress': counts.get('in-progress', 0),
+            'todo': counts.get('to-do', 0),
+            'in_review': counts.get('in-review', 0),
+            'urgent': urgent
+        }
+
+    return cached_stats('tasks', user_id, compute)
+
+
+def get_hr_stats(today):
+    """
+    HR dashboard counters in a single query
+
+    Args:
+        today: Date to count attendance records for
+
+    Returns:
+        Dictionary with total_employees, total_leaves, pending_leaves,
+        attendance_today and payrolls_pending
+    """
+    def compute():
+        row = db.session.execute(select(
+            select(func.count(Employee.id)).scalar_subquery().label('total_employees'),
+            select(func.count(Leave.id)).scalar_subquery().label('total_leaves'),
+            select(func.count(Leave.id)).where(Leave.status == 'pending').scalar_subquery().label('pending_leaves'),
+            select(func.count(Attendance.id)).where(Attendance.date == today).scalar_subquery().label('attendance_today'),
+            select(func.count(Payroll.id)).where(Payroll.status == 'pending').scalar_subquery().label('payrolls_pending')
+        )).one()
+
+        return dict(row._mapping)
+
+    return cached_stats('hr', today, compute)
+
+
+def get_accounting_stats():
+    """
+    Accounting dashboard counters in a single query
+
+    Returns:
+        Dictionary with total_sales, pending_payments, total_revenue and
+        outstanding_amount
+    """
+    def compute():
+        pending_payments = select(func.count(ProjectPayment.id)).where(
+            ProjectPayment.status.in_(['pending', 'in-review'])
+        ).scalar_subquery()
+
+        total_sales, total_revenue, outstanding_amount, pending = db.session.query(
+            func.count(Sales.id),
+            func.sum(Sales.received_amount),
+            func.sum(Sales.difference),
+            pending_payments
+        ).one()
+
+        return {
+            'total_sales': total_sales,
+            'pending_payments': pending,
+            'total_revenue': total_revenue or 0,
+            'outstanding_amount': outstanding_amount or 0
+        }
+
+    return cached_stats('accounting', None, compute)
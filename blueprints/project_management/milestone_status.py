@@ -0,0 +1,126 @@
+from sqlalchemy.exc import IntegrityError
+from app import db
+from models import ProjectMilestone, ProjectTaskCounter
+from blueprints.project_management.progress import get_project_task_counts
+
+
+def _adjust_counter(project_id, total_delta, completed_delta):
+    """
+    Apply a change to a project's task counter in SQL
+
+    A project without a counter row yet is counted from its tasks instead,
+    after flushing so the count includes the change being recorded. The
+    row is inserted in a savepoint: if another transaction created it
+    first, its count cannot have seen this uncommitted change, so the
+    change is applied to that row as an increment instead.
+    """
+    def increment():
+        return ProjectTaskCounter.query.filter_by(project_id=project_id).update({
+            ProjectTaskCounter.total_tasks: ProjectTaskCounter.total_tasks + total_delta,
+            ProjectTaskCounter.completed_tasks: ProjectTaskCounter.completed_tasks + completed_delta
+        }, synchronize_session=False)
+
+    if increment():
+        return
+
+    db.session.flush()
+    total, completed = get_project_task_counts([project_id]).get(project_id, (0, 0))
+    try:
+        with db.session.begin_nested():
+            db.session.execute(ProjectTaskCounter.__table__.insert().values(
+                project_id=project_id,
+                total_tasks=total,
+                completed_tasks=completed
+            ))
+    except IntegrityError:
+        increment()
+
+
+def complete_milestones_if_done(project_id):
+    """
+    Mark pending milestones completed once every task of the project is
+
+    Returns:
+        Number of milestones updated
+    """
+    counter = db.session.query(
+        ProjectTaskCounter.total_tasks,
+        ProjectTaskCounter.completed_tasks
+    ).filter_by(project_id=project_id).first()
+
+    if not counter or counter.total_tasks == 0 or counter.completed_tasks < counter.total_tasks:
+        return 0
+
+    return ProjectMilestone.query.filter_by(
+        project_id=project_id,
+        status='pending'
+    ).update({ProjectMilestone.status: 'completed'}, synchronize_session='fetch')
+
+
+# Task events; call after changing the session and before committing
+
+def task_created(task):
+    """Count a new task"""
+    completed = task.status == 'completed'
+    _adjust_counter(task.project_id, 1, 1 if completed else 0)
+    if completed:
+        complete_milestones_if_done(task.project_id)
+
+
+def task_deleted(task):
+    """Stop counting a deleted task"""
+    _adjust_counter(task.project_id, -1, -1 if task.status == 'completed' else 0)
+
+
+def task_status_changed(task, old_status):
+    """
+    Record a task status change
+
+    When the task becomes completed and it was the last open task of its
+    project, the project's pending milestones are completed. Costs a
+    constant number of queries regardless of the number of tasks.
+    """
+    delta = (task.status == 'completed') - (old_status == 'completed')
+    if delta:
+        _adjust_counter(task.project_id, 0, delta)
+
+    if task.status == 'completed':
+        complete_milestones_if_done(task.project_id)
+
+
+def reconcile_milestones():
+    """
+    Rebuild every project's task counter from the tasks and complete the
+    pending milestones of projects whose tasks are all completed
+
+    Returns:
+        Tuple of (number of counters corrected, number of milestones completed)
+    """
+    counts = get_project_task_counts()
+    counters = {counter.project_id: counter for counter in ProjectTaskCounter.query.all()}
+
+    corrected = 0
+    for project_id in set(counts) | set(counters):
+        total, completed = counts.get(project_id, (0, 0))
+        counter = counters.get(project_id)
+        if not counter:
+            counter = ProjectTaskCounter(project_id=project_id)
+            db.session.add(counter)
+        if (counter.total_tasks, counter.completed_tasks) != (total, completed):
+            counter.total_tasks = total
+            counter.completed_tasks = completed
+            corrected += 1
+
+    done_project_ids = [
+        project_id for project_id, (total, completed) in counts.items()
+        if total > 0 and completed == total
+    ]
+    milestones_completed = 0
+    if done_project_ids:
+        milestones_completed = ProjectMilestone.query.filter(
+            ProjectMilestone.project_id.in_(done_project_ids),
+            ProjectMilestone.status == 'pending'
+        ).update({ProjectMilestone.status: 'completed'}, synchronize_session=False)
+
+    db.session.commit()
+    return corrected, milestones_completed
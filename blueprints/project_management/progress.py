@@ -0,0 +1,83 @@
+from flask import g, has_app_context
+from sqlalchemy import case, event, func
+from sqlalchemy.orm import Session
+from app import db
+from models import Task
+
+
+def get_project_task_counts(project_ids=None):
+    """
+    Count total and completed tasks per project with one grouped query
+
+    Args:
+        project_ids: Only count tasks of these projects (optional)
+
+    Returns:
+        Dictionary of project_id -> (total, completed). Projects without
+        tasks are omitted.
+    """
+    query = db.session.query(
+        Task.project_id,
+        func.count(Task.id),
+        func.sum(case((Task.status == 'completed', 1), else_=0))
+    )
+    if project_ids is not None:
+        query = query.filter(Task.project_id.in_(project_ids))
+    query = query.group_by(Task.project_id)
+
+    return {project_id: (total, completed or 0) for project_id, total, completed in query}
+
+
+def preload_project_progress(projects):
+    """
+    Attach task counts to projects so Project.progress needs no queries
+
+    Args:
+        projects: List of Project objects
+    """
+    if not projects:
+        return
+    counts = get_project_task_counts([project.id for project in projects])
+    for project in projects:
+        project.preload_task_counts(*counts.get(project.id, (0, 0)))
+
+
+def _request_task_counts():
+    """Per-request cache of task counts: (loaded project ids, project counts)"""
+    if not has_app_context():
+        return set(), {}
+    if 'task_counts' not in g:
+        g.task_counts = (set(), {})
+    return g.task_counts
+
+
+@event.listens_for(Session, 'after_commit')
+def _clear_request_task_counts(session):
+    # Counts read before a commit may no longer be right
+    if has_app_context():
+        g.pop('task_counts', None)
+
+
+def get_task_counts(project_ids):
+    """
+    Count total and completed tasks per project, cached for the request
+
+    Counts of projects not read yet in this request come from one call to
+    get_project_task_counts, so reading the progress of many milestones
+    costs a single query.
+
+    Args:
+        project_ids: Projects to count tasks for
+
+    Returns:
+        Dictionary of project_id -> (total, completed). Projects without
+        tasks are omitted.
+    """
+    loaded, project_counts = _request_task_counts()
+
+    missing = set(project_ids) - loaded
+    if missing:
+        project_counts.update(get_project_task_counts(missing))
+        loaded.update(missing)
+
+    return project_counts
@@ -6,9 +6,16 @@ from blueprints.project_management.forms import (
     ProjectForm, TaskForm, ClientUserForm, ProjectMilestoneForm, 
     ProjectPaymentForm, AccountForm, SalesForm
 )
-from utils import generate_csv, generate_pdf
+from blueprints.project_management.dashboard_stats import (
+    assigned_project_ids, get_project_stats, get_task_stats, get_hr_stats, get_accounting_stats
+)
+from blueprints.project_management.progress import get_project_task_counts, preload_project_progress
+from blueprints.project_management import milestone_status
+from utils import generate_csv, generate_pdf, EXPORT_BATCH_SIZE
+from list_query import ListQuery, ListFilter, SearchFilter
 from decimal import Decimal
 from sqlalchemy import func
+from sqlalchemy.orm import joinedload
 from datetime import datetime, date
 
 project_bp = Blueprint('project_management', __name__, url_prefix='')
@@ -49,50 +56,23 @@ def check_access():
                 flash('Access denied. You are not assigned to this project.', 'danger')
                 return redirect(url_for('project_management.dashboard'))
 
-# Helper function to check and update milestone status when tasks are completed
-def check_and_update_milestone_status(project_id):
-    """
-    Check if all tasks for a project are completed and update the milestone status accordingly
-    """
-    # Get all milestones for the project
-    milestones = ProjectMilestone.query.filter_by(project_id=project_id).all()
-    
-    # For each milestone, check if tasks are completed
-    for milestone in milestones:
-        # Skip milestones that are already marked as paid
-        if milestone.status == 'paid':
-            continue
-            
-        # Get tasks related to this project
-        project_tasks = Task.query.filter_by(project_id=project_id).all()
-        
-        # If there are no tasks, continue to the next milestone
-        if not project_tasks:
-            continue
-            
-        # Check if all tasks are completed
-        all_tasks_completed = all(task.status == 'completed' for task in project_tasks)
-        
-        # If all tasks are completed and milestone is not yet completed, update its status
-        if all_tasks_completed and milestone.status == 'pending':
-            milestone.status = 'completed'
-            db.session.add(milestone)
-            
-    # Commit changes if any
-    db.session.commit()
-
 @project_bp.route('/')
 @project_bp.route('/dashboard')
 @login_required
 def dashboard():
-    # Filter projects based on user department
-    if current_user.is_admin or current_user.department == 'accounting':
+    # Admins and accounting see organisation-wide statistics; everyone else
+    # only sees the projects and tasks assigned to them
+    org_wide = current_user.is_admin or current_user.department == 'accounting'
+    
+    if org_wide:
         projects = Project.query.order_by(Project.start_date.desc()).limit(5).all()
     else:
         # Get projects where the user has assigned tasks
-        assigned_project_ids = db.session.query(Task.project_id).filter_by(user_id=current_user.id).distinct().all()
-        assigned_project_ids = [p[0] for p in assigned_project_ids]  # Convert to simple list
-        projects = Project.query.filter(Project.id.in_(assigned_project_ids)).order_by(Project.start_date.desc()).limit(5).all()
+        projects = Project.query.filter(
+            Project.id.in_(assigned_project_ids(current_user.id))
+        ).order_by(Project.start_date.desc()).limit(5).all()
+    
+    preload_project_progress(projects)
     
     # Get tasks assigned to current user
     user_tasks = Task.query.filter_by(user_id=current_user.id).order_by(Task.due_date.asc()).limit(5).all()
@@ -101,74 +81,41 @@ def dashboard():
     department_data = {}
     user_department = current_user.department
     
-    # Get project statistics - filtered for non-admin and non-accounting users
-    if current_user.is_admin or current_user.department == 'accounting':
-        total_projects = Project.query.count()
-        completed_projects = Project.query.filter_by(status='completed').count()
-        in_progress_projects = Project.query.filter_by(status='in-progress').count()
-        planning_projects = Project.query.filter_by(status='planning').count()
-        
-        # Get task statistics
-        total_tasks = Task.query.count()
-        completed_tasks = Task.query.filter_by(status='completed').count()
-        in_progress_tasks = Task.query.filter_by(status='in-progress').count()
-        todo_tasks = Task.query.filter_by(status='to-do').count()
-    else:
-        # For regular users, only count projects they're assigned to
-        assigned_project_ids = db.session.query(Task.project_id).filter_by(user_id=current_user.id).distinct().all()
-        assigned_project_ids = [p[0] for p in assigned_project_ids]
-        
-        if assigned_project_ids:
-            total_projects = Project.query.filter(Project.id.in_(assigned_project_ids)).count()
-            completed_projects = Project.query.filter(Project.id.in_(assigned_project_ids), Project.status=='completed').count()
-            in_progress_projects = Project.query.filter(Project.id.in_(assigned_project_ids), Project.status=='in-progress').count()
-            planning_projects = Project.query.filter(Project.id.in_(assigned_project_ids), Project.status=='planning').count()
-        else:
-            total_projects = completed_projects = in_progress_projects = planning_projects = 0
-        
-        # Only count tasks assigned to the user
-        total_tasks = Task.query.filter_by(user_id=current_user.id).count()
-        completed_tasks = Task.query.filter_by(user_id=current_user.id, status='completed').count()
-        in_progress_tasks = Task.query.filter_by(user_id=current_user.id, status='in-progress').count()
-        todo_tasks = Task.query.filter_by(user_id=current_user.id, status='to-do').count()
+    # Project and task statistics, grouped by status
+    project_stats = get_project_stats(None if org_wide else current_user.id)
+    task_stats = get_task_stats(None if org_wide else current_user.id)
+    
+    # Statistics for the current user's own tasks (the same as task_stats unless org-wide)
+    user_task_stats = None
+    if user_department == 'developer' or current_user.is_admin or current_user.employee:
+        user_task_stats = get_task_stats(current_user.id) if org_wide else task_stats
     
     # HR Department specific data
     if user_department == 'hr' or current_user.is_admin:
-        department_data['hr'] = {
-            'total_employees': Employee.query.count(),
-            'total_leaves': Leave.query.count(),
-            'pending_leaves': Leave.query.filter_by(status='pending').count(),
-            'recent_attendances': Attendance.query.order_by(Attendance.date.desc()).limit(5).all(),
-            'attendance_today': Attendance.query.filter_by(date=datetime.now().date()).count(),
-            'payrolls_pending': Payroll.query.filter_by(status='pending').count()
-        }
+        department_data['hr'] = get_hr_stats(datetime.now().date())
+        department_data['hr']['recent_attendances'] = Attendance.query.options(
+            joinedload(Attendance.employee)
+        ).order_by(Attendance.date.desc()).limit(5).all()
     
     # Accounting Department specific data
     if user_department == 'accounting' or current_user.is_admin:
-        department_data['accounting'] = {
-            'total_sales': Sales.query.count(),
-            'pending_payments': ProjectPayment.query.filter(
-                ProjectPayment.status.in_(['pending', 'in-review'])
-            ).count(),
-            'total_revenue': db.session.query(func.sum(Sales.received_amount)).scalar() or 0,
-            'outstanding_amount': db.session.query(func.sum(Sales.difference)).scalar() or 0
-        }
+        department_data['accounting'] = get_accounting_stats()
     
     # Developer Department specific data
     if user_department == 'developer' or current_user.is_admin:
         department_data['developer'] = {
-            'assigned_tasks': Task.query.filter_by(user_id=current_user.id).count(),
-            'in_review_tasks': Task.query.filter_by(user_id=current_user.id, status='in-review').count(),
-            'urgent_tasks': Task.query.filter_by(user_id=current_user.id, priority='urgent').count(),
-            'productivity': completed_tasks / total_tasks * 100 if total_tasks > 0 else 0
+            'assigned_tasks': user_task_stats['total'],
+            'in_review_tasks': user_task_stats['in_review'],
+            'urgent_tasks': user_task_stats['urgent'],
+            'productivity': task_stats['completed'] / task_stats['total'] * 100 if task_stats['total'] > 0 else 0
         }
     
     # Personalized employee insights
     employee_insights = {}
     if current_user.employee:
         # Task completion rate for the current employee
-        user_total_tasks = Task.query.filter_by(user_id=current_user.id).count()
-        user_completed_tasks = Task.query.filter_by(user_id=current_user.id, status='completed').count()
+        user_total_tasks = user_task_stats['total']
+        user_completed_tasks = user_task_stats['completed']
         completion_rate = (user_completed_tasks / user_total_tasks * 100) if user_total_tasks > 0 else 0
         
         # Upcoming leave requests
@@ -222,38 +169,46 @@ def dashboard():
     return render_template('project_management/dashboard.html',
                           projects=projects,
                           user_tasks=user_tasks,
-                          total_projects=total_projects,
-                          completed_projects=completed_projects,
-                          in_progress_projects=in_progress_projects,
-                          planning_projects=planning_projects,
-                          total_tasks=total_tasks,
-                          completed_tasks=completed_tasks,
-                          in_progress_tasks=in_progress_tasks,
-                          todo_tasks=todo_tasks,
+                          total_projects=project_stats['total'],
+                          completed_projects=project_stats['completed'],
+                          in_progress_projects=project_stats['in_progress'],
+                          planning_projects=project_stats['planning'],
+                          total_tasks=task_stats['total'],
+                          completed_tasks=task_stats['completed'],
+                          in_progress_tasks=task_stats['in_progress'],
+                          todo_tasks=task_stats['todo'],
                           employee_insights=employee_insights,
                           department_data=department_data)
 
+PROJECT_LIST = ListQuery(
+    Project.id,
+    sort_columns={
+        'start_date': Project.start_date,
+        'end_date': Project.end_date,
+        'name': Project.name,
+        'status': Project.status
+    },
+    default_sort='-start_date',
+    filters={
+        'status': ListFilter(Project.status),
+        'search': SearchFilter(Project.name, Project.client)
+    },
+    per_page=12
+)
+
 @project_bp.route('/projects')
 @login_required
 def projects():
-    # Admin can see all projects
-    if current_user.is_admin:
-        projects = Project.query.order_by(Project.start_date.desc()).all()
-    # Accounting can see all projects for financial purposes
-    elif current_user.department == 'accounting':
-        projects = Project.query.order_by(Project.start_date.desc()).all()
-    # All other users should only see projects they're assigned to
-    else:
-        # Find projects where the user has assigned tasks
-        assigned_project_ids = db.session.query(Task.project_id).filter_by(user_id=current_user.id).distinct().all()
-        assigned_project_ids = [p[0] for p in assigned_project_ids]  # Convert to simple list
-        
-        if assigned_project_ids:
-            projects = Project.query.filter(Project.id.in_(assigned_project_ids)).order_by(Project.start_date.desc()).all()
-        else:
-            # If user has no assigned projects, show empty list
-            projects = []
-        
+    query = Project.query
+    
+    # Admins and accounting see all projects; other users only the projects
+    # they have tasks in
+    if not current_user.is_admin and current_user.department != 'accounting':
+        query = query.filter(Project.id.in_(assigned_project_ids(current_user.id)))
+    
+    projects = PROJECT_LIST.apply(query)
+    preload_project_progress(projects.items)
+    
     return render_template('project_management/projects.html', projects=projects)
 
 @project_bp.route('/clients')
@@ -372,40 +327,33 @@ def new_project():
             # Create accounting journal entry for new project (if accounting module is enabled)
             try:
                 from blueprints.accounting.routes import create_journal_entry
-                from models_accounting import ChartOfAccount
-                
-                # Find appropriate accounts
-                revenue_account = ChartOfAccount.query.filter_by(name='Sales Revenue').first()
-                ar_account = ChartOfAccount.query.filter_by(name='Accounts Receivable').first()
-                
-                if revenue_account and ar_account:
-                    # Prepare line items
-                    line_items = [
-                        # Debit Accounts Receivable
-                        {
-                            'account_id': ar_account.id,
-                            'debit_amount': float(project.budget),
-                            'credit_amount': 0,
-                            'description': f'Project {project.name} - Expected Revenue'
-                        },
-                        # Credit Revenue
-                        {
-                            'account_id': revenue_account.id,
-                            'debit_amount': 0,
-                            'credit_amount': float(project.budget),
-                            'description': f'Project {project.name} - Expected Revenue'
-                        }
-                    ]
-                    
-                    # Create journal entry
-                    create_journal_entry(
-                        entry_type='PROJECT',
-                        transaction_date=project.start_date,
-                        reference=f'PRJ-{project.id}',
-                        memo=f'New project: {project.name}',
-                        line_items=line_items,
-                        user_id=current_user.id
-                    )
+
+                # Prepare line items
+                line_items = [
+                    # Debit Accounts Receivable
+                    {
+                        'account': 'Accounts Receivable',
+                        'debit_amount': float(project.budget),
+                        'credit_amount': 0,
+                        'description': f'Project {project.name} - Expected Revenue'
+                    },
+                    # Credit Revenue
+                    {
+                        'account': 'Sales Revenue',
+                        'debit_amount': 0,
+                        'credit_amount': float(project.budget),
+                        'description': f'Project {project.name} - Expected Revenue'
+                    }
+                ]
+                # Create journal entry
+                create_journal_entry(
+                    entry_type='PROJECT',
+                    transaction_date=project.start_date,
+                    reference=f'PRJ-{project.id}',
+                    memo=f'New project: {project.name}',
+                    line_items=line_items,
+                    user_id=current_user.id
+                )
             except Exception as e:
                 # Log error but don't prevent project creation if accounting fails
                 print(f"Error creating accounting entry for project: {str(e)}")
@@ -434,7 +382,9 @@ def project_detail(id):
         tasks = Task.query.filter_by(project_id=id, user_id=current_user.id).order_by(Task.due_date.asc()).all()
     else:
         tasks = Task.query.filter_by(project_id=id).order_by(Task.due_date.asc()).all()
-        
+    
+    preload_project_progress([project])
+    
     return render_template('project_management/project_detail.html', project=project, tasks=tasks)
 
 @project_bp.route('/projects/<int:id>/edit', methods=['GET', 'POST'])
@@ -477,29 +427,33 @@ def delete_project(id):
 @project_bp.route('/projects/export')
 @login_required
 def export_projects():
-    projects = Project.query.all()
     headers = ['ID', 'Name', 'Client', 'Start Date', 'End Date', 'Status', 'Progress', 'Budget']
     
-    data = []
-    for proj in projects:
-        data.append({
-            'ID': proj.id,
-            'Name': proj.name,
-            'Client': proj.client,
-            'Start Date': proj.start_date.strftime('%Y-%m-%d'),
-            'End Date': proj.end_date.strftime('%Y-%m-%d') if proj.end_date else 'N/A',
-            'Status': proj.status,
-            'Progress': f"{proj.progress}%",
-            'Budget': f"${proj.budget}" if proj.budget else 'N/A'
-        })
-    
-    return generate_csv(data, 'projects')
+    def rows():
+        task_counts = get_project_task_counts()
+        
+        # Stream projects in batches instead of loading them all at once
+        for proj in Project.query.order_by(Project.id).yield_per(EXPORT_BATCH_SIZE):
+            proj.preload_task_counts(*task_counts.get(proj.id, (0, 0)))
+            yield [
+                proj.id,
+                proj.name,
+                proj.client,
+                proj.start_date.strftime('%Y-%m-%d'),
+                proj.end_date.strftime('%Y-%m-%d') if proj.end_date else 'N/A',
+                proj.status,
+                f"{proj.progress}%",
+                f"${proj.budget}" if proj.budget else 'N/A'
+            ]
+    
+    return generate_csv(rows(), 'projects', headers=headers)
 
 @project_bp.route('/projects/<int:id>/report')
 @login_required
 def project_report(id):
     project = Project.query.get_or_404(id)
     tasks = Task.query.filter_by(project_id=id).order_by(Task.due_date.asc()).all()
+    preload_project_progress([project])
     
     return generate_pdf(
         'project_management/project_report.html', 
@@ -508,15 +462,35 @@ def project_report(id):
         tasks=tasks
     )
 
+TASK_LIST = ListQuery(
+    Task.id,
+    sort_columns={
+        'due_date': Task.due_date,
+        'title': Task.title,
+        'priority': Task.priority,
+        'status': Task.status
+    },
+    default_sort='due_date',
+    filters={
+        'status': ListFilter(Task.status),
+        'priority': ListFilter(Task.priority),
+        'project_id': ListFilter(Task.project_id, type=int),
+        'search': SearchFilter(Task.title)
+    },
+    loaders=lambda: [joinedload(Task.project)]
+)
+
 @project_bp.route('/tasks')
 @login_required
 def tasks():
-    if current_user.is_admin:
-        tasks = Task.query.order_by(Task.due_date.asc()).all()
-    else:
-        tasks = Task.query.filter_by(user_id=current_user.id).order_by(Task.due_date.asc()).all()
+    user_id = None if current_user.is_admin else current_user.id
+    
+    query = Task.query
+    if user_id is not None:
+        query = query.filter_by(user_id=user_id)
+    tasks = TASK_LIST.apply(query)
     
-    return render_template('project_management/tasks.html', tasks=tasks)
+    return render_template('project_management/tasks.html', tasks=tasks, task_stats=get_task_stats(user_id))
 
 @project_bp.route('/projects/<int:project_id>/tasks/new', methods=['GET', 'POST'])
 @login_required
@@ -543,6 +517,8 @@ def new_task(project_id):
             status=form.status.data
         )
         db.session.add(task)
+        db.session.flush()
+        milestone_status.task_created(task)
         db.session.commit()
         
         flash('Task created successfully!', 'success')
@@ -583,11 +559,12 @@ def edit_task(id):
         task.priority = form.priority.data
         task.status = form.status.data
         
+        # Update the project's task counters and, if this was its last open
+        # task, its milestones in the same transaction
+        milestone_status.task_status_changed(task, old_status)
         db.session.commit()
         
-        # If task status changed to completed, check and update milestone status
         if old_status != 'completed' and task.status == 'completed':
-            check_and_update_milestone_status(task.project_id)
             flash('Task updated and marked as completed! Milestone status has been updated if all tasks are completed.', 'success')
         else:
             flash('Task updated successfully!', 'success')
@@ -607,6 +584,7 @@ def delete_task(id):
     
     project_id = task.project_id
     db.session.delete(task)
+    milestone_status.task_deleted(task)
     db.session.commit()
     
     flash('Task deleted successfully!', 'success')
@@ -626,13 +604,15 @@ def update_task_status(id, status):
         flash('Invalid status.', 'danger')
         return redirect(url_for('project_management.tasks'))
     
+    old_status = task.status
     task.status = status
+    
+    # Update the project's task counters and, if this was its last open
+    # task, its milestones in the same transaction
+    milestone_status.task_status_changed(task, old_status)
     db.session.commit()
     
-    # If task is marked as completed, check if all project tasks are completed
-    # and update milestone status accordingly
     if status == 'completed':
-        check_and_update_milestone_status(task.project_id)
         flash('Task marked as completed! Milestone status has been updated if all tasks are completed.', 'success')
     else:
         flash(f'Task status updated to {status}.', 'success')
@@ -786,10 +766,28 @@ def delete_account(id):
     return redirect(url_for('project_management.accounts'))
 
 # Payment Management
+PAYMENT_LIST = ListQuery(
+    ProjectPayment.id,
+    sort_columns={
+        'payment_date': ProjectPayment.payment_date,
+        'amount_original': ProjectPayment.amount_original,
+        'amount_received': ProjectPayment.amount_received,
+        'status': ProjectPayment.status
+    },
+    default_sort='-payment_date',
+    filters={
+        'status': ListFilter(ProjectPayment.status),
+        'project_id': ListFilter(ProjectPayment.project_id, type=int),
+        'from_date': ListFilter(ProjectPayment.payment_date, type=date, op='ge'),
+        'to_date': ListFilter(ProjectPayment.payment_date, type=date, op='le')
+    },
+    loaders=lambda: [joinedload(ProjectPayment.project), joinedload(ProjectPayment.account)]
+)
+
 @project_bp.route('/payments')
 @login_required
 def payments():
-    payments = ProjectPayment.query.order_by(ProjectPayment.payment_date.desc()).all()
+    payments = PAYMENT_LIST.apply(ProjectPayment.query)
     return render_template('project_management/payments.html', payments=payments)
 
 @project_bp.route('/projects/<int:project_id>/payments')
@@ -863,40 +861,33 @@ def new_payment():
                 # Create accounting journal entry for payment (if accounting module is enabled)
                 try:
                     from blueprints.accounting.routes import create_journal_entry
-                    from models_accounting import ChartOfAccount
-                    
-                    # Find appropriate accounts
-                    cash_account = ChartOfAccount.query.filter_by(name='Cash').first()
-                    ar_account = ChartOfAccount.query.filter_by(name='Accounts Receivable').first()
-                    
-                    if cash_account and ar_account:
-                        # Prepare line items
-                        line_items = [
-                            # Debit Cash
-                            {
-                                'account_id': cash_account.id,
-                                'debit_amount': float(payment.amount_received),
-                                'credit_amount': 0,
-                                'description': f'Payment received for project {project.name}'
-                            },
-                            # Credit Accounts Receivable
-                            {
-                                'account_id': ar_account.id,
-                                'debit_amount': 0,
-                                'credit_amount': float(payment.amount_received),
-                                'description': f'Payment received for project {project.name}'
-                            }
-                        ]
-                        
-                        # Create journal entry
-                        create_journal_entry(
-                            entry_type='PAYMENT',
-                            transaction_date=payment.payment_date or datetime.now().date(),
-                            reference=f'PMT-{payment.id}',
-                            memo=f'Payment for project: {project.name}',
-                            line_items=line_items,
-                            user_id=current_user.id
-                        )
+
+                    # Prepare line items
+                    line_items = [
+                        # Debit Cash
+                        {
+                            'account': 'Cash',
+                            'debit_amount': float(payment.amount_received),
+                            'credit_amount': 0,
+                            'description': f'Payment received for project {project.name}'
+                        },
+                        # Credit Accounts Receivable
+                        {
+                            'account': 'Accounts Receivable',
+                            'debit_amount': 0,
+                            'credit_amount': float(payment.amount_received),
+                            'description': f'Payment received for project {project.name}'
+                        }
+                    ]
+                    # Create journal entry
+                    create_journal_entry(
+                        entry_type='PAYMENT',
+                        transaction_date=payment.payment_date or datetime.now().date(),
+                        reference=f'PMT-{payment.id}',
+                        memo=f'Payment for project: {project.name}',
+                        line_items=line_items,
+                        user_id=current_user.id
+                    )
                 except Exception as e:
                     # Log error but don't prevent payment creation if accounting fails
                     print(f"Error creating accounting entry for payment: {str(e)}")
@@ -944,40 +935,33 @@ def edit_payment(id):
                 # Create accounting journal entry for payment (if accounting module is enabled)
                 try:
                     from blueprints.accounting.routes import create_journal_entry
-                    from models_accounting import ChartOfAccount
-                    
-                    # Find appropriate accounts
-                    cash_account = ChartOfAccount.query.filter_by(name='Cash').first()
-                    ar_account = ChartOfAccount.query.filter_by(name='Accounts Receivable').first()
-                    
-                    if cash_account and ar_account:
-                        # Prepare line items
-                        line_items = [
-                            # Debit Cash
-                            {
-                                'account_id': cash_account.id,
-                                'debit_amount': float(payment.amount_received),
-                                'credit_amount': 0,
-                                'description': f'Payment received for project {project.name}'
-                            },
-                            # Credit Accounts Receivable
-                            {
-                                'account_id': ar_account.id,
-                                'debit_amount': 0,
-                                'credit_amount': float(payment.amount_received),
-                                'description': f'Payment received for project {project.name}'
-                            }
-                        ]
-                        
-                        # Create journal entry
-                        create_journal_entry(
-                            entry_type='PAYMENT',
-                            transaction_date=payment.payment_date or datetime.now().date(),
-                            reference=f'PMT-{payment.id}',
-                            memo=f'Payment for project: {project.name}',
-                            line_items=line_items,
-                            user_id=current_user.id
-                        )
+
+                    # Prepare line items
+                    line_items = [
+                        # Debit Cash
+                        {
+                            'account': 'Cash',
+                            'debit_amount': float(payment.amount_received),
+                            'credit_amount': 0,
+                            'description': f'Payment received for project {project.name}'
+                        },
+                        # Credit Accounts Receivable
+                        {
+                            'account': 'Accounts Receivable',
+                            'debit_amount': 0,
+                            'credit_amount': float(payment.amount_received),
+                            'description': f'Payment received for project {project.name}'
+                        }
+                    ]
+                    # Create journal entry
+                    create_journal_entry(
+                        entry_type='PAYMENT',
+                        transaction_date=payment.payment_date or datetime.now().date(),
+                        reference=f'PMT-{payment.id}',
+                        memo=f'Payment for project: {project.name}',
+                        line_items=line_items,
+                        user_id=current_user.id
+                    )
                 except Exception as e:
                     # Log error but don't prevent payment update if accounting fails
                     print(f"Error creating accounting entry for edited payment: {str(e)}")
@@ -1016,40 +1000,33 @@ def delete_payment(id):
             # Create reversing journal entry for the deleted payment
             try:
                 from blueprints.accounting.routes import create_journal_entry
-                from models_accounting import ChartOfAccount
-                
-                # Find appropriate accounts
-                cash_account = ChartOfAccount.query.filter_by(name='Cash').first()
-                ar_account = ChartOfAccount.query.filter_by(name='Accounts Receivable').first()
-                
-                if cash_account and ar_account:
-                    # Prepare line items - note the reversed debits/credits
-                    line_items = [
-                        # Credit Cash (reverse the debit)
-                        {
-                            'account_id': cash_account.id,
-                            'debit_amount': 0,
-                            'credit_amount': float(payment.amount_received),
-                            'description': f'Reversal of payment for project {payment.project.name}'
-                        },
-                        # Debit Accounts Receivable (reverse the credit)
-                        {
-                            'account_id': ar_account.id,
-                            'debit_amount': float(payment.amount_received),
-                            'credit_amount': 0,
-                            'description': f'Reversal of payment for project {payment.project.name}'
-                        }
-                    ]
-                    
-                    # Create reversal journal entry
-                    create_journal_entry(
-                        entry_type='REVERSAL',
-                        transaction_date=date.today(),
-                        reference=f'REV-PMT-{payment.id}',
-                        memo=f'Reversal of deleted payment for project: {payment.project.name}',
-                        line_items=line_items,
-                        user_id=current_user.id
-                    )
+
+                # Prepare line items - note the reversed debits/credits
+                line_items = [
+                    # Credit Cash (reverse the debit)
+                    {
+                        'account': 'Cash',
+                        'debit_amount': 0,
+                        'credit_amount': float(payment.amount_received),
+                        'description': f'Reversal of payment for project {payment.project.name}'
+                    },
+                    # Debit Accounts Receivable (reverse the credit)
+                    {
+                        'account': 'Accounts Receivable',
+                        'debit_amount': float(payment.amount_received),
+                        'credit_amount': 0,
+                        'description': f'Reversal of payment for project {payment.project.name}'
+                    }
+                ]
+                # Create reversal journal entry
+                create_journal_entry(
+                    entry_type='REVERSAL',
+                    transaction_date=date.today(),
+                    reference=f'REV-PMT-{payment.id}',
+                    memo=f'Reversal of deleted payment for project: {payment.project.name}',
+                    line_items=line_items,
+                    user_id=current_user.id
+                )
             except Exception as e:
                 # Log error but don't prevent payment deletion if accounting fails
                 print(f"Error creating reversal accounting entry for deleted payment: {str(e)}")
@@ -1063,6 +1040,22 @@ def delete_payment(id):
     return redirect(url_for('project_management.project_payments', project_id=project_id))
 
 # Sales Management Routes
+SALES_LIST = ListQuery(
+    Sales.id,
+    sort_columns={
+        'created_at': Sales.created_at,
+        'total_amount': Sales.total_amount,
+        'received_amount': Sales.received_amount,
+        'difference': Sales.difference,
+        'status': Sales.status
+    },
+    default_sort='-created_at',
+    filters={
+        'status': ListFilter(Sales.status)
+    },
+    loaders=lambda: [joinedload(Sales.project_sale)]
+)
+
 @project_bp.route('/sales')
 @login_required
 def sales():
@@ -1071,7 +1064,7 @@ def sales():
         flash('Access denied. Admin privileges required.', 'danger')
         return redirect(url_for('project_management.dashboard'))
         
-    sales_records = Sales.query.order_by(Sales.created_at.desc()).all()
+    sales_records = SALES_LIST.apply(Sales.query)
     return render_template('project_management/sales.html', sales=sales_records, title='Sales Records')
 
 @project_bp.route('/sales/<int:id>')
@@ -1144,40 +1137,33 @@ def close_sales(id):
     if sale.difference > 0:
         try:
             from blueprints.accounting.routes import create_journal_entry
-            from models_accounting import ChartOfAccount
-            
-            # Find appropriate accounts
-            ar_account = ChartOfAccount.query.filter_by(name='Accounts Receivable').first()
-            revenue_account = ChartOfAccount.query.filter_by(name='Sales Revenue').first()
-            
-            if ar_account and revenue_account:
-                # Prepare line items for writing off the difference
-                line_items = [
-                    # Credit Accounts Receivable (reduce AR)
-                    {
-                        'account_id': ar_account.id,
-                        'debit_amount': 0,
-                        'credit_amount': float(sale.difference),
-                        'description': f'Write-off for closed project: {sale.project.name}'
-                    },
-                    # Debit Revenue (reduce revenue)
-                    {
-                        'account_id': revenue_account.id,
-                        'debit_amount': float(sale.difference),
-                        'credit_amount': 0,
-                        'description': f'Write-off for closed project: {sale.project.name}'
-                    }
-                ]
-                
-                # Create journal entry
-                create_journal_entry(
-                    entry_type='WRITEOFF',
-                    transaction_date=sale.closed_date,
-                    reference=f'CLO-{sale.id}',
-                    memo=f'Write-off on closing sales for project: {sale.project.name}',
-                    line_items=line_items,
-                    user_id=current_user.id
-                )
+
+            # Prepare line items for writing off the difference
+            line_items = [
+                # Credit Accounts Receivable (reduce AR)
+                {
+                    'account': 'Accounts Receivable',
+                    'debit_amount': 0,
+                    'credit_amount': float(sale.difference),
+                    'description': f'Write-off for closed project: {sale.project.name}'
+                },
+                # Debit Revenue (reduce revenue)
+                {
+                    'account': 'Sales Revenue',
+                    'debit_amount': float(sale.difference),
+                    'credit_amount': 0,
+                    'description': f'Write-off for closed project: {sale.project.name}'
+                }
+            ]
+            # Create journal entry
+            create_journal_entry(
+                entry_type='WRITEOFF',
+                transaction_date=sale.closed_date,
+                reference=f'CLO-{sale.id}',
+                memo=f'Write-off on closing sales for project: {sale.project.name}',
+                line_items=line_items,
+                user_id=current_user.id
+            )
         except Exception as e:
             # Log error but don't prevent sales closure if accounting fails
             print(f"Error creating accounting entry for sales closure: {str(e)}")
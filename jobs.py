@@ -0,0 +1,149 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import partial
+from flask import current_app
+from xhtml2pdf import pisa
+from app import db
+from models import ReportJob
+from report_cache import get_report_cache
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def render_pdf_file(html, path):
+    """
+    Render HTML to a PDF file; runs inside a worker process
+    
+    The PDF is written to a temporary file first and moved into place, so a
+    partially written file is never served from the cache.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as pdf_file:
+            pisa.CreatePDF(html, dest=pdf_file)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path
+
+
+def get_executor(workers):
+    """
+    Process pool shared by all requests of this process
+    
+    Created lazily so that each forked server worker gets its own pool.
+    """
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ProcessPoolExecutor(max_workers=workers)
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def _cache_report(job, report_key):
+    """Copy a finished PDF into the report export cache"""
+    if not report_key or job.status != 'completed':
+        return
+    try:
+        with open(job.result_path, 'rb') as pdf_file:
+            get_report_cache().put(report_key, pdf_file.read(), job.filename, 'application/pdf')
+    except OSError as e:
+        logger.warning(f"Could not cache report job {job.id}: {e}")
+
+
+def _finish_job(app, job_id, report_key, future):
+    """Record the outcome of a rendering job (runs in the pool's callback thread)"""
+    with app.app_context():
+        job = db.session.get(ReportJob, job_id)
+        if not job:
+            return
+        
+        error = future.exception()
+        if error:
+            logger.error(f"Report job {job_id} failed: {error}")
+            job.status = 'failed'
+            job.error = str(error) or error.__class__.__name__
+        else:
+            job.status = 'completed'
+        job.completed_at = datetime.utcnow()
+        db.session.commit()
+        
+        _cache_report(job, report_key)
+
+
+def submit_pdf_job(html, filename, user_id=None, report_key=None):
+    """
+    Queue rendering of an HTML document to PDF
+    
+    PDFs are cached on disk by the hash of their HTML, so a report whose
+    content has not changed is served without rendering it again.
+    
+    Args:
+        html: Rendered HTML of the report
+        filename: Download name of the PDF, without extension
+        user_id: Owner of the job (optional)
+        report_key: Report cache key to store the finished PDF under (optional)
+    
+    Returns:
+        The ReportJob, already committed
+    """
+    job_dir = current_app.config['REPORT_JOB_DIR']
+    os.makedirs(job_dir, exist_ok=True)
+    
+    cache_key = hashlib.sha256(html.encode('utf-8')).hexdigest()
+    job = ReportJob(
+        user_id=user_id,
+        job_type='pdf',
+        filename=f"{filename}.pdf",
+        cache_key=cache_key,
+        result_path=os.path.join(job_dir, f"{cache_key}.pdf"),
+        status='queued'
+    )
+    
+    if os.path.exists(job.result_path):
+        job.status = 'completed'
+        job.completed_at = datetime.utcnow()
+    
+    # Commit before submitting so the completion callback can find the job
+    db.session.add(job)
+    db.session.commit()
+    
+    if job.status == 'queued':
+        app = current_app._get_current_object()
+        workers = app.config['PDF_WORKERS']
+        
+        if workers > 0:
+            try:
+                future = get_executor(workers).submit(render_pdf_file, html, job.result_path)
+            except RuntimeError as e:  # Pool broken or shut down
+                job.status = 'failed'
+                job.error = str(e)
+                db.session.commit()
+            else:
+                future.add_done_callback(partial(_finish_job, app, job.id, report_key))
+        else:
+            # No worker processes configured: render inside the request
+            try:
+                render_pdf_file(html, job.result_path)
+                job.status = 'completed'
+            except Exception as e:
+                job.status = 'failed'
+                job.error = str(e)
+            job.completed_at = datetime.utcnow()
+            db.session.commit()
+            _cache_report(job, report_key)
+    else:
+        _cache_report(job, report_key)
+    
+    return job
@@ -0,0 +1,244 @@
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from flask import current_app, request
+from sqlalchemy import tuple_
+from sqlalchemy.orm import raiseload
+
+DEFAULT_PER_PAGE = 25
+MAX_PER_PAGE = 200
+
+
+class ListFilter:
+    """
+    A filter a list view accepts as a query string argument
+
+    Values that cannot be parsed are ignored rather than reported, so a
+    mistyped URL shows the unfiltered list.
+    """
+
+    OPERATORS = {
+        'eq': lambda column, value: column == value,
+        'ge': lambda column, value: column >= value,
+        'le': lambda column, value: column <= value
+    }
+
+    def __init__(self, column, type=str, op='eq'):
+        """
+        Args:
+            column: Column to filter on
+            type: str, int or date; the argument is converted to it
+            op: 'eq', 'ge' or 'le'
+        """
+        self.column = column
+        self.type = type
+        self.op = op
+
+    def parse(self, raw):
+        """Convert a query string value, returning None if it is empty or invalid"""
+        if raw is None or raw == '':
+            return None
+        try:
+            if self.type is date:
+                return datetime.strptime(raw, '%Y-%m-%d').date()
+            return self.type(raw)
+        except ValueError:
+            return None
+
+    def apply(self, query, value):
+        return query.filter(self.OPERATORS[self.op](self.column, value))
+
+
+class SearchFilter(ListFilter):
+    """Case-insensitive substring match on any of several columns"""
+
+    def __init__(self, *columns):
+        super().__init__(None)
+        self.columns = columns
+
+    def parse(self, raw):
+        raw = (raw or '').strip()
+        return raw or None
+
+    def apply(self, query, value):
+        pattern = f'%{value}%'
+        condition = self.columns[0].ilike(pattern)
+        for column in self.columns[1:]:
+            condition = condition | column.ilike(pattern)
+        return query.filter(condition)
+
+
+def _encode_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _decode_value(column, value):
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    if python_type is Decimal:
+        return Decimal(value)
+    return python_type(value)
+
+
+class ListQuery:
+    """
+    Server-side paging, sorting and filtering for a list view
+
+    Sorting is limited to the whitelisted columns and always ends with the
+    primary key, so the order is stable. Lists use page numbers by default;
+    large tables can use keyset paging, where each page continues after the
+    last row of the previous one, so the cost of a page does not depend on
+    how deep into the table it is. Keyset lists should only whitelist
+    columns without NULLs.
+
+    Each list declares the loader options for the relationships its
+    template shows. With RAISE_ON_LAZY_LOAD set, any other relationship
+    that would be loaded row by row raises instead, so a template change
+    that brings back an N+1 query fails loudly.
+    """
+
+    def __init__(self, id_column, sort_columns, default_sort, filters=None,
+                 per_page=DEFAULT_PER_PAGE, keyset=False, loaders=None):
+        """
+        Args:
+            id_column: Primary key column, used to break ties
+            sort_columns: Dictionary of sort key -> column
+            default_sort: Sort key, prefixed with '-' for descending order
+            filters: Dictionary of query string argument -> ListFilter
+            per_page: Default number of rows per page
+            keyset: Page with cursors instead of page numbers
+            loaders: Function returning the joinedload/selectinload options
+                     for the relationships the template uses; a function
+                     because backref attributes only exist once the mappers
+                     are configured
+        """
+        self.id_column = id_column
+        self.sort_columns = sort_columns
+        self.default_sort = default_sort
+        self.filters = filters or {}
+        self.per_page = per_page
+        self.keyset = keyset
+        self.loaders = loaders
+
+    def _parse_sort(self, raw):
+        key = raw or self.default_sort
+        descending = key.startswith('-')
+        key = key.lstrip('-')
+        if key not in self.sort_columns:
+            key = self.default_sort.lstrip('-')
+            descending = self.default_sort.startswith('-')
+        return key, descending
+
+    def _decode_cursor(self, cursor, sort_column):
+        if not cursor:
+            return None
+        try:
+            value, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return _decode_value(sort_column, value), int(row_id)
+        except (ValueError, TypeError):
+            return None
+
+    def apply(self, query, args=None):
+        """
+        Filter, sort and page a query according to the request arguments
+
+        Args:
+            query: Query selecting the model rows of the list
+            args: Query string arguments (defaults to request.args)
+
+        Returns:
+            ListPage with the rows of the requested page
+        """
+        if args is None:
+            args = request.args
+
+        if self.loaders:
+            query = query.options(*self.loaders())
+        if current_app.config.get('RAISE_ON_LAZY_LOAD', False):
+            # Lazy loads the identity map can answer emit no SQL and are allowed
+            query = query.options(raiseload('*', sql_only=True))
+
+        filter_values = {}
+        for name, list_filter in self.filters.items():
+            value = list_filter.parse(args.get(name))
+            if value is not None:
+                filter_values[name] = value
+                query = list_filter.apply(query, value)
+
+        sort, descending = self._parse_sort(args.get('sort'))
+        sort_column = self.sort_columns[sort]
+        if descending:
+            query = query.order_by(sort_column.desc(), self.id_column.desc())
+        else:
+            query = query.order_by(sort_column.asc(), self.id_column.asc())
+
+        per_page = min(max(args.get('per_page', self.per_page, type=int) or self.per_page, 1), MAX_PER_PAGE)
+
+        list_page = ListPage(args, sort, descending, filter_values, per_page)
+        if not self.keyset:
+            list_page.pagination = query.paginate(page=args.get('page', 1, type=int), per_page=per_page,
+                                                  error_out=False)
+            list_page.items = list_page.pagination.items
+            return list_page
+
+        position = self._decode_cursor(args.get('cursor'), sort_column)
+        if position:
+            key = tuple_(sort_column, self.id_column)
+            query = query.filter(key < tuple_(*position) if descending else key > tuple_(*position))
+        list_page.is_first_page = position is None
+
+        # Fetch one extra row to know whether there is a next page
+        rows = query.limit(per_page + 1).all()
+        list_page.items = rows[:per_page]
+        if len(rows) > per_page:
+            last = list_page.items[-1]
+            key = [_encode_value(getattr(last, sort_column.key)), getattr(last, self.id_column.key)]
+            list_page.next_cursor = base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+        return list_page
+
+
+class ListPage:
+    """One page of a list view, plus what templates need to link to others"""
+
+    def __init__(self, args, sort, descending, filters, per_page):
+        self.sort = sort
+        self.descending = descending
+        self.filters = filters
+        self.per_page = per_page
+        self.items = []
+        self.pagination = None  # Flask-SQLAlchemy Pagination for page-numbered lists
+        self.next_cursor = None
+        self.is_first_page = True
+        self._args = {
+            name: value for name, value in args.items()
+            if name not in ('page', 'cursor') and value != ''
+        }
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def keyset(self):
+        return self.pagination is None
+
+    def url_args(self, **overrides):
+        """Current sort, filter and page size arguments, merged with overrides"""
+        args = dict(self._args)
+        args.update(overrides)
+        return {name: value for name, value in args.items() if value is not None}
+
+    def sort_args(self, key, **overrides):
+        """Arguments that sort by key, toggling the direction if already sorted by it"""
+        descending = key == self.sort and not self.descending
+        return self.url_args(sort=f"-{key}" if descending else key, **overrides)
@@ -0,0 +1,103 @@
+"""
+Versioned schema migrations for SQLite and PostgreSQL
+
+Each migration is a module in this package named m<version>_<name>.py
+with a DESCRIPTION string and an upgrade(conn) function. Applied versions
+are recorded in the schema_migration table; every migration runs in its
+own transaction together with its bookkeeping row.
+
+Every table, column and index the models add gets a migration, so a
+database maintained only with run_migrations.py ends up with the same
+schema as one created by db.create_all(). Migrations must be idempotent,
+since databases created by db.create_all() already have the latest
+tables and indexes.
+"""
+import importlib
+import pkgutil
+from collections import namedtuple
+from datetime import datetime
+from sqlalchemy import MetaData, Table, Column, Integer, String, DateTime, inspect, select, text
+
+Migration = namedtuple('Migration', ['version', 'name', 'description', 'upgrade'])
+
+# Kept out of db.metadata so db.create_all() never creates or stamps it
+schema_migration = Table(
+    'schema_migration', MetaData(),
+    Column('version', Integer, primary_key=True),
+    Column('name', String(100), nullable=False),
+    Column('applied_at', DateTime, nullable=False)
+)
+
+
+def load_migrations():
+    """All migrations in this package, ordered by version"""
+    migrations = []
+    for module_info in pkgutil.iter_modules(__path__):
+        if not module_info.name.startswith('m') or '_' not in module_info.name:
+            continue
+        version, _, name = module_info.name[1:].partition('_')
+        if not version.isdigit():
+            continue
+        module = importlib.import_module(f'{__name__}.{module_info.name}')
+        migrations.append(Migration(int(version), name, module.DESCRIPTION, module.upgrade))
+    return sorted(migrations, key=lambda migration: migration.version)
+
+
+def applied_versions(engine):
+    """Versions recorded in schema_migration"""
+    with engine.begin() as conn:
+        schema_migration.create(conn, checkfirst=True)
+        return set(conn.execute(select(schema_migration.c.version)).scalars())
+
+
+def pending_migrations(engine):
+    applied = applied_versions(engine)
+    return [migration for migration in load_migrations() if migration.version not in applied]
+
+
+def run_migrations(engine, target=None):
+    """
+    Apply pending migrations in version order
+
+    Args:
+        engine: SQLAlchemy engine of the database to migrate
+        target: Stop after this version (optional)
+
+    Returns:
+        List of the applied migrations
+    """
+    applied = []
+    for migration in pending_migrations(engine):
+        if target is not None and migration.version > target:
+            break
+        with engine.begin() as conn:
+            migration.upgrade(conn)
+            conn.execute(schema_migration.insert().values(
+                version=migration.version,
+                name=migration.name,
+                applied_at=datetime.utcnow()
+            ))
+        applied.append(migration)
+    return applied
+
+
+# Helpers for writing migrations that work on both SQLite and PostgreSQL
+
+def has_table(conn, table):
+    return inspect(conn).has_table(table)
+
+
+def has_column(conn, table, column):
+    return column in {info['name'] for info in inspect(conn).get_columns(table)}
+
+
+def add_column(conn, table, column, definition):
+    """Add a column unless the table already has it (SQLite lacks ADD COLUMN IF NOT EXISTS)"""
+    if has_table(conn, table) and not has_column(conn, table, column):
+        conn.execute(text(f'ALTER TABLE "{table}" ADD COLUMN {column} {definition}'))
+
+
+def create_index(conn, name, table, columns):
+    """Create an index unless one with the same name exists"""
+    if has_table(conn, table):
+        conn.execute(text(f'CREATE INDEX IF NOT EXISTS {name} ON "{table}" ({", ".join(columns)})'))
@@ -0,0 +1,87 @@
+"""
+Check with EXPLAIN that the hot report and dashboard queries can use
+their indexes
+
+On PostgreSQL sequential scans are disabled for the check, because on
+small tables the planner rightly prefers them; the check is whether an
+index is usable for the query shape, not whether it wins on today's data.
+"""
+from datetime import date
+from sqlalchemy import text
+
+# (name, expected index, SQL, parameters)
+REPORT_QUERIES = [
+    ('posted line totals by account', 'ix_journal_entry_status_date', """
+        SELECT l.account_id, SUM(l.debit_amount), SUM(l.credit_amount)
+        FROM journal_entry_line l JOIN journal_entry e ON l.journal_entry_id = e.id
+        WHERE e.status = :status AND e.date >= :from_date AND e.date <= :to_date
+        GROUP BY l.account_id
+    """, {'status': 'POSTED', 'from_date': date(2000, 1, 1), 'to_date': date(2000, 12, 31)}),
+    ('lines of posted entries', 'ix_journal_entry_line_journal_entry_id', """
+        SELECT l.account_id, SUM(l.debit_amount)
+        FROM journal_entry e JOIN journal_entry_line l ON l.journal_entry_id = e.id
+        WHERE e.status = :status AND e.date >= :from_date AND e.date <= :to_date
+        GROUP BY l.account_id
+    """, {'status': 'POSTED', 'from_date': date(2000, 1, 1), 'to_date': date(2000, 12, 31)}),
+    ('general ledger of one account', 'ix_journal_entry_line_account_id_journal_entry_id', """
+        SELECT l.id, l.debit_amount, l.credit_amount, e.date
+        FROM journal_entry_line l JOIN journal_entry e ON l.journal_entry_id = e.id
+        WHERE l.account_id = :account_id
+    """, {'account_id': 1}),
+    ('ledger entries by date', 'ix_journal_entry_date', """
+        SELECT id FROM journal_entry WHERE date >= :from_date AND date <= :to_date
+    """, {'from_date': date(2000, 1, 1), 'to_date': date(2000, 12, 31)}),
+    ('task counts of projects', 'ix_task_project_id_status', """
+        SELECT project_id, COUNT(id), SUM(CASE WHEN status = 'completed' THEN 1 ELSE 0 END)
+        FROM task WHERE project_id IN (1, 2, 3) GROUP BY project_id
+    """, {}),
+    ('task counts of a user', 'ix_task_user_id_status', """
+        SELECT status, COUNT(id) FROM task WHERE user_id = :user_id GROUP BY status
+    """, {'user_id': 1}),
+    ('attendance of a day', 'ix_attendance_date', """
+        SELECT COUNT(id) FROM attendance WHERE date = :day
+    """, {'day': date(2000, 1, 1)}),
+    ('payments of a project', 'ix_project_payment_project_id_status', """
+        SELECT id FROM project_payment WHERE project_id = :project_id AND status = :status
+    """, {'project_id': 1, 'status': 'pending'}),
+    ('pending payments', 'ix_project_payment_status', """
+        SELECT COUNT(id) FROM project_payment WHERE status IN ('pending', 'in-review')
+    """, {}),
+    ('pending leaves', 'ix_leave_status', """
+        SELECT COUNT(id) FROM "leave" WHERE status = :status
+    """, {'status': 'pending'}),
+    ('pending payrolls', 'ix_payroll_status', """
+        SELECT COUNT(id) FROM payroll WHERE status = :status
+    """, {'status': 'pending'}),
+    ('sales of a project', 'ix_sales_project_id', """
+        SELECT id FROM sales WHERE project_id = :project_id
+    """, {'project_id': 1}),
+]
+
+
+def explain(conn, sql, params):
+    """Return the query plan as text"""
+    if conn.dialect.name == 'sqlite':
+        rows = conn.execute(text('EXPLAIN QUERY PLAN ' + sql), params)
+        return '\n'.join(row[-1] for row in rows)
+    rows = conn.execute(text('EXPLAIN ' + sql), params)
+    return '\n'.join(row[0] for row in rows)
+
+
+def check_report_indexes(engine):
+    """
+    EXPLAIN every report query and check its plan uses the expected index
+
+    Returns:
+        List of dictionaries with name, index, used and plan
+    """
+    results = []
+    with engine.connect() as conn:
+        with conn.begin() as transaction:
+            if conn.dialect.name == 'postgresql':
+                conn.execute(text('SET LOCAL enable_seqscan = off'))
+            for name, index, sql, params in REPORT_QUERIES:
+                plan = explain(conn, sql, params)
+                results.append({'name': name, 'index': index, 'used': index in plan, 'plan': plan})
+            transaction.rollback()
+    return results
@@ -0,0 +1,33 @@
+from migrations import add_column, has_table
+from sqlalchemy import text
+
+DESCRIPTION = "Columns and tables previously added by the hand-written migration scripts"
+
+
+def upgrade(conn):
+    add_column(conn, 'user', 'department', "VARCHAR(64) DEFAULT 'general'")
+
+    add_column(conn, 'payroll', 'attendance_based', 'BOOLEAN DEFAULT FALSE')
+    add_column(conn, 'payroll', 'attendance_salary', 'NUMERIC(10, 2) DEFAULT 0')
+    add_column(conn, 'payroll', 'present_days', 'INTEGER DEFAULT 0')
+    add_column(conn, 'payroll', 'absent_days', 'INTEGER DEFAULT 0')
+    add_column(conn, 'payroll', 'late_days', 'INTEGER DEFAULT 0')
+
+    add_column(conn, 'project_payment', 'is_recorded_in_sales', 'BOOLEAN DEFAULT FALSE')
+
+    if has_table(conn, 'employee') and not has_table(conn, 'attendance'):
+        id_column = 'SERIAL PRIMARY KEY' if conn.dialect.name == 'postgresql' else 'INTEGER PRIMARY KEY'
+        conn.execute(text(f"""
+            CREATE TABLE attendance (
+                id {id_column},
+                employee_id INTEGER NOT NULL REFERENCES employee(id),
+                date DATE NOT NULL,
+                check_in_time TIME,
+                check_out_time TIME,
+                status VARCHAR(20) DEFAULT 'present',
+                remarks VARCHAR(255),
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                CONSTRAINT unique_employee_attendance_date UNIQUE (employee_id, date)
+            )
+        """))
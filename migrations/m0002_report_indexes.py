@@ -0,0 +1,28 @@
+from migrations import create_index
+
+DESCRIPTION = "Indexes for the report and dashboard filter columns"
+
+# Same names as the db.Index declarations on the models, so databases
+# created by db.create_all() already have them
+INDEXES = [
+    # Ledger lines of one account, and lines joined from their entries
+    ('ix_journal_entry_line_account_id_journal_entry_id', 'journal_entry_line', ['account_id', 'journal_entry_id']),
+    ('ix_journal_entry_line_journal_entry_id', 'journal_entry_line', ['journal_entry_id']),
+    # Posted entries in a date range (balances, statements); any status by date (ledger)
+    ('ix_journal_entry_status_date', 'journal_entry', ['status', 'date']),
+    ('ix_journal_entry_date', 'journal_entry', ['date']),
+    # Task counts per project and per assignee, grouped by status
+    ('ix_task_project_id_status', 'task', ['project_id', 'status']),
+    ('ix_task_user_id_status', 'task', ['user_id', 'status']),
+    ('ix_attendance_date', 'attendance', ['date']),
+    ('ix_project_payment_project_id_status', 'project_payment', ['project_id', 'status']),
+    ('ix_project_payment_status', 'project_payment', ['status']),
+    ('ix_leave_status', 'leave', ['status']),
+    ('ix_payroll_status', 'payroll', ['status']),
+    ('ix_sales_project_id', 'sales', ['project_id']),
+]
+
+
+def upgrade(conn):
+    for name, table, columns in INDEXES:
+        create_index(conn, name, table, columns)
@@ -0,0 +1,17 @@
+from migrations import has_table
+from sqlalchemy import text
+
+DESCRIPTION = "Counter table for sequential journal entry numbers"
+
+
+def upgrade(conn):
+    if not has_table(conn, 'entry_number_sequence'):
+        conn.execute(text("""
+            CREATE TABLE entry_number_sequence (
+                month VARCHAR(6) NOT NULL,
+                prefix VARCHAR(10) NOT NULL,
+                next_value INTEGER NOT NULL DEFAULT 1,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (month, prefix)
+            )
+        """))
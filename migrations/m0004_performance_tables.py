@@ -0,0 +1,80 @@
+from migrations import has_table
+from sqlalchemy import text
+
+DESCRIPTION = "Balance snapshot, ledger revision, report job and project task counter tables"
+
+
+def upgrade(conn):
+    id_column = 'SERIAL PRIMARY KEY' if conn.dialect.name == 'postgresql' else 'INTEGER PRIMARY KEY'
+
+    if not has_table(conn, 'ledger_revision'):
+        conn.execute(text(f"""
+            CREATE TABLE ledger_revision (
+                id {id_column},
+                entry_date DATE NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """))
+        conn.execute(text("CREATE INDEX ix_ledger_revision_entry_date ON ledger_revision (entry_date)"))
+
+    if not has_table(conn, 'account_balance_snapshot'):
+        conn.execute(text(f"""
+            CREATE TABLE account_balance_snapshot (
+                id {id_column},
+                account_id INTEGER NOT NULL REFERENCES chart_of_account(id),
+                period_id INTEGER NOT NULL REFERENCES accounting_period(id),
+                debit_total NUMERIC(15, 2) NOT NULL DEFAULT 0,
+                credit_total NUMERIC(15, 2) NOT NULL DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                CONSTRAINT unique_account_period_snapshot UNIQUE (account_id, period_id)
+            )
+        """))
+        # Reports read closed periods from the snapshots, so an empty table
+        # would hide every line posted so far. Each line goes to the
+        # latest-starting period containing its date, as PeriodIndex.period_for
+        # buckets it.
+        conn.execute(text("""
+            INSERT INTO account_balance_snapshot (account_id, period_id, debit_total, credit_total, created_at, updated_at)
+            SELECT l.account_id, p.id, SUM(COALESCE(l.debit_amount, 0)), SUM(COALESCE(l.credit_amount, 0)),
+                   CURRENT_TIMESTAMP, CURRENT_TIMESTAMP
+            FROM journal_entry_line l
+            JOIN journal_entry e ON e.id = l.journal_entry_id
+            JOIN accounting_period p ON e.date BETWEEN p.start_date AND p.end_date
+            WHERE e.status = 'POSTED'
+            AND NOT EXISTS (
+                SELECT 1 FROM accounting_period later
+                WHERE e.date BETWEEN later.start_date AND later.end_date
+                AND (later.start_date > p.start_date OR (later.start_date = p.start_date AND later.id > p.id))
+            )
+            GROUP BY l.account_id, p.id
+        """))
+
+    if not has_table(conn, 'report_job'):
+        conn.execute(text(f"""
+            CREATE TABLE report_job (
+                id {id_column},
+                user_id INTEGER REFERENCES "user"(id),
+                job_type VARCHAR(20) NOT NULL DEFAULT 'pdf',
+                filename VARCHAR(255) NOT NULL,
+                status VARCHAR(20) NOT NULL DEFAULT 'queued',
+                cache_key VARCHAR(64),
+                result_path VARCHAR(512),
+                error TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                completed_at TIMESTAMP
+            )
+        """))
+        conn.execute(text("CREATE INDEX ix_report_job_cache_key ON report_job (cache_key)"))
+
+    # Counters are created per project on its first task change, so the
+    # table starts empty
+    if not has_table(conn, 'project_task_counter'):
+        conn.execute(text("""
+            CREATE TABLE project_task_counter (
+                project_id INTEGER PRIMARY KEY REFERENCES project(id),
+                total_tasks INTEGER NOT NULL DEFAULT 0,
+                completed_tasks INTEGER NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """))
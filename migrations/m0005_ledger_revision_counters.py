@@ -0,0 +1,27 @@
+from migrations import has_table, has_column
+from sqlalchemy import text
+
+DESCRIPTION = "One ledger revision counter per entry date"
+
+
+def upgrade(conn):
+    # Databases created by db.create_all() already have the counter table
+    if not has_table(conn, 'ledger_revision') or has_column(conn, 'ledger_revision', 'revision'):
+        return
+
+    # Fold the rows of each date into one counter of how often it changed
+    conn.execute(text("""
+        CREATE TABLE ledger_revision_counter (
+            entry_date DATE PRIMARY KEY,
+            revision INTEGER NOT NULL DEFAULT 1,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """))
+    conn.execute(text("""
+        INSERT INTO ledger_revision_counter (entry_date, revision, updated_at)
+        SELECT entry_date, COUNT(*), MAX(created_at)
+        FROM ledger_revision
+        GROUP BY entry_date
+    """))
+    conn.execute(text("DROP TABLE ledger_revision"))
+    conn.execute(text("ALTER TABLE ledger_revision_counter RENAME TO ledger_revision"))
@@ -72,64 +72,20 @@ class Employee(db.Model):
     
     def get_attendance_summary(self, start_date, end_date):
         """Get attendance summary for a specific period"""
-        attendance_records = self.get_attendance_for_period(start_date, end_date)
-        
-        # Initialize counters
-        total_days = (end_date - start_date).days + 1
-        present_days = 0
-        absent_days = 0
-        late_days = 0
-        
-        # Count attendance statuses
-        for record in attendance_records:
-            if record.status == 'present':
-                present_days += 1
-            elif record.status == 'absent':
-                absent_days += 1
-            elif record.status == 'late':
-                late_days += 1
-        
-        return {
-            'total_days': total_days,
-            'present_days': present_days,
-            'absent_days': absent_days,
-            'late_days': late_days,
-            'attendance_percentage': (present_days / total_days * 100) if total_days > 0 else 0
-        }
+        from blueprints.hr.attendance_stats import get_attendance_summaries
+        return get_attendance_summaries(start_date, end_date, [self.id])[self.id]
     
     def calculate_salary_based_on_attendance(self, start_date, end_date):
         """Calculate salary based on attendance for a specific period"""
-        # Get attendance summary
-        attendance_summary = self.get_attendance_summary(start_date, end_date)
-        
-        # Calculate working days in the period
-        from datetime import timedelta
-        working_days = 0
-        current_date = start_date
-        while current_date <= end_date:
-            # Skip weekends (0 = Monday, 6 = Sunday)
-            if current_date.weekday() < 5:  # Weekdays only
-                working_days += 1
-            current_date += timedelta(days=1)
+        from blueprints.hr.payroll_run import count_business_days, calculate_attendance_pay
         
-        # Calculate daily salary
-        daily_salary = self.salary / working_days if working_days > 0 else 0
+        attendance_summary = self.get_attendance_summary(start_date, end_date)
+        working_days = count_business_days(start_date, end_date)
         
-        # Calculate salary based on attendance
         # Full salary for present days, no salary for absent days, reduced for late
-        present_salary = daily_salary * attendance_summary['present_days']
-        late_salary = daily_salary * 0.5 * attendance_summary['late_days']  # Half pay for late days
-        
-        # Total salary
-        total_salary = present_salary + late_salary
-        
-        return {
-            'daily_salary': daily_salary,
-            'present_salary': present_salary,
-            'late_salary': late_salary,
-            'total_salary': total_salary,
-            'attendance_summary': attendance_summary
-        }
+        salary = calculate_attendance_pay(self.salary, working_days, attendance_summary)
+        salary['attendance_summary'] = attendance_summary
+        return salary
     
     def __repr__(self):
         return f'<Employee {self.full_name}>'
@@ -145,6 +101,10 @@ class Leave(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_leave_status', 'status'),
+    )
+    
     def __repr__(self):
         return f'<Leave {self.leave_type} - {self.status}>'
 
@@ -167,6 +127,10 @@ class Payroll(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_payroll_status', 'status'),
+    )
+    
     def calculate_from_attendance(self):
         """Calculate salary based on attendance"""
         if not self.attendance_based:
@@ -252,17 +216,42 @@ class Project(db.Model):
     milestones = db.relationship('ProjectMilestone', backref='project', lazy=True, cascade='all, delete-orphan')
     payments = db.relationship('ProjectPayment', backref='project', lazy=True)
     sale = db.relationship('Sales', backref='project_sale', uselist=False, cascade='all, delete-orphan')
+    task_counter = db.relationship('ProjectTaskCounter', uselist=False, cascade='all, delete-orphan')
+    
+    def preload_task_counts(self, total, completed):
+        """Attach task counts computed in bulk (see blueprints.project_management.progress)"""
+        self._preloaded_task_counts = (total, completed)
+    
+    def _task_counts(self):
+        """Return (total, completed) task counts, using preloaded counts when available"""
+        preloaded = getattr(self, '_preloaded_task_counts', None)
+        if preloaded is not None:
+            return preloaded
+        
+        # Count in SQL instead of loading the whole tasks collection
+        from blueprints.project_management.progress import get_project_task_counts  # Local import to avoid circular imports
+        return get_project_task_counts([self.id]).get(self.id, (0, 0))
     
     @property
     def progress(self):
-        if not self.tasks:
+        total, completed = self._task_counts()
+        if not total:
             return 0
-        completed_tasks = sum(1 for task in self.tasks if task.status == 'completed')
-        return int((completed_tasks / len(self.tasks)) * 100)
+        return int((completed / total) * 100)
     
     def __repr__(self):
         return f'<Project {self.name}>'
 
+class ProjectTaskCounter(db.Model):
+    """Running task totals per project, maintained by blueprints.project_management.milestone_status"""
+    project_id = db.Column(db.Integer, db.ForeignKey('project.id'), primary_key=True)
+    total_tasks = db.Column(db.Integer, nullable=False, default=0)
+    completed_tasks = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<ProjectTaskCounter {self.project_id}: {self.completed_tasks}/{self.total_tasks}>'
+
 class ProjectMilestone(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
@@ -277,21 +266,14 @@ class ProjectMilestone(db.Model):
     @property
     def progress(self):
         """Calculate milestone progress based on completed tasks in the project"""
-        from sqlalchemy import func
-        from app import db
-        from models import Task  # Local import to avoid circular imports
+        from blueprints.project_management.progress import get_task_counts  # Local import to avoid circular imports
         
-        # Get total number of tasks for this project
-        total_tasks = Task.query.filter_by(project_id=self.project_id).count()
+        # Counts are shared by all milestones of the project for the request
+        project_counts = get_task_counts([self.project_id])
+        total_tasks, completed_tasks = project_counts.get(self.project_id, (0, 0))
         
         if total_tasks == 0:
             return 0
-            
-        # Get number of completed tasks
-        completed_tasks = Task.query.filter_by(
-            project_id=self.project_id, 
-            status='completed'
-        ).count()
         
         # Calculate percentage
         return int((completed_tasks / total_tasks) * 100)
@@ -318,6 +300,11 @@ class ProjectPayment(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     is_recorded_in_sales = db.Column(db.Boolean, default=False)  # Track if payment is reflected in sales
     
+    __table_args__ = (
+        db.Index('ix_project_payment_project_id_status', 'project_id', 'status'),
+        db.Index('ix_project_payment_status', 'status'),
+    )
+    
     # Relationships
     milestone = db.relationship('ProjectMilestone', backref='payment', uselist=False)
     
@@ -348,6 +335,10 @@ class Sales(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_sales_project_id', 'project_id'),
+    )
+    
     def calculate_difference(self):
         """Calculate the difference between total amount and received amount"""
         if self.total_amount and self.received_amount:
@@ -370,6 +361,11 @@ class Task(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_task_project_id_status', 'project_id', 'status'),
+        db.Index('ix_task_user_id_status', 'user_id', 'status'),
+    )
+    
     # Relationship
     milestone = db.relationship('ProjectMilestone', backref='tasks', lazy=True)
     
@@ -388,7 +384,10 @@ class Attendance(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Define unique constraint for employee and date
-    __table_args__ = (db.UniqueConstraint('employee_id', 'date', name='unique_employee_attendance_date'),)
+    __table_args__ = (
+        db.UniqueConstraint('employee_id', 'date', name='unique_employee_attendance_date'),
+        db.Index('ix_attendance_date', 'date'),
+    )
     
     @property
     def total_hours(self):
@@ -402,3 +401,33 @@ class Attendance(db.Model):
     
     def __repr__(self):
         return f'<Attendance {self.employee_id} - {self.date} - {self.status}>'
+
+class ReportJob(db.Model):
+    """Background rendering job for a downloadable report (e.g. a PDF export)"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    job_type = db.Column(db.String(20), nullable=False, default='pdf')
+    filename = db.Column(db.String(255), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, completed, failed
+    cache_key = db.Column(db.String(64), index=True)
+    result_path = db.Column(db.String(512))
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    completed_at = db.Column(db.DateTime)
+    
+    @property
+    def is_finished(self):
+        return self.status in ('completed', 'failed')
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'filename': self.filename,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None
+        }
+    
+    def __repr__(self):
+        return f'<ReportJob {self.id} - {self.status}>'
@@ -50,9 +50,17 @@ class ChartOfAccount(db.Model):
     def __repr__(self):
         return f"{self.code} - {self.name}"
     
-    @property
-    def balance(self):
-        """Calculate the current balance of the account"""
+    def preload_totals(self, debit_sum, credit_sum, has_lines=True):
+        """Attach debit and credit totals computed in bulk (see blueprints.accounting.balances)"""
+        self._preloaded_totals = (debit_sum, credit_sum)
+        self._preloaded_has_lines = has_lines
+    
+    def _totals(self):
+        """Return (debit_sum, credit_sum), using preloaded totals when available"""
+        preloaded = getattr(self, '_preloaded_totals', None)
+        if preloaded is not None:
+            return preloaded
+        
         debit_sum = db.session.query(func.sum(JournalEntryLine.debit_amount)).filter(
             JournalEntryLine.account_id == self.id
         ).scalar() or Decimal('0.00')
@@ -61,11 +69,28 @@ class ChartOfAccount(db.Model):
             JournalEntryLine.account_id == self.id
         ).scalar() or Decimal('0.00')
         
+        return debit_sum, credit_sum
+    
+    @property
+    def balance(self):
+        """Calculate the current balance of the account"""
+        debit_sum, credit_sum = self._totals()
+        
         if self.normal_balance == 'DEBIT':
             return debit_sum - credit_sum
         else:
             return credit_sum - debit_sum
     
+    @property
+    def has_journal_entry_lines(self):
+        """Check if any journal entry lines are posted to the account"""
+        preloaded = getattr(self, '_preloaded_has_lines', None)
+        if preloaded is not None:
+            return preloaded
+        return db.session.query(
+            JournalEntryLine.query.filter(JournalEntryLine.account_id == self.id).exists()
+        ).scalar()
+    
     @property
     def has_children(self):
         """Check if the account has child accounts"""
@@ -134,6 +159,11 @@ class JournalEntry(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_journal_entry_status_date', 'status', 'date'),
+        db.Index('ix_journal_entry_date', 'date'),
+    )
+    
     # Relationships
     lines = db.relationship('JournalEntryLine', backref='journal_entry', lazy=True, cascade='all, delete-orphan')
     user = db.relationship('User', backref='journal_entries')
@@ -168,10 +198,60 @@ class JournalEntryLine(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_journal_entry_line_account_id_journal_entry_id', 'account_id', 'journal_entry_id'),
+        db.Index('ix_journal_entry_line_journal_entry_id', 'journal_entry_id'),
+    )
+    
     def __repr__(self):
         return f"{self.chart_account.code} - {'Debit' if self.debit_amount > 0 else 'Credit'} {abs(self.debit_amount if self.debit_amount > 0 else self.credit_amount)}"
 
 
+class AccountBalanceSnapshot(db.Model):
+    """Posted debit and credit totals per account and accounting period"""
+    __tablename__ = 'account_balance_snapshot'
+    id = db.Column(db.Integer, primary_key=True)
+    account_id = db.Column(db.Integer, db.ForeignKey('chart_of_account.id'), nullable=False)
+    period_id = db.Column(db.Integer, db.ForeignKey('accounting_period.id'), nullable=False)
+    debit_total = db.Column(db.Numeric(15, 2), nullable=False, default=0)
+    credit_total = db.Column(db.Numeric(15, 2), nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Define unique constraint for account and period
+    __table_args__ = (db.UniqueConstraint('account_id', 'period_id', name='unique_account_period_snapshot'),)
+    
+    # Relationships
+    account = db.relationship('ChartOfAccount')
+    period = db.relationship('AccountingPeriod')
+    
+    def __repr__(self):
+        return f"Snapshot {self.account_id}/{self.period_id}: {self.debit_total} Dr {self.credit_total} Cr"
+
+
+class LedgerRevision(db.Model):
+    """Change counter per entry date of posted journal entry lines, used to version report exports"""
+    __tablename__ = 'ledger_revision'
+    entry_date = db.Column(db.Date, primary_key=True)
+    revision = db.Column(db.Integer, nullable=False, default=1)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"LedgerRevision {self.entry_date}: {self.revision}"
+
+
+class EntryNumberSequence(db.Model):
+    """Next journal entry number per month and entry type prefix"""
+    __tablename__ = 'entry_number_sequence'
+    month = db.Column(db.String(6), primary_key=True)  # YYYYMM
+    prefix = db.Column(db.String(10), primary_key=True)
+    next_value = db.Column(db.Integer, nullable=False, default=1)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"EntryNumberSequence {self.month}-{self.prefix}: {self.next_value}"
+
+
 class Currency(db.Model):
     """Currency for multi-currency support"""
     id = db.Column(db.Integer, primary_key=True)
@@ -0,0 +1,19 @@
+from app import create_app
+
+def post_backlog():
+    """Post journal entries for received project payments that were never posted"""
+    app = create_app()
+    with app.app_context():
+        from models import User
+        from blueprints.accounting.posting import post_payment_backlog
+        
+        admin = User.query.filter_by(is_admin=True).order_by(User.id).first()
+        if not admin:
+            print("No admin user found to record as the creator of the entries.")
+            return
+        
+        posted = post_payment_backlog(admin.id)
+        print(f"Posted {posted} payment journal entries.")
+
+if __name__ == "__main__":
+    post_backlog()
@@ -0,0 +1,30 @@
+import sys
+from app import create_app
+
+def rebuild_balance_snapshots(verify_only=False):
+    """Recompute account balance snapshots from the raw journal entry lines"""
+    app = create_app()
+    with app.app_context():
+        from blueprints.accounting.balances import verify_snapshots, rebuild_snapshots
+        
+        drift = verify_snapshots()
+        if drift:
+            print(f"Found {len(drift)} drifted account/period snapshots:")
+            for item in drift:
+                print(f"  {item['period']} | {item['account']}: "
+                      f"stored {item['stored_debits']} Dr / {item['stored_credits']} Cr, "
+                      f"expected {item['expected_debits']} Dr / {item['expected_credits']} Cr")
+        else:
+            print("Balance snapshots match the journal entry lines.")
+        
+        if verify_only:
+            return len(drift)
+        
+        count = rebuild_snapshots()
+        print(f"Rebuilt {count} balance snapshots.")
+        return 0
+
+if __name__ == "__main__":
+    # Use --verify to report drift without rewriting the snapshots
+    verify_only = '--verify' in sys.argv[1:]
+    sys.exit(1 if rebuild_balance_snapshots(verify_only) else 0)
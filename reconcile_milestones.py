@@ -0,0 +1,14 @@
+from app import create_app
+
+def reconcile():
+    """Rebuild project task counters and catch up milestone statuses"""
+    app = create_app()
+    with app.app_context():
+        from blueprints.project_management.milestone_status import reconcile_milestones
+        
+        corrected, completed = reconcile_milestones()
+        print(f"Corrected {corrected} project task counters.")
+        print(f"Marked {completed} pending milestones as completed.")
+
+if __name__ == "__main__":
+    reconcile()
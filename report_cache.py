@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+import tempfile
+from datetime import date, datetime
+from flask import Response, current_app
+
+
+class ReportCache:
+    """
+    Disk cache for rendered report exports with LRU eviction
+    
+    Each entry is one file: a JSON metadata line (filename, mimetype)
+    followed by the raw export. A hit refreshes the file's modification
+    time; when the cache grows past max_bytes the least recently used
+    entries are removed.
+    """
+    
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+    
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.export")
+    
+    def get(self, key):
+        """Return (data, filename, mimetype) for a key, or None on a miss"""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as cache_file:
+                meta = json.loads(cache_file.readline())
+                data = cache_file.read()
+            os.utime(path)  # Mark as recently used
+        except (OSError, ValueError):
+            return None
+        return data, meta['filename'], meta['mimetype']
+    
+    def put(self, key, data, filename, mimetype):
+        """Store an export, then evict old entries if over the size cap"""
+        header = json.dumps({'filename': filename, 'mimetype': mimetype}).encode('utf-8') + b'\n'
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as cache_file:
+                cache_file.write(header)
+                cache_file.write(data)
+            os.replace(tmp_path, self._path(key))
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self.evict()
+    
+    def evict(self):
+        """Remove least recently used entries until the cache fits max_bytes"""
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.export'):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+
+def get_report_cache():
+    """Report cache configured for the current app"""
+    return ReportCache(
+        current_app.config['REPORT_CACHE_DIR'],
+        current_app.config['REPORT_CACHE_MAX_BYTES']
+    )
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def report_cache_key(report_type, export_format, version, **params):
+    """
+    Content address of a report export
+    
+    Args:
+        report_type: Report name, e.g. 'trial_balance'
+        export_format: 'csv' or 'pdf'
+        version: Version of the data the report reads (see ledger_version)
+        params: Report parameters such as dates
+    
+    Returns:
+        Hex digest identifying the export
+    """
+    raw = json.dumps([report_type, export_format, version, params], sort_keys=True, default=_json_default)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def cached_export_response(cache_key):
+    """Return a download response for a cached export, or None on a miss"""
+    cached = get_report_cache().get(cache_key)
+    if not cached:
+        return None
+    
+    data, filename, mimetype = cached
+    return Response(
+        data,
+        mimetype=mimetype,
+        headers={"Content-disposition": f"attachment; filename={filename}"}
+    )
@@ -0,0 +1,192 @@
+import threading
+import time
+from collections import deque
+from flask import g, has_request_context, request, template_rendered, before_render_template
+from sqlalchemy import event
+
+MAX_STATEMENT_LENGTH = 500  # Characters of SQL kept for slow statements
+
+
+class MetricsStore:
+    """
+    Rolling per-endpoint request samples, kept in memory per process
+
+    Each endpoint keeps its last window requests, so percentiles follow
+    recent behaviour and memory stays bounded.
+    """
+
+    def __init__(self, window=500, slow_queries=5):
+        self.window = window
+        self.slow_queries = slow_queries
+        self._samples = {}  # endpoint -> deque of sample dictionaries
+        self._slowest = {}  # endpoint -> list of (duration_ms, statement), slowest first
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, sample, statements):
+        with self._lock:
+            samples = self._samples.get(endpoint)
+            if samples is None:
+                samples = self._samples[endpoint] = deque(maxlen=self.window)
+            samples.append(sample)
+
+            slowest = self._slowest.get(endpoint, []) + statements
+            slowest.sort(key=lambda item: item[0], reverse=True)
+            self._slowest[endpoint] = slowest[:self.slow_queries]
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._slowest.clear()
+
+    def report(self):
+        """
+        Summarize the recorded requests per endpoint
+
+        Returns:
+            List of dictionaries with endpoint, requests, latency and query
+            count percentiles, mean SQL and template time and the slowest
+            statements, busiest endpoints (by total time) first
+        """
+        with self._lock:
+            snapshot = {endpoint: list(samples) for endpoint, samples in self._samples.items()}
+            slowest = {endpoint: list(items) for endpoint, items in self._slowest.items()}
+
+        rows = []
+        for endpoint, samples in snapshot.items():
+            total_ms = sorted(sample['total_ms'] for sample in samples)
+            queries = sorted(sample['queries'] for sample in samples)
+            rows.append({
+                'endpoint': endpoint,
+                'requests': len(samples),
+                'p50_ms': percentile(total_ms, 50),
+                'p95_ms': percentile(total_ms, 95),
+                'p99_ms': percentile(total_ms, 99),
+                'p50_queries': percentile(queries, 50),
+                'p95_queries': percentile(queries, 95),
+                'max_queries': queries[-1],
+                'mean_sql_ms': sum(sample['sql_ms'] for sample in samples) / len(samples),
+                'mean_template_ms': sum(sample['template_ms'] for sample in samples) / len(samples),
+                'slowest_statements': slowest.get(endpoint, [])
+            })
+
+        rows.sort(key=lambda row: row['p50_ms'] * row['requests'], reverse=True)
+        return rows
+
+
+def percentile(sorted_values, percent):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0
+    rank = max(1, -(-len(sorted_values) * percent // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def _current_metrics():
+    if has_request_context():
+        return g.get('request_metrics')
+    return None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # The start time lives on the statement's execution context, not the
+    # pooled connection, so a statement that raises leaves nothing behind
+    if context is not None and _current_metrics() is not None:
+        context.request_metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    metrics = _current_metrics()
+    started = getattr(context, 'request_metrics_started', None)
+    if metrics is None or started is None:
+        return
+
+    duration_ms = (time.perf_counter() - started) * 1000
+    metrics['queries'] += 1
+    metrics['sql_ms'] += duration_ms
+    metrics['statements'].append((duration_ms, statement[:MAX_STATEMENT_LENGTH]))
+
+
+def _before_render_template(app, template, context, **extra):
+    metrics = _current_metrics()
+    if metrics is not None:
+        metrics['template_started'].append(time.perf_counter())
+
+
+def _template_rendered(app, template, context, **extra):
+    metrics = _current_metrics()
+    if metrics is not None and metrics['template_started']:
+        metrics['template_ms'] += (time.perf_counter() - metrics['template_started'].pop()) * 1000
+
+
+def init_request_metrics(app, db):
+    """
+    Record query count, SQL time and template render time per request
+
+    Enabled with the REQUEST_METRICS setting. Each response then carries a
+    Server-Timing header and an X-Query-Count header, and the samples feed
+    the per-endpoint report on the admin metrics page. Streamed response
+    bodies are produced after the request hooks run, so their queries are
+    not counted.
+
+    Args:
+        app: Flask application
+        db: Flask-SQLAlchemy extension bound to the app
+    """
+    store = MetricsStore(
+        window=app.config['REQUEST_METRICS_WINDOW'],
+        slow_queries=app.config['REQUEST_METRICS_SLOW_QUERIES']
+    )
+    app.extensions['request_metrics'] = store
+
+    if not app.config['REQUEST_METRICS']:
+        return store
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(db.engine, 'after_cursor_execute', _after_cursor_execute)
+    before_render_template.connect(_before_render_template, app)
+    template_rendered.connect(_template_rendered, app)
+
+    @app.before_request
+    def start_request_metrics():
+        g.request_metrics = {
+            'started': time.perf_counter(),
+            'queries': 0,
+            'sql_ms': 0.0,
+            'template_ms': 0.0,
+            'template_started': [],
+            'statements': []
+        }
+
+    @app.after_request
+    def finish_request_metrics(response):
+        metrics = g.pop('request_metrics', None)
+        if metrics is None:
+            return response
+
+        total_ms = (time.perf_counter() - metrics['started']) * 1000
+        response.headers['X-Query-Count'] = str(metrics['queries'])
+        response.headers['Server-Timing'] = (
+            f'sql;dur={metrics["sql_ms"]:.1f};desc="{metrics["queries"]} queries", '
+            f'template;dur={metrics["template_ms"]:.1f}, '
+            f'total;dur={total_ms:.1f}'
+        )
+
+        # Static files would drown out the application endpoints
+        if request.endpoint and request.endpoint != 'static':
+            slowest = sorted(metrics['statements'], key=lambda item: item[0], reverse=True)
+            store.record(request.endpoint, {
+                'total_ms': total_ms,
+                'queries': metrics['queries'],
+                'sql_ms': metrics['sql_ms'],
+                'template_ms': metrics['template_ms']
+            }, slowest[:store.slow_queries])
+        return response
+
+    return store
+
+
+def get_metrics_store():
+    """Get the metrics store of the current application"""
+    from flask import current_app
+    return current_app.extensions['request_metrics']
@@ -0,0 +1,199 @@
+"""
+Time the heavy endpoints against the configured database
+
+Logs in through the Flask test client, requests every benchmark endpoint
+and records latency, SQL query count and peak Python memory per endpoint
+into a JSON file. Fill the database first with benchmark_data.py:
+
+    DATABASE_URL=sqlite:///benchmark.db python run_benchmarks.py --output baseline.json
+    DATABASE_URL=sqlite:///benchmark.db python run_benchmarks.py --compare baseline.json
+
+The dashboard statistics cache is disabled and the report cache points at
+a fresh directory, so repeated requests measure the real work. Report
+exports cache their output, so for them first_ms is the cold run and
+median_ms the cached one.
+
+In CI, run it with RAISE_ON_LAZY_LOAD=1: a list view whose template
+lazy-loads a relationship then fails with a server error, and the script
+exits with status 1 when any endpoint fails.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+os.environ.setdefault('DASHBOARD_STATS_TTL', '0')
+os.environ.setdefault('REPORT_CACHE_DIR', tempfile.mkdtemp(prefix='benchmark_report_cache_'))
+os.environ.setdefault('PDF_WORKERS', '0')
+
+from sqlalchemy import event
+from app import create_app, db
+
+
+def benchmark_endpoints():
+    """(name, method, url, form data) of every benchmarked request"""
+    from models import Project, Employee
+
+    today = date.today()
+    year_ago = (today - timedelta(days=365)).isoformat()
+    quarter_ago = (today - timedelta(days=90)).isoformat()
+    project = Project.query.order_by(Project.id.desc()).first()
+    employee = Employee.query.order_by(Employee.id).first()
+
+    endpoints = [
+        ('dashboard', 'GET', '/dashboard', None),
+        ('projects', 'GET', '/projects', None),
+        ('tasks', 'GET', '/tasks', None),
+        ('payments', 'GET', '/payments', None),
+        ('sales', 'GET', '/sales', None),
+        ('projects_export', 'GET', '/projects/export', None),
+        ('employees', 'GET', '/hr/employees', None),
+        ('attendance', 'GET', '/hr/attendance', None),
+        ('leaves', 'GET', '/hr/leaves', None),
+        ('attendance_export', 'GET', '/hr/attendance/export', None),
+        ('attendance_report_all', 'POST', '/hr/attendance/report',
+         {'employee_id': 0, 'start_date': quarter_ago, 'end_date': today.isoformat()}),
+        ('payroll', 'GET', '/hr/payroll', None),
+        ('chart_of_accounts', 'GET', '/accounting/chart-of-accounts', None),
+        ('journal_entries', 'GET', '/accounting/journal-entries', None),
+        ('users', 'GET', '/accounts/users', None),
+        ('general_ledger', 'GET', f'/accounting/general-ledger?from_date={year_ago}', None),
+        ('general_ledger_csv', 'GET', f'/accounting/general-ledger?from_date={year_ago}&export=csv', None),
+        ('trial_balance', 'GET', '/accounting/trial_balance', None),
+        ('balance_sheet', 'GET', '/accounting/balance_sheet', None),
+        ('income_statement', 'GET', f'/accounting/income_statement?from_date={year_ago}', None),
+        ('cash_flow', 'GET', f'/accounting/cash_flow?from_date={year_ago}', None),
+        ('trial_balance_csv', 'GET', '/accounting/trial_balance?export=csv', None),
+    ]
+    if project:
+        endpoints.append(('project_detail', 'GET', f'/projects/{project.id}', None))
+    if employee:
+        endpoints.append(('attendance_report_employee', 'POST', '/hr/attendance/report',
+                          {'employee_id': employee.id, 'start_date': year_ago, 'end_date': today.isoformat()}))
+    return endpoints
+
+
+def timed_request(client, method, url, data, counter, trace_memory=False):
+    """
+    Make one request and read the whole body, so streamed responses count
+
+    Returns:
+        Tuple of (status code, milliseconds, query count, peak bytes or None)
+    """
+    counter['queries'] = 0
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    response = client.open(url, method=method, data=data)
+    response.get_data()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    peak = None
+    if trace_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    response.close()
+    return response.status_code, elapsed_ms, counter['queries'], peak
+
+
+def run(args):
+    app = create_app()
+    app.config['WTF_CSRF_ENABLED'] = False
+    counter = {'queries': 0}
+
+    with app.app_context():
+        @event.listens_for(db.engine, 'before_cursor_execute')
+        def count_query(*unused):
+            counter['queries'] += 1
+
+        endpoints = benchmark_endpoints()
+        dialect = db.engine.dialect.name
+
+    client = app.test_client()
+    response = client.post('/accounts/login', data={'username': args.username, 'password': args.password})
+    if response.status_code != 302:
+        sys.exit(f"Login as {args.username} failed")
+
+    results = {}
+    for name, method, url, data in endpoints:
+        if args.only and name not in args.only:
+            continue
+        status, first_ms, queries, _ = timed_request(client, method, url, data, counter)
+        timings = [timed_request(client, method, url, data, counter)[1] for _ in range(args.repeat)]
+        _, _, _, peak = timed_request(client, method, url, data, counter, trace_memory=True)
+
+        results[name] = {
+            'method': method,
+            'url': url,
+            'status': status,
+            'first_ms': round(first_ms, 2),
+            'median_ms': round(statistics.median(timings), 2) if timings else round(first_ms, 2),
+            'min_ms': round(min(timings), 2) if timings else round(first_ms, 2),
+            'queries': queries,
+            'peak_memory_kb': round(peak / 1024, 1)
+        }
+        print(f"{name:28} {status}  {results[name]['median_ms']:10.1f} ms  "
+              f"{queries:6d} queries  {results[name]['peak_memory_kb']:10.1f} KB")
+
+    return {
+        'created_at': datetime.utcnow().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'database': dialect,
+        'python': platform.python_version(),
+        'repeat': args.repeat,
+        'results': results
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline, current):
+    """Print the change of every metric against a baseline run"""
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'} ({baseline.get('created_at')}):")
+    for name, result in current['results'].items():
+        before = baseline['results'].get(name)
+        if not before:
+            print(f"{name:28} new")
+            continue
+        ms_change = (result['median_ms'] - before['median_ms']) / before['median_ms'] * 100 if before['median_ms'] else 0
+        print(f"{name:28} {before['median_ms']:10.1f} -> {result['median_ms']:10.1f} ms ({ms_change:+.0f}%)  "
+              f"{before['queries']:6d} -> {result['queries']:6d} queries  "
+              f"{before['peak_memory_kb']:10.1f} -> {result['peak_memory_kb']:10.1f} KB")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='baseline JSON file to compare against')
+    parser.add_argument('--repeat', type=int, default=5, help='timed requests per endpoint after the first')
+    parser.add_argument('--only', nargs='*', help='benchmark only these endpoint names')
+    parser.add_argument('--username', default='admin')
+    parser.add_argument('--password', default='admin123')
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    current = run(args)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f"Results written to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), current)
+    failed = [name for name, result in current['results'].items() if result['status'] >= 500]
+    if failed:
+        sys.exit(f"Failed endpoints: {', '.join(failed)}")
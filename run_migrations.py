@@ -1,67 +1,68 @@
+import argparse
 import os
-import psycopg2
-from psycopg2 import sql
+import sys
+from flask import Flask
+from app import db, DEFAULT_DATABASE_URL
 
-def run_migrations():
-    """Run database migrations using direct SQL queries"""
-    # Get database URL from environment
-    db_url = os.environ.get('DATABASE_URL')
+def migration_app():
+    """
+    Minimal app bound to the configured database
     
-    if not db_url:
-        print("DATABASE_URL environment variable not set.")
-        return
+    create_app() queries the models on startup, which fails while columns
+    are still missing, so migrations run without it. The import name
+    matches create_app(), so relative SQLite paths resolve to the same
+    instance folder.
+    """
+    app = Flask('app')
+    app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", DEFAULT_DATABASE_URL)
+    db.init_app(app)
+    return app
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply versioned database migrations")
+    parser.add_argument('--status', action='store_true', help='list migrations and whether they are applied')
+    parser.add_argument('--target', type=int, help='stop after this version')
+    parser.add_argument('--explain', action='store_true',
+                        help='check that the report queries use their indexes')
+    args = parser.parse_args(argv)
     
-    print("Connecting to database...")
-    conn = psycopg2.connect(db_url)
-    cursor = conn.cursor()
+    from migrations import load_migrations, applied_versions, run_migrations
+    from migrations.explain import check_report_indexes
     
-    try:
-        # Migration 1: Add department column to User table
-        print("Adding department column to User table...")
-        cursor.execute("""
-            ALTER TABLE "user" 
-            ADD COLUMN IF NOT EXISTS department VARCHAR(64) DEFAULT 'general'
-        """)
-        
-        # Migration 2: Update Payroll table with attendance-related columns
-        print("Updating Payroll table with attendance columns...")
-        cursor.execute("""
-            ALTER TABLE payroll 
-            ADD COLUMN IF NOT EXISTS attendance_based BOOLEAN DEFAULT FALSE,
-            ADD COLUMN IF NOT EXISTS attendance_salary NUMERIC(10, 2) DEFAULT 0,
-            ADD COLUMN IF NOT EXISTS present_days INTEGER DEFAULT 0,
-            ADD COLUMN IF NOT EXISTS absent_days INTEGER DEFAULT 0,
-            ADD COLUMN IF NOT EXISTS late_days INTEGER DEFAULT 0
-        """)
+    app = migration_app()
+    with app.app_context():
+        engine = db.engine
+        print(f"Database: {engine.url.render_as_string(hide_password=True)}")
         
-        # Migration 3: Create Attendance table if it doesn't exist
-        print("Creating Attendance table if it doesn't exist...")
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS attendance (
-                id SERIAL PRIMARY KEY,
-                employee_id INTEGER NOT NULL REFERENCES employee(id),
-                date DATE NOT NULL,
-                check_in_time TIME,
-                check_out_time TIME,
-                status VARCHAR(20) DEFAULT 'present',
-                remarks VARCHAR(255),
-                created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-                CONSTRAINT unique_employee_attendance_date UNIQUE (employee_id, date)
-            )
-        """)
+        if args.status:
+            applied = applied_versions(engine)
+            for migration in load_migrations():
+                state = 'applied' if migration.version in applied else 'pending'
+                print(f"  {migration.version:04d} {migration.name:30} {state:8} {migration.description}")
+            return 0
         
-        # Commit all migrations
-        conn.commit()
-        print("Database migrations completed successfully.")
+        if args.explain:
+            missing = 0
+            for result in check_report_indexes(engine):
+                if result['used']:
+                    print(f"  ok       {result['name']} uses {result['index']}")
+                else:
+                    missing += 1
+                    print(f"  MISSING  {result['name']} does not use {result['index']}")
+                    print('           ' + result['plan'].replace('\n', '\n           '))
+            return 1 if missing else 0
         
-    except Exception as e:
-        conn.rollback()
-        print(f"Error during migration: {e}")
+        try:
+            applied = run_migrations(engine, target=args.target)
+        except Exception as e:
+            print(f"Error during migration: {e}")
+            return 1
         
-    finally:
-        cursor.close()
-        conn.close()
+        for migration in applied:
+            print(f"Applied {migration.version:04d} {migration.name}: {migration.description}")
+        if not applied:
+            print("Database is up to date.")
+        return 0
 
 if __name__ == "__main__":
-    run_migrations()
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,57 @@
+import os
+import shutil
+import tempfile
+import pytest
+
+# The app reads its settings when it is created, so they are set before
+# it is imported
+_TEST_DIR = tempfile.mkdtemp(prefix='erp-tests-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_TEST_DIR, 'test.db')
+os.environ['SESSION_SECRET'] = 'test'
+os.environ['REPORT_JOB_DIR'] = os.path.join(_TEST_DIR, 'report_jobs')
+os.environ['REPORT_CACHE_DIR'] = os.path.join(_TEST_DIR, 'report_cache')
+os.environ['PDF_WORKERS'] = '0'
+os.environ['RAISE_ON_LAZY_LOAD'] = '1'
+
+from app import create_app, db  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def app():
+    app = create_app()
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    yield app
+    shutil.rmtree(_TEST_DIR, ignore_errors=True)
+
+
+@pytest.fixture
+def session(app):
+    """Empty database with the admin user, chart of accounts and this year's periods"""
+    from werkzeug.security import generate_password_hash
+    from models import User
+    from blueprints.accounting.routes import initialize_accounting
+    from blueprints.accounting.reference_data import invalidate_reference_data
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        invalidate_reference_data()
+        db.session.add(User(
+            username='admin',
+            email='admin@example.com',
+            password_hash=generate_password_hash('admin123'),
+            is_admin=True
+        ))
+        db.session.commit()
+        initialize_accounting()
+        yield db.session
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app, session):
+    """Test client logged in as the admin user"""
+    client = app.test_client()
+    response = client.post('/accounts/login', data={'username': 'admin', 'password': 'admin123'})
+    assert response.status_code == 302
+    return client
@@ -0,0 +1,94 @@
+import io
+import json
+from datetime import date, time
+import pytest
+from app import db
+from models import Employee, Attendance
+from blueprints.hr.attendance_ingest import iter_json_events, parse_event, EventError
+
+
+def json_stream(payload):
+    return io.BytesIO(json.dumps(payload).encode('utf-8'))
+
+
+def add_employee(session):
+    employee = Employee(user_id=1, first_name='Ada', last_name='Lovelace', department='hr',
+                        position='Analyst', hire_date=date(2020, 1, 1), salary=1000)
+    session.add(employee)
+    session.commit()
+    return employee
+
+
+@pytest.mark.parametrize('payload', [{}, {'foo': 1}, {'events': None}, {'events': {}}, 'events', 3])
+def test_json_body_without_events_array_is_rejected(payload):
+    with pytest.raises(ValueError):
+        list(iter_json_events(json_stream(payload)))
+
+
+@pytest.mark.parametrize('payload', [[], {'events': []}])
+def test_empty_events_array_is_accepted(payload):
+    assert list(iter_json_events(json_stream(payload))) == []
+
+
+def test_invalid_json_is_rejected():
+    with pytest.raises(ValueError):
+        list(iter_json_events(io.BytesIO(b'[{"employee_id": 1,')))
+
+
+def test_events_are_numbered_from_one():
+    events = [{'employee_id': 1}, {'employee_id': 2}]
+    assert list(iter_json_events(json_stream({'events': events}))) == [(1, events[0]), (2, events[1])]
+
+
+@pytest.mark.parametrize('event, message', [
+    ('{"employee_id": 1', 'invalid JSON'),
+    ('[1]', 'event must be an object'),
+    ({'timestamp': '2026-01-05T09:00', 'event': 'in'}, 'missing field employee_id'),
+    ({'employee_id': 1, 'timestamp': 'yesterday', 'event': 'in'}, 'Invalid isoformat'),
+    ({'employee_id': 1, 'timestamp': '2026-01-05T09:00', 'event': 'lunch'}, "unknown event type 'lunch'"),
+])
+def test_malformed_events_raise_event_error(event, message):
+    with pytest.raises(EventError, match=message):
+        parse_event(event)
+
+
+@pytest.mark.parametrize('body', [b'{}', b'{"foo": 1}', b'not json'])
+def test_endpoint_rejects_unreadable_json_body(client, body):
+    response = client.post('/hr/attendance/events', data=body, content_type='application/json')
+    assert response.status_code == 400
+
+
+def test_endpoint_keeps_first_check_in_and_last_check_out(client, session):
+    employee = add_employee(session)
+    events = [
+        {'employee_id': employee.id, 'timestamp': '2026-01-05T17:00', 'event': 'out'},
+        {'employee_id': employee.id, 'timestamp': '2026-01-05T09:30', 'event': 'in'},
+        {'employee_id': employee.id, 'timestamp': '2026-01-05T08:55', 'event': 'check-in'},
+        {'employee_id': employee.id, 'timestamp': '2026-01-05T12:00', 'event': 'out'},
+        {'employee_id': employee.id + 1, 'timestamp': '2026-01-05T09:00', 'event': 'in'},
+        {'employee_id': employee.id, 'timestamp': '2026-01-05T09:00', 'event': 'nap'}
+    ]
+    response = client.post('/hr/attendance/events', json={'events': events})
+    assert response.status_code == 200
+    result = response.get_json()
+    assert (result['events'], result['employee_days'], result['rejected']) == (4, 1, 2)
+
+    record = db.session.query(Attendance).filter_by(employee_id=employee.id).one()
+    assert (record.date, record.check_in_time, record.check_out_time, record.status) == (
+        date(2026, 1, 5), time(8, 55), time(17, 0), 'present'
+    )
+
+
+def test_endpoint_merges_with_stored_records(client, session):
+    employee = add_employee(session)
+    client.post('/hr/attendance/events', data=f'employee_id,timestamp,event\n{employee.id},2026-01-05T09:40,in\n',
+                content_type='text/csv')
+    ndjson = '\n'.join(json.dumps(event) for event in [
+        {'employee_id': employee.id, 'timestamp': '2026-01-05T10:00', 'event': 'in'},
+        {'employee_id': employee.id, 'timestamp': '2026-01-05T18:00', 'event': 'out'}
+    ])
+    response = client.post('/hr/attendance/events', data=ndjson, content_type='application/x-ndjson')
+    assert response.status_code == 200
+
+    record = db.session.query(Attendance).filter_by(employee_id=employee.id).one()
+    assert (record.check_in_time, record.check_out_time, record.status) == (time(9, 40), time(18, 0), 'late')
@@ -0,0 +1,116 @@
+from datetime import date
+import pytest
+from app import db
+from models_accounting import AccountingPeriod, AccountBalanceSnapshot, ChartOfAccount, JournalEntry, JournalEntryLine
+from blueprints.accounting.balances import get_account_totals, verify_snapshots
+from blueprints.accounting.posting import post_journal_batch
+
+YEAR = date.today().year
+
+
+def entry(day, amount, debit='Cash', credit='Accounts Receivable'):
+    return {
+        'date': day,
+        'entry_type': 'PAYMENT',
+        'lines': [
+            {'account': debit, 'debit_amount': amount, 'credit_amount': 0},
+            {'account': credit, 'debit_amount': 0, 'credit_amount': amount}
+        ]
+    }
+
+
+def period(name):
+    return AccountingPeriod.query.filter_by(name=f'{name} {YEAR}').one()
+
+
+def account(name):
+    return ChartOfAccount.query.filter_by(name=name).one()
+
+
+def test_snapshots_follow_line_changes(client):
+    entry_ids = post_journal_batch([entry(date(YEAR, 2, 10), 100), entry(date(YEAR, 5, 1), 30)], 1)
+    draft_id, = post_journal_batch([entry(date(YEAR, 2, 11), 8)], 1, status='DRAFT')
+
+    # Add a line to a posted entry, then delete one of its original lines
+    response = client.post(f'/accounting/journal-entries/{entry_ids[0]}/lines', data={
+        'account_id': account('Sales Revenue').id, 'debit_amount': '0', 'credit_amount': '15'
+    })
+    assert response.status_code == 302
+    line = JournalEntryLine.query.filter_by(journal_entry_id=entry_ids[1], debit_amount=0).one()
+    response = client.post(f'/accounting/journal-entries/{entry_ids[1]}/lines/{line.id}/delete')
+    assert response.status_code == 302
+
+    # Lines added to a draft only count once it is posted
+    client.post(f'/accounting/journal-entries/{draft_id}/lines/'
+                f'{JournalEntryLine.query.filter_by(journal_entry_id=draft_id, credit_amount=0).one().id}/delete')
+    client.post(f'/accounting/journal-entries/{draft_id}/lines', data={
+        'account_id': account('Cash').id, 'debit_amount': '8', 'credit_amount': '0'
+    })
+    assert client.post(f'/accounting/journal-entries/{draft_id}/post').status_code == 302
+    assert db.session.get(JournalEntry, draft_id).status == 'POSTED'
+
+    assert verify_snapshots() == []
+
+    # Closing and reshaping periods rebuilds the snapshots around them
+    first_quarter = period('Q1')
+    first_quarter.is_closed = True
+    first_quarter.end_date = date(YEAR, 2, 10)
+    period('Q2').start_date = date(YEAR, 2, 11)
+    db.session.commit()
+    assert verify_snapshots() == []
+
+
+def test_delete_account_removes_its_snapshots(client):
+    petty_cash = ChartOfAccount(code='1010', name='Petty Cash', account_type='ASSET', normal_balance='DEBIT')
+    db.session.add(petty_cash)
+    db.session.commit()
+    entry_id, = post_journal_batch([entry(date(YEAR, 3, 1), 20, debit='Petty Cash')], 1)
+
+    line = JournalEntryLine.query.filter_by(journal_entry_id=entry_id, account_id=petty_cash.id).one()
+    client.post(f'/accounting/journal-entries/{entry_id}/lines/{line.id}/delete')
+    assert AccountBalanceSnapshot.query.filter_by(account_id=petty_cash.id).count() == 1
+
+    response = client.post(f'/accounting/chart-of-accounts/{petty_cash.id}/delete')
+    assert response.status_code == 302
+    db.session.expire_all()
+    assert db.session.get(ChartOfAccount, petty_cash.id) is None
+    assert AccountBalanceSnapshot.query.filter_by(account_id=petty_cash.id).count() == 0
+    assert verify_snapshots() == []
+
+
+def raw_totals(from_date, to_date, status):
+    query = db.session.query(
+        JournalEntryLine.account_id,
+        db.func.sum(JournalEntryLine.debit_amount),
+        db.func.sum(JournalEntryLine.credit_amount)
+    ).join(JournalEntry).group_by(JournalEntryLine.account_id)
+    if status:
+        query = query.filter(JournalEntry.status == status)
+    if from_date:
+        query = query.filter(JournalEntry.date >= from_date)
+    if to_date:
+        query = query.filter(JournalEntry.date <= to_date)
+    return {account_id: (debits, credits) for account_id, debits, credits in query}
+
+
+@pytest.mark.parametrize('from_date, to_date', [
+    (None, None),
+    (None, date(YEAR, 3, 31)),
+    (date(YEAR, 1, 1), date(YEAR, 6, 30)),
+    (date(YEAR, 2, 1), None),
+    (date(YEAR, 4, 1), date(YEAR, 9, 30)),
+    (date(YEAR, 7, 1), date(YEAR, 7, 31))
+])
+@pytest.mark.parametrize('status', ['POSTED', None])
+def test_account_totals_match_raw_sums(session, from_date, to_date, status):
+    post_journal_batch([
+        entry(date(YEAR, month, 10), 10 * month, credit='Sales Revenue' if month % 2 else 'Accounts Receivable')
+        for month in range(1, 13)
+    ], 1)
+    post_journal_batch([entry(date(YEAR, 2, 20), 7), entry(date(YEAR, 8, 20), 9)], 1, status='DRAFT')
+    for name in ('Q1', 'Q3'):
+        period(name).is_closed = True
+    db.session.commit()
+
+    totals = get_account_totals(from_date, to_date, status=status)
+    assert {account_id: (t.debits, t.credits) for account_id, t in totals.items()} == raw_totals(from_date, to_date, status)
@@ -0,0 +1,61 @@
+from datetime import date
+from app import db
+from models_accounting import JournalEntry
+from blueprints.accounting.entry_numbers import next_entry_number, reserve_entry_numbers, format_entry_number
+from blueprints.accounting.posting import post_journal_batch
+
+
+def test_numbers_increase_per_month_and_type(session):
+    numbers = [
+        next_entry_number(date(2026, 1, 5), 'PAYMENT'),
+        next_entry_number(date(2026, 1, 31), 'PAYMENT'),
+        next_entry_number(date(2026, 2, 1), 'PAYMENT'),
+        next_entry_number(date(2026, 1, 2), 'MANUAL'),
+        next_entry_number(date(2026, 1, 20), 'PAYMENT'),
+        next_entry_number(date(2026, 1, 20), None)
+    ]
+    assert numbers == [
+        'JE-202601-PA-000001',
+        'JE-202601-PA-000002',
+        'JE-202602-PA-000001',
+        'JE-202601-MA-000001',
+        'JE-202601-PA-000003',
+        'JE-202601-JE-000001'
+    ]
+
+
+def test_reserved_numbers_are_consecutive_in_key_order(session):
+    first = next_entry_number(date(2026, 3, 1), 'PAYMENT')
+    keys = [(date(2026, 3, 9), 'PAYMENT'), (date(2026, 4, 1), 'PAYMENT'), (date(2026, 3, 2), 'PAYMENT'),
+            (date(2026, 3, 2), 'MANUAL')]
+    numbers = reserve_entry_numbers(keys)
+    after = next_entry_number(date(2026, 3, 1), 'PAYMENT')
+
+    assert first == format_entry_number('202603', 'PA', 1)
+    assert numbers == [
+        format_entry_number('202603', 'PA', 2),
+        format_entry_number('202604', 'PA', 1),
+        format_entry_number('202603', 'PA', 3),
+        format_entry_number('202603', 'MA', 1)
+    ]
+    assert after == format_entry_number('202603', 'PA', 4)
+
+
+def test_batch_entries_are_numbered_in_order(session):
+    year = date.today().year
+
+    def entry(day):
+        return {'date': day, 'entry_type': 'PAYMENT', 'lines': [
+            {'account': 'Cash', 'debit_amount': 1, 'credit_amount': 0},
+            {'account': 'Accounts Receivable', 'debit_amount': 0, 'credit_amount': 1}
+        ]}
+
+    days = [date(year, 5, 9), date(year, 5, 1), date(year, 5, 30)]
+    for gap_free in (False, True):
+        entry_ids = post_journal_batch([entry(day) for day in days], 1, gap_free=gap_free)
+        numbers = [db.session.get(JournalEntry, entry_id).entry_number for entry_id in entry_ids]
+        assert numbers == sorted(numbers)
+        assert len(set(numbers)) == len(numbers)
+
+    all_numbers = [number for (number,) in db.session.query(JournalEntry.entry_number).order_by(JournalEntry.id)]
+    assert all_numbers == [format_entry_number(f'{year}05', 'PA', value) for value in range(1, 7)]
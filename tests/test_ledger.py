@@ -0,0 +1,63 @@
+from datetime import date
+import pytest
+from app import db
+from models_accounting import AccountingPeriod, JournalEntry
+from blueprints.accounting.ledger import get_ledger_page, iter_ledger_rows
+from blueprints.accounting.posting import post_journal_batch
+
+YEAR = date.today().year
+
+
+def entry(day, amount):
+    return {
+        'date': day,
+        'entry_type': 'PAYMENT',
+        'lines': [
+            {'account': 'Cash', 'debit_amount': amount, 'credit_amount': 0},
+            {'account': 'Accounts Receivable', 'debit_amount': 0, 'credit_amount': amount}
+        ]
+    }
+
+
+@pytest.fixture
+def ledger(session):
+    """Posted and draft entries in a closed first quarter and an open second quarter"""
+    post_journal_batch([entry(date(YEAR, 1, 10), 100), entry(date(YEAR, 2, 1), 40)], 1)
+    post_journal_batch([entry(date(YEAR, 3, 5), 7)], 1, status='DRAFT')
+    post_journal_batch([entry(date(YEAR, 4, 2), 25), entry(date(YEAR, 5, 20), 60)], 1)
+    post_journal_batch([entry(date(YEAR, 4, 3), 3)], 1, status='DRAFT')
+
+    JournalEntry.query.filter(JournalEntry.date.in_([date(YEAR, 2, 1), date(YEAR, 5, 20)])).update(
+        {'entry_type': 'ADJUSTMENT'}
+    )
+    first_quarter = AccountingPeriod.query.filter_by(name=f'Q1 {YEAR}').one()
+    first_quarter.is_closed = True
+    db.session.commit()
+
+
+def all_pages(per_page, **filters):
+    rows, cursor = get_ledger_page(per_page=per_page, **filters)
+    while cursor:
+        page, cursor = get_ledger_page(cursor=cursor, per_page=per_page, **filters)
+        rows.extend(page)
+    return [(row['line_id'], row['running_balance']) for row in rows]
+
+
+@pytest.mark.parametrize('per_page', [1, 2, 3, 100])
+@pytest.mark.parametrize('filters', [
+    {},
+    {'from_date': date(YEAR, 4, 1)},
+    {'entry_type': 'ADJUSTMENT'},
+    {'to_date': date(YEAR, 4, 30)}
+])
+def test_paged_running_balances_match_streamed_ledger(ledger, per_page, filters):
+    streamed = [(row['line_id'], row['running_balance']) for row in iter_ledger_rows(**filters)]
+    assert streamed
+    assert all_pages(per_page, **filters) == streamed
+
+
+def test_opening_balance_includes_closed_period_snapshots(ledger):
+    rows, _ = get_ledger_page(from_date=date(YEAR, 4, 1))
+    cash = [row for row in rows if row['account_name'] == 'Cash']
+    # 140 posted and 7 draft before April, then the April lines
+    assert [row['running_balance'] for row in cash][:2] == [172, 175]
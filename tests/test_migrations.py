@@ -0,0 +1,47 @@
+from datetime import date
+from sqlalchemy import text
+from app import db
+from models_accounting import AccountingPeriod
+from migrations import load_migrations
+from migrations.m0004_performance_tables import upgrade as upgrade_0004
+from blueprints.accounting.balances import verify_snapshots
+from blueprints.accounting.posting import post_journal_batch
+
+YEAR = date.today().year
+
+
+def entry(day, amount):
+    return {
+        'date': day,
+        'entry_type': 'PAYMENT',
+        'lines': [
+            {'account': 'Cash', 'debit_amount': amount, 'credit_amount': 0},
+            {'account': 'Accounts Receivable', 'debit_amount': 0, 'credit_amount': amount}
+        ]
+    }
+
+
+def test_snapshot_backfill_buckets_lines_like_the_period_index(session):
+    first_quarter = AccountingPeriod.query.filter_by(name=f'Q1 {YEAR}').one()
+    # Overlaps Q1; lines dated inside it belong to it, the later start
+    session.add(AccountingPeriod(fiscal_year_id=first_quarter.fiscal_year_id, name='February',
+                                 start_date=date(YEAR, 2, 1), end_date=date(YEAR, 2, 28)))
+    session.commit()
+    post_journal_batch([entry(date(YEAR, 1, 15), 10), entry(date(YEAR, 2, 3), 20), entry(date(YEAR, 3, 9), 40),
+                        entry(date(YEAR, 8, 1), 80)], 1)
+    post_journal_batch([entry(date(YEAR, 2, 4), 5)], 1, status='DRAFT')
+
+    with db.engine.begin() as conn:
+        conn.execute(text('DROP TABLE account_balance_snapshot'))
+        upgrade_0004(conn)
+
+    assert verify_snapshots() == []
+
+
+def test_migrations_are_idempotent_on_a_created_database(session):
+    post_journal_batch([entry(date(YEAR, 1, 15), 10)], 1)
+    with db.engine.begin() as conn:
+        for migration in load_migrations():
+            migration.upgrade(conn)
+
+    assert verify_snapshots() == []
@@ -1,68 +1,115 @@
 import csv
 import io
+import itertools
 from datetime import datetime, timedelta
 import base64
-from flask import Response, render_template, url_for
+from flask import Response, render_template, url_for, redirect, stream_with_context
+from flask_login import current_user
 import pdfkit
-from xhtml2pdf import pisa
+from jobs import submit_pdf_job
+from report_cache import get_report_cache, cached_export_response
 
-def generate_csv(data, filename, headers=None):
+CSV_CHUNK_ROWS = 500
+EXPORT_BATCH_SIZE = 1000  # Rows fetched per round trip by streamed exports (yield_per)
+
+def iter_csv(rows, headers=None):
     """
-    Generate a CSV file from data
+    Encode rows as CSV, yielding UTF-8 chunks of CSV_CHUNK_ROWS rows
+    
+    Only one chunk is held in memory at a time, so rows can be a generator
+    over a query using yield_per.
     
     Args:
-        data: List of dictionaries or objects
-        filename: Name of the CSV file
-        headers: List of header names (optional)
+        rows: Iterable of lists/tuples or dictionaries
+        headers: Header row (optional, written first)
     
-    Returns:
-        Flask Response object with the CSV file
+    Yields:
+        Encoded CSV chunks
     """
-    output = io.StringIO()
-    writer = csv.writer(output)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
     
-    # Write headers
     if headers:
         writer.writerow(headers)
-    elif data and isinstance(data[0], dict):
-        writer.writerow(data[0].keys())
     
-    # Write data
-    for row in data:
+    for count, row in enumerate(rows, 1):
         if isinstance(row, dict):
-            writer.writerow(row.values())
-        else:
-            writer.writerow(row)
+            row = row.values()
+        writer.writerow(row)
+        
+        if count % CSV_CHUNK_ROWS == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+def stream_csv(chunks, filename):
+    """
+    Stream encoded CSV chunks as a file download
     
-    output.seek(0)
+    The generator runs after the view returns, inside the request context,
+    so it can keep reading from the database session.
+    
+    Args:
+        chunks: Iterable of encoded CSV chunks (see iter_csv)
+        filename: Full name of the CSV file including extension
+    
+    Returns:
+        Streamed Flask Response object
+    """
     return Response(
-        output.getvalue(),
+        stream_with_context(chunks),
         mimetype="text/csv",
-        headers={"Content-disposition": f"attachment; filename={filename}.csv"}
+        headers={"Content-disposition": f"attachment; filename={filename}"}
     )
 
-def generate_pdf(template_name, filename, **context):
+def generate_csv(data, filename, headers=None):
+    """
+    Generate a CSV file from data
+    
+    Args:
+        data: Iterable of dictionaries or lists; may be a generator
+        filename: Name of the CSV file
+        headers: List of header names (optional)
+    
+    Returns:
+        Streamed Flask Response object with the CSV file
+    """
+    rows = iter(data)
+    
+    # Use the keys of the first dictionary as headers
+    if not headers:
+        first = next(rows, None)
+        if first is not None:
+            if isinstance(first, dict):
+                headers = list(first.keys())
+            rows = itertools.chain([first], rows)
+    
+    return stream_csv(iter_csv(rows, headers), f"{filename}.csv")
+
+def generate_pdf(template_name, filename, cache_key=None, **context):
     """
     Generate a PDF file from a template
     
+    The template is rendered in the request; converting it to PDF is queued
+    as a background job (see jobs.submit_pdf_job).
+    
     Args:
         template_name: Name of the template file
         filename: Name of the PDF file
+        cache_key: Report cache key to store the PDF under (optional)
         context: Template context variables
     
     Returns:
-        Flask Response object with the PDF file
+        Redirect to the job status page, which offers the download
     """
     html = render_template(template_name, **context)
-    pdf_file = io.BytesIO()
-    pisa.CreatePDF(html, dest=pdf_file)
-    pdf_file.seek(0)
+    user_id = current_user.id if current_user.is_authenticated else None
+    job = submit_pdf_job(html, filename, user_id=user_id, report_key=cache_key)
     
-    return Response(
-        pdf_file.getvalue(),
-        mimetype="application/pdf",
-        headers={"Content-disposition": f"attachment; filename={filename}.pdf"}
-    )
+    return redirect(url_for('jobs.job_status', id=job.id))
 
 def format_currency(amount):
     """Format a number as currency"""
@@ -218,42 +265,40 @@ def get_time_remaining(due_date, start_date=None):
     
     return result
 
-def generate_financial_report_csv(data, headers, title, filename):
+def generate_financial_report_csv(data, headers, title, filename, cache_key=None):
     """
     Generate a CSV file for financial reports
     
     Args:
-        data: The financial data to include in the report
+        data: The financial data to include in the report; may be a generator
         headers: List of header names
         title: Title of the report
         filename: Name of the CSV file
+        cache_key: Report cache key; if given, the file is built in full and
+                   stored in the report cache instead of streamed (optional)
     
     Returns:
-        Flask Response object with the CSV file
+        Flask Response object with the CSV file (streamed unless cached)
     """
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    # Add title and date
-    writer.writerow([title])
-    writer.writerow([f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"])
-    writer.writerow([])  # Empty row for spacing
+    def report_rows():
+        # Add title and date
+        yield [title]
+        yield [f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"]
+        yield []  # Empty row for spacing
+        
+        # Add headers
+        yield headers
+        
+        # Add data rows
+        yield from data
     
-    # Add headers
-    writer.writerow(headers)
+    if cache_key:
+        get_report_cache().put(cache_key, b''.join(iter_csv(report_rows())), filename, 'text/csv')
+        return cached_export_response(cache_key)
     
-    # Add data rows
-    for row in data:
-        writer.writerow(row)
-    
-    output.seek(0)
-    return Response(
-        output.getvalue(),
-        mimetype="text/csv",
-        headers={"Content-disposition": f"attachment; filename={filename}"}
-    )
+    return stream_csv(iter_csv(report_rows()), filename)
 
-def export_trial_balance(accounts, total_debits, total_credits, as_of_date, export_format='csv'):
+def export_trial_balance(accounts, total_debits, total_credits, as_of_date, export_format='csv', cache_key=None):
     """
     Export trial balance report to CSV or PDF
     
@@ -263,6 +308,7 @@ def export_trial_balance(accounts, total_debits, total_credits, as_of_date, expo
         total_credits: Total credits
         as_of_date: As of date
         export_format: 'csv' or 'pdf'
+        cache_key: Report cache key to store the export under (optional)
     
     Returns:
         Response object with the exported file
@@ -286,7 +332,7 @@ def export_trial_balance(accounts, total_debits, total_credits, as_of_date, expo
         filename = f"trial_balance_{as_of_date.strftime('%Y%m%d')}.csv"
         return generate_financial_report_csv(data, headers, 
                                            f"Trial Balance as of {as_of_date.strftime('%Y-%m-%d')}", 
-                                           filename)
+                                           filename, cache_key=cache_key)
     
     elif export_format == 'pdf':
         # Prepare context for PDF template
@@ -300,11 +346,11 @@ def export_trial_balance(accounts, total_debits, total_credits, as_of_date, expo
         }
         
         filename = f"trial_balance_{as_of_date.strftime('%Y%m%d')}"
-        return generate_pdf('accounting/trial_balance.html', filename, **context)
+        return generate_pdf('accounting/trial_balance.html', filename, cache_key=cache_key, **context)
 
 def export_balance_sheet(asset_accounts, liability_accounts, equity_accounts, 
                         total_assets, total_liabilities, total_equity, 
-                        as_of_date, export_format='csv'):
+                        as_of_date, export_format='csv', cache_key=None):
     """
     Export balance sheet to CSV or PDF
     
@@ -317,6 +363,7 @@ def export_balance_sheet(asset_accounts, liability_accounts, equity_accounts,
         total_equity: Total equity
         as_of_date: As of date
         export_format: 'csv' or 'pdf'
+        cache_key: Report cache key to store the export under (optional)
     
     Returns:
         Response object with the exported file
@@ -351,7 +398,7 @@ def export_balance_sheet(asset_accounts, liability_accounts, equity_accounts,
         filename = f"balance_sheet_{as_of_date.strftime('%Y%m%d')}.csv"
         return generate_financial_report_csv(data, headers, 
                                            f"Balance Sheet as of {as_of_date.strftime('%Y-%m-%d')}", 
-                                           filename)
+                                           filename, cache_key=cache_key)
     
     elif export_format == 'pdf':
         # Prepare context for PDF template
@@ -369,10 +416,10 @@ def export_balance_sheet(asset_accounts, liability_accounts, equity_accounts,
         }
         
         filename = f"balance_sheet_{as_of_date.strftime('%Y%m%d')}"
-        return generate_pdf('accounting/balance_sheet.html', filename, **context)
+        return generate_pdf('accounting/balance_sheet.html', filename, cache_key=cache_key, **context)
 
 def export_income_statement(revenue_accounts, expense_accounts, total_revenue, 
-                          total_expenses, net_income, from_date, to_date, export_format='csv'):
+                          total_expenses, net_income, from_date, to_date, export_format='csv', cache_key=None):
     """
     Export income statement to CSV or PDF
     
@@ -385,6 +432,7 @@ def export_income_statement(revenue_accounts, expense_accounts, total_revenue,
         from_date: From date
         to_date: To date
         export_format: 'csv' or 'pdf'
+        cache_key: Report cache key to store the export under (optional)
     
     Returns:
         Response object with the exported file
@@ -414,7 +462,7 @@ def export_income_statement(revenue_accounts, expense_accounts, total_revenue,
         filename = f"income_statement_{period_str}.csv"
         return generate_financial_report_csv(data, headers, 
                                            f"Income Statement: {from_date.strftime('%Y-%m-%d')} to {to_date.strftime('%Y-%m-%d')}", 
-                                           filename)
+                                           filename, cache_key=cache_key)
     
     elif export_format == 'pdf':
         # Prepare context for PDF template
@@ -432,12 +480,12 @@ def export_income_statement(revenue_accounts, expense_accounts, total_revenue,
         
         period_str = f"{from_date.strftime('%Y%m%d')}_to_{to_date.strftime('%Y%m%d')}"
         filename = f"income_statement_{period_str}"
-        return generate_pdf('accounting/income_statement.html', filename, **context)
+        return generate_pdf('accounting/income_statement.html', filename, cache_key=cache_key, **context)
 
 def export_cash_flow_statement(operating_activities, investing_activities, financing_activities,
                              total_operating, total_investing, total_financing,
                              beginning_cash, ending_cash, net_change,
-                             from_date, to_date, export_format='csv'):
+                             from_date, to_date, export_format='csv', cache_key=None):
     """
     Export cash flow statement to CSV or PDF
     
@@ -454,6 +502,7 @@ def export_cash_flow_statement(operating_activities, investing_activities, finan
         from_date: From date
         to_date: To date
         export_format: 'csv' or 'pdf'
+        cache_key: Report cache key to store the export under (optional)
     
     Returns:
         Response object with the exported file
@@ -523,7 +572,7 @@ def export_cash_flow_statement(operating_activities, investing_activities, finan
         filename = f"cash_flow_{period_str}.csv"
         return generate_financial_report_csv(data, headers, 
                                            f"Cash Flow Statement: {from_date.strftime('%Y-%m-%d')} to {to_date.strftime('%Y-%m-%d')}", 
-                                           filename)
+                                           filename, cache_key=cache_key)
     
     elif export_format == 'pdf':
         # Prepare context for PDF template
@@ -545,4 +594,42 @@ def export_cash_flow_statement(operating_activities, investing_activities, finan
         
         period_str = f"{from_date.strftime('%Y%m%d')}_to_{to_date.strftime('%Y%m%d')}"
         filename = f"cash_flow_{period_str}"
-        return generate_pdf('accounting/cash_flow.html', filename, **context)
+        return generate_pdf('accounting/cash_flow.html', filename, cache_key=cache_key, **context)
+
+def export_general_ledger(rows, from_date=None, to_date=None):
+    """
+    Export the general ledger to CSV
+    
+    Args:
+        rows: Iterable of ledger row dictionaries with running balances;
+              consumed lazily while the response streams
+        from_date: From date (optional)
+        to_date: To date (optional)
+    
+    Returns:
+        Streamed Response object with the CSV file
+    """
+    headers = ['Date', 'Entry #', 'Account Code', 'Account Name', 'Description',
+               'Type', 'Debit', 'Credit', 'Reference', 'Balance']
+    
+    def data():
+        for row in rows:
+            yield [
+                row['date'].strftime('%Y-%m-%d'),
+                row['entry_number'],
+                row['account_code'],
+                row['account_name'],
+                row['description'] or row['memo'],
+                row['entry_type'],
+                float(row['debit_amount'] or 0),
+                float(row['credit_amount'] or 0),
+                row['reference'],
+                float(row['running_balance'])
+            ]
+    
+    from_str = from_date.strftime('%Y-%m-%d') if from_date else 'beginning'
+    to_str = to_date.strftime('%Y-%m-%d') if to_date else 'today'
+    filename = f"general_ledger_{from_str.replace('-', '')}_to_{to_str.replace('-', '')}.csv"
+    return generate_financial_report_csv(data(), headers,
+                                       f"General Ledger: {from_str} to {to_str}",
+                                       filename)